@@ -0,0 +1,338 @@
+"""
+Dashboard KPIs and aggregates as plain, typed functions, independent of Streamlit.
+
+Every number a dashboard shows is computed from a selection: the rows of a
+prepared dataset matching a FilterSpec, answered by a query engine
+(queries.PandasEngine over a rollup cube, or one of the SQL engines) or,
+for a frame that is already filtered, by FrameSelection. Columns are
+addressed by role ("revenue", "category", ...; see schema.DASHBOARDS), so
+the same calls work for any dataset whose roles were detected. The KPI
+functions also take a sampling.SampleSelection, in which case every KPI is
+a sampling.Estimate instead of a number.
+
+app.py and pp.py render these results. The command line runs them in
+batch, e.g. one row of KPIs per city (or store) for a nightly report:
+
+    python analytics.py retail data/retail_sales_canada_cleaned.csv --by city --start 2024-01-01 --end 2024-06-30
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import os
+import sys
+from dataclasses import asdict, dataclass, field
+from typing import Any, Generic, Mapping, Optional, Protocol, Sequence, TypeVar, Union
+
+import numpy as np
+import pandas as pd
+
+import columnar_cache
+import datasets
+import queries
+import rollups
+import schema
+from filters import FilterEngine
+
+V = TypeVar("V")
+V_co = TypeVar("V_co", covariant=True)
+
+# Role name -> column of the dataset (None when the dataset has no such column).
+Columns = Mapping[str, Optional[str]]
+DateBound = Union[datetime.date, str, None]
+
+# Roles a dashboard filters and aggregates by; they make up its rollup cube.
+DIMENSIONS: dict[str, tuple[str, ...]] = {
+    "retail": ("category", "city", "province"),
+    "supply_chain": ("origin", "destination", "product_type", "carrier"),
+    "support": ("team", "category", "priority"),
+}
+MEASURES: dict[str, tuple[str, ...]] = {
+    "retail": ("revenue",),
+    "supply_chain": ("delivery_days", "issue"),
+    "support": ("resolution", "csat"),
+}
+
+
+class Selection(Protocol[V_co]):
+    """Rows matching a filter state: what the KPI functions read."""
+
+    @property
+    def rows(self) -> V_co: ...
+
+    def total(self, measure: str) -> Mapping[str, V_co]: ...
+
+    def median(self, measure: str) -> V_co: ...
+
+
+class GroupedSelection(Selection[float], Protocol):
+    """A selection that also aggregates by group, like the query engines' selections."""
+
+    def group(self, by: str, measure: str, stats: Sequence[str] = ..., freq: Optional[str] = ...) -> pd.DataFrame: ...
+
+    def top(self, by: str, measure: str, n: Optional[int] = ...) -> pd.DataFrame: ...
+
+
+class Engine(Protocol[V_co]):
+    def select(self, filters: Mapping[str, Any] | None = ..., start: DateBound = ...,
+               end: DateBound = ...) -> Selection[V_co]: ...
+
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """
+    Allowed values per role or column name (None: no filter) and an
+    inclusive day range (None: open).
+    """
+
+    values: Mapping[str, Optional[Sequence[Any]]] = field(default_factory=dict)
+    start: DateBound = None
+    end: DateBound = None
+
+    def by_column(self, columns: Columns) -> dict[str, Optional[Sequence[Any]]]:
+        """{column: allowed values}, skipping roles the dataset has no column for."""
+        filters = {}
+        for key, values in self.values.items():
+            column = columns[key] if key in columns else key
+            if column:
+                filters[column] = values
+        return filters
+
+
+class FrameSelection:
+    """Every row of a DataFrame as a selection, e.g. a frame filtered with pandas."""
+
+    def __init__(self, frame: pd.DataFrame) -> None:
+        self.frame = frame
+
+    @property
+    def rows(self) -> int:
+        return len(self.frame)
+
+    def total(self, measure: str) -> dict[str, Any]:
+        values = self.frame[measure].to_numpy(dtype="float64", na_value=np.nan)
+        values = values[~np.isnan(values)]
+        return rollups._stats(values.sum(), (values * values).sum(), len(values))
+
+    def median(self, measure: str) -> float:
+        return float(self.frame[measure].median())
+
+
+def _column(columns: Columns, role: str) -> str:
+    column = columns.get(role)
+    if not column:
+        raise ValueError(f"the dataset has no column for the {role!r} role")
+    return column
+
+
+def dimensions(dashboard: str, columns: Columns) -> tuple[Optional[str], ...]:
+    """Columns of the dashboard's dimension roles, in cube order."""
+    return tuple(columns.get(role) for role in DIMENSIONS[dashboard])
+
+
+def measures(dashboard: str, columns: Columns) -> tuple[Optional[str], ...]:
+    return tuple(columns.get(role) for role in MEASURES[dashboard])
+
+
+def select(engine: Engine[V], columns: Columns, spec: FilterSpec) -> Selection[V]:
+    """The selection of spec, answered by engine."""
+    return engine.select(spec.by_column(columns), start=spec.start, end=spec.end)
+
+
+# KPIs ---------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class RetailKPIs(Generic[V]):
+    total_revenue: V
+    avg_revenue: V
+    transactions: V
+
+
+@dataclass(frozen=True)
+class SupplyChainKPIs(Generic[V]):
+    avg_delivery_days: V
+    median_delivery_days: V
+    # Share of shipments with an issue; None without an issue column.
+    issue_rate: Optional[V]
+    shipments: V
+
+
+@dataclass(frozen=True)
+class SupportKPIs(Generic[V]):
+    avg_resolution_hours: V
+    median_resolution_hours: V
+    # Mean CSAT score; None without a CSAT column.
+    csat: Optional[V]
+    tickets: V
+
+
+def retail_kpis(selection: Selection[V], columns: Columns) -> RetailKPIs[V]:
+    revenue = selection.total(_column(columns, "revenue"))
+    return RetailKPIs(revenue["sum"], revenue["mean"], selection.rows)
+
+
+def supply_chain_kpis(selection: Selection[V], columns: Columns) -> SupplyChainKPIs[V]:
+    delivery_days = _column(columns, "delivery_days")
+    issue = columns.get("issue")
+    return SupplyChainKPIs(
+        selection.total(delivery_days)["mean"],
+        selection.median(delivery_days),
+        selection.total(issue)["mean"] if issue else None,
+        selection.rows,
+    )
+
+
+def support_kpis(selection: Selection[V], columns: Columns) -> SupportKPIs[V]:
+    resolution = _column(columns, "resolution")
+    csat = columns.get("csat")
+    return SupportKPIs(
+        selection.total(resolution)["mean"],
+        selection.median(resolution),
+        selection.total(csat)["mean"] if csat else None,
+        selection.rows,
+    )
+
+
+KPIS = {"retail": retail_kpis, "supply_chain": supply_chain_kpis, "support": support_kpis}
+
+
+# Aggregates ----------------------------------------------------------------
+
+def daily_revenue(selection: GroupedSelection, columns: Columns) -> pd.DataFrame:
+    """Net revenue per day: columns date and revenue."""
+    date, revenue = _column(columns, "date"), _column(columns, "revenue")
+    return selection.group(date, revenue)["sum"].rename(revenue).reset_index()
+
+
+def top_categories(selection: GroupedSelection, columns: Columns, n: Optional[int] = None) -> pd.DataFrame:
+    """Revenue sum and transaction count per category, largest first."""
+    return selection.top(_column(columns, "category"), _column(columns, "revenue"), n)
+
+
+def monthly_mean(selection: GroupedSelection, columns: Columns, role: str) -> pd.DataFrame:
+    """Mean of a measure role per calendar month: columns month_year and the measure."""
+    measure = _column(columns, role)
+    return selection.group("month_year", measure, ["mean"], freq="M")["mean"].rename(measure).reset_index()
+
+
+def carrier_performance(selection: GroupedSelection, columns: Columns) -> pd.DataFrame:
+    """Delivery days (mean, std, count) and issue rate per carrier, fastest first."""
+    carrier, delivery_days = _column(columns, "carrier"), _column(columns, "delivery_days")
+    performance = selection.group(carrier, delivery_days, ["mean", "std", "count"])
+    issue = columns.get("issue")
+    if issue:
+        performance["issue_rate"] = selection.group(carrier, issue, ["mean"])["mean"]
+    return performance.sort_values("mean")
+
+
+def team_performance(selection: GroupedSelection, columns: Columns) -> pd.DataFrame:
+    """Resolution hours (mean, count) per support team, fastest first."""
+    return selection.group(_column(columns, "team"), _column(columns, "resolution"), ["mean", "count"]).sort_values("mean")
+
+
+def category_resolution(selection: GroupedSelection, columns: Columns) -> pd.DataFrame:
+    """Resolution hours (mean, count) per ticket category, slowest first."""
+    by, resolution = _column(columns, "category"), _column(columns, "resolution")
+    return selection.group(by, resolution, ["mean", "count"]).sort_values("mean", ascending=False)
+
+
+# Headless use --------------------------------------------------------------
+
+def _prepare(df: pd.DataFrame, date_formats: Optional[Mapping[str, str]] = None) -> pd.DataFrame:
+    return datasets.prepare_frame(df, date_formats=date_formats)[0]
+
+
+def version(path: str) -> str:
+    """Version of the dataset in path: its columnar cache entry, or the Arrow file itself."""
+    if os.path.splitext(path)[1].lower() in (".arrow", ".feather"):
+        return os.path.abspath(path)
+    return columnar_cache.cache_path(path)
+
+
+def load(path: str) -> datasets.PreparedDataset:
+    """
+    A prepared dataset from a CSV (through the columnar cache, like the
+    built-in datasets of app.py) or an Arrow file.
+    """
+    if os.path.splitext(path)[1].lower() in (".arrow", ".feather"):
+        df = columnar_cache.read_table(path)
+    else:
+        df = columnar_cache.load_cached(path, lambda p: _prepare(pd.read_csv(p)), parse_tail=_prepare)
+    return datasets.PreparedDataset.prepare(df, version(path))
+
+
+def detect_columns(prepared: datasets.PreparedDataset, dashboard: str) -> dict[str, Optional[str]]:
+    """{role: column} of a dashboard, detected from the dataset's schema."""
+    columns = schema.detect_roles(schema.profile(prepared.frame), schema.DASHBOARDS[dashboard])
+    columns["date"] = columns["date"] or prepared.date_col
+    return columns
+
+
+def engine(prepared: datasets.PreparedDataset, dashboard: str, columns: Columns,
+           extra_dimensions: Sequence[str] = ()) -> queries.PandasEngine:
+    """In-memory engine over the dashboard's rollup cube (plus extra_dimensions)."""
+    date = _column(columns, "date")
+    cube = rollups.RollupCube.build(prepared.frame, date, dimensions(dashboard, columns) + tuple(extra_dimensions),
+                                    measures(dashboard, columns))
+    return queries.PandasEngine(cube, FilterEngine(prepared.frame), date)
+
+
+def report(prepared: datasets.PreparedDataset, dashboard: str, spec: FilterSpec = FilterSpec(),
+           by: Optional[str] = None) -> list[dict[str, Any]]:
+    """
+    The dashboard's KPIs for spec as a list of dicts: one for the whole
+    selection, or one per value of `by` (a role or column name).
+    """
+    columns = detect_columns(prepared, dashboard)
+    kpis = KPIS[dashboard]
+    if by is None:
+        return [asdict(kpis(select(engine(prepared, dashboard, columns), columns, spec), columns))]
+    by_column = columns[by] if by in columns else by
+    if not by_column or by_column not in prepared.frame.columns:
+        raise ValueError(f"no column {by!r} to group by")
+    grouped = engine(prepared, dashboard, columns, (by_column,))
+    rows = []
+    for value in pd.unique(prepared.frame[by_column].dropna()):
+        group_spec = FilterSpec({**spec.values, by_column: [value]}, spec.start, spec.end)
+        rows.append({by_column: value, **asdict(kpis(select(grouped, columns, group_spec), columns))})
+    return sorted(rows, key=lambda r: str(r[by_column]))
+
+
+def _filter_arg(text: str) -> tuple[str, list[str]]:
+    role, sep, values = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"expected ROLE=VALUE[,VALUE...], not {text!r}")
+    return role, values.split(",")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compute dashboard KPIs without Streamlit.")
+    parser.add_argument("dashboard", choices=sorted(KPIS))
+    parser.add_argument("source", help="CSV or Arrow file")
+    parser.add_argument("--by", help="one row per value of this role or column (e.g. city)")
+    parser.add_argument("--filter", type=_filter_arg, action="append", default=[], metavar="ROLE=VALUES",
+                        help="allowed comma-separated values of a role or column (repeatable)")
+    parser.add_argument("--start", help="first day (YYYY-MM-DD)")
+    parser.add_argument("--end", help="last day (YYYY-MM-DD)")
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser.add_argument("--out", help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    spec = FilterSpec(dict(args.filter), args.start, args.end)
+    rows = report(load(args.source), args.dashboard, spec, args.by)
+    out = open(args.out, "w", newline="") if args.out else sys.stdout
+    try:
+        if args.format == "json":
+            json.dump(rows, out, indent=2, default=lambda v: v.item() if hasattr(v, "item") else str(v))
+            out.write("\n")
+        else:
+            pd.DataFrame(rows).to_csv(out, index=False)
+    finally:
+        if args.out:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,319 @@
+"""
+JSON over HTTP for the numbers the dashboards and slides show, for
+consumers outside Streamlit.
+
+    python api.py --port 8503
+
+    GET /v1                                   dashboards, filters and series
+    GET /v1/<dashboard>/kpis                  the dashboard's KPIs
+    GET /v1/<dashboard>/series/<name>         one chart series or table
+    GET /healthz
+
+Results come from analytics over the built-in datasets (or the files
+given on the command line). The query string filters them: every
+dimension role of the dashboard (see analytics.DIMENSIONS) takes
+comma-separated allowed values, start and end bound the days, e.g.
+
+    /v1/supply_chain/series/carriers?carrier=UPS,DHL&start=2024-01-01
+
+Every response has an ETag derived from the dataset version and the
+normalized request. A client that sends it back in If-None-Match gets
+304 Not Modified without anything being computed; a changed source file
+is a new version and so gets new ETags. Recent responses are kept in
+memory, so popular requests are served without querying again.
+
+The server is a plain asyncio server speaking HTTP/1.1 with keep-alive.
+Each dataset is loaded once per version and shared by all requests;
+loading and queries run on a thread pool, so the event loop keeps
+answering other requests meanwhile. Tests can run it in-process on a
+free port:
+
+    server = await api.start(port=0)
+    port = server.sockets[0].getsockname()[1]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import analytics
+
+PORT = 8503
+# Threads loading datasets and answering queries.
+WORKERS = 4
+# Responses kept in memory, by ETag.
+MAX_RESPONSES = 512
+MAX_HEADERS = 100
+
+SOURCES = {
+    "retail": "data/retail_sales_canada_cleaned.csv",
+    "supply_chain": "data/supply_chain_usa_cleaned.csv",
+    "support": "data/customer_support_tickets_cleaned.csv",
+}
+SERIES = {
+    "retail": {
+        "daily_revenue": analytics.daily_revenue,
+        "top_categories": analytics.top_categories,
+    },
+    "supply_chain": {
+        "delivery_days_by_month": lambda s, c: analytics.monthly_mean(s, c, "delivery_days"),
+        "carriers": analytics.carrier_performance,
+    },
+    "support": {
+        "resolution_by_month": lambda s, c: analytics.monthly_mean(s, c, "resolution"),
+        "teams": analytics.team_performance,
+        "categories": analytics.category_resolution,
+    },
+}
+REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 500: "Internal Server Error"}
+
+log = logging.getLogger("dashboards.api")
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _plain(value):
+    # JSON-ready scalars: numpy values as Python ones, NaN as null.
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, (pd.Timestamp, pd.Period)):
+        return str(value)
+    return value
+
+
+def _records(frame):
+    frame = frame.reset_index()
+    return [{k: _plain(v) for k, v in zip(frame.columns, row)} for row in frame.itertuples(index=False)]
+
+
+def _etag_matches(header, etag):
+    if header is None:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class Api:
+    """Routes requests to analytics over datasets loaded once per version."""
+
+    def __init__(self, sources=None, workers=WORKERS, max_responses=MAX_RESPONSES):
+        self.sources = dict(SOURCES if sources is None else sources)
+        self.max_responses = max_responses
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="api")
+        # dashboard -> (version, future of (columns, engine))
+        self._datasets = {}
+        # etag -> body
+        self._responses = OrderedDict()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _load(self, dashboard):
+        prepared = analytics.load(self.sources[dashboard])
+        columns = analytics.detect_columns(prepared, dashboard)
+        return columns, analytics.engine(prepared, dashboard, columns)
+
+    async def _dataset(self, dashboard, version):
+        entry = self._datasets.get(dashboard)
+        if entry is None or entry[0] != version:
+            # Concurrent requests for a new version share one load.
+            entry = (version, asyncio.ensure_future(self._run(self._load, dashboard)))
+            self._datasets[dashboard] = entry
+        try:
+            return await asyncio.shield(entry[1])
+        except Exception:
+            if self._datasets.get(dashboard) is entry:
+                del self._datasets[dashboard]
+            raise
+
+    def _filters(self, dashboard, query):
+        # The normalized filter state: sorted roles and values, ISO days.
+        allowed = analytics.DIMENSIONS[dashboard]
+        values, bounds = {}, {"start": None, "end": None}
+        for key, value in parse_qsl(query, keep_blank_values=True):
+            if key in bounds:
+                try:
+                    bounds[key] = pd.Timestamp(value).date().isoformat()
+                except ValueError:
+                    raise HTTPError(400, f"{key} is not a date: {value!r}") from None
+            elif key in allowed:
+                values.setdefault(key, set()).update(v for v in value.split(",") if v)
+            else:
+                raise HTTPError(400, f"unknown filter {key!r}; the {dashboard} filters are "
+                                     f"{', '.join(allowed + ('start', 'end'))}")
+        return {k: sorted(v) for k, v in sorted(values.items())}, bounds["start"], bounds["end"]
+
+    def _index(self):
+        return {
+            "dashboards": {
+                name: {
+                    "kpis": f"/v1/{name}/kpis",
+                    "series": {s: f"/v1/{name}/series/{s}" for s in SERIES[name]},
+                    "filters": list(analytics.DIMENSIONS[name]) + ["start", "end"],
+                }
+                for name in self.sources
+            }
+        }
+
+    def _compute(self, dashboard, series, columns, engine, filters, start, end):
+        spec = analytics.FilterSpec(filters, start, end)
+        selection = analytics.select(engine, columns, spec)
+        result = {"dashboard": dashboard, "filters": filters, "start": start, "end": end}
+        if series is None:
+            kpis = analytics.KPIS[dashboard](selection, columns)
+            result["kpis"] = {k: _plain(v) for k, v in asdict(kpis).items()}
+        else:
+            result["series"] = series
+            result["data"] = _records(SERIES[dashboard][series](selection, columns))
+        return json.dumps(result).encode()
+
+    async def respond(self, method, target, headers):
+        """(status, extra headers, body) of a request."""
+        if method not in ("GET", "HEAD"):
+            raise HTTPError(405, f"{method} is not supported")
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        if parts == ["healthz"]:
+            return 200, {}, b'{"status": "ok"}'
+        if parts in ([], ["v1"]):
+            return 200, {}, json.dumps(self._index()).encode()
+        if len(parts) < 3 or parts[0] != "v1" or parts[1] not in self.sources:
+            raise HTTPError(404, f"no such resource: {url.path}")
+        dashboard = parts[1]
+        if parts[2:] == ["kpis"]:
+            series = None
+        elif len(parts) == 4 and parts[2] == "series" and parts[3] in SERIES[dashboard]:
+            series = parts[3]
+        else:
+            raise HTTPError(404, f"no such resource: {url.path}")
+        filters, start, end = self._filters(dashboard, url.query)
+
+        version = await self._run(analytics.version, self.sources[dashboard])
+        key = json.dumps([version, dashboard, series, filters, start, end])
+        etag = '"' + hashlib.sha1(key.encode()).hexdigest()[:32] + '"'
+        cache = {"ETag": etag, "Cache-Control": "no-cache"}
+        if _etag_matches(headers.get("if-none-match"), etag):
+            return 304, cache, b""
+        body = self._responses.get(etag)
+        if body is None:
+            columns, engine = await self._dataset(dashboard, version)
+            try:
+                body = await self._run(self._compute, dashboard, series, columns, engine, filters, start, end)
+            except ValueError as e:
+                # e.g. the dataset has no column for the series' role.
+                raise HTTPError(404, str(e)) from None
+            self._responses[etag] = body
+            while len(self._responses) > self.max_responses:
+                self._responses.popitem(last=False)
+        else:
+            self._responses.move_to_end(etag)
+        return 200, cache, body
+
+    async def _respond(self, method, target, headers):
+        try:
+            return await self.respond(method, target, headers)
+        except HTTPError as e:
+            extra = {"Allow": "GET, HEAD"} if e.status == 405 else {}
+            return e.status, extra, json.dumps({"error": str(e)}).encode()
+        except Exception:
+            log.exception("%s %s failed", method, target)
+            return 500, {}, b'{"error": "internal error"}'
+
+    async def handle(self, reader, writer):
+        """Serves the requests of one connection until it is closed."""
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    method, target, version = line.decode("latin-1").split()
+                except ValueError:
+                    method = None
+                headers = {}
+                for _ in range(MAX_HEADERS):
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if method is None:
+                    status, extra, body = 400, {}, b'{"error": "malformed request line"}'
+                    keep_alive = False
+                else:
+                    status, extra, body = await self._respond(method, target, headers)
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                head = [f"HTTP/1.1 {status} {REASONS[status]}"]
+                head += [f"{name}: {value}" for name, value in extra.items()]
+                if status != 304:
+                    head += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+                head.append("Connection: keep-alive" if keep_alive else "Connection: close")
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+                if method != "HEAD" and status != 304:
+                    writer.write(body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def start(host="127.0.0.1", port=PORT, api=None):
+    """Starts serving api (by default the built-in datasets); returns the asyncio server."""
+    api = api or Api()
+    return await asyncio.start_server(api.handle, host, port)
+
+
+async def _serve(host, port, api):
+    server = await start(host, port, api)
+    for sock in server.sockets:
+        print(f"Serving on http://{sock.getsockname()[0]}:{sock.getsockname()[1]}/v1")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the dashboard KPIs and chart series as JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=PORT)
+    for name, path in SOURCES.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", dest=name, default=path,
+                            help=f"CSV or Arrow file of the {name} dataset (default: {path})")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="threads for loading and queries")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    api = Api({name: getattr(args, name) for name in SOURCES}, args.workers)
+    try:
+        asyncio.run(_serve(args.host, args.port, api))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,118 +1,44 @@
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import CancelledError
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
-# ------------------------------------------------------------
-
-@st.cache_data
-def load_data_from_csv(uploaded_file):
-    """
-    Reads and returns a DataFrame from an uploaded CSV.
-    Caching ensures the file is read only once per upload.
-    """
-    if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
-        return df
-    return None
-
-# ------------------------------------------------------------
-
-uploaded_file = st.sidebar.file_uploader("Upload a CSV file", type="csv", key="file_uploader")
-
-df = load_data_from_csv(uploaded_file)
-
-if df is None:
-    st.warning("No data loaded. Please upload a CSV file or ensure built‑in data files are in the correct location.")
-    st.stop()
-O que acontece aqui:
-load_data_from_csv(uploaded_file) é cacheado: o Streamlit guarda o retorno (DataFrame) para o mesmo arquivo até você trocar o upload.
-
-Você não chama pd.read_csv diretamente no st.file_uploader, só dentro da função decorada com st.cache_data.
-
-Assim, se você mover filtros ou sliders, o Streamlit não relê o CSV, só usa o DataFrame já carregado.
-
-✅ 2. Integrando com o menu de projetos
-Você já tem o project = st.selectbox(...), então basta usar o mesmo df carregado e aplicar a lógica do template de cada projeto.
-
-Exemplo mínimo adaptado:
-
-python
-@st.cache_data
-def load_data_from_csv(uploaded_file):
-    if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
-        return df
-    return None
-
-uploaded_file = st.sidebar.file_uploader("Upload a CSV file", type="csv", key="file_uploader")
-df = load_data_from_csv(uploaded_file)
-
-if df is None:
-    st.warning("No data loaded. Please upload a CSV file.")
-    st.stop()
-
-# --- 1. Retail Sales Optimization
-if project == "Retail Sales Optimization (Canada)":
-    st.markdown("## Retail Sales Optimization Dashboard")
-
-    # Auto‑detect columns
-    date_col = None
-    for c in df.columns:
-        if "date" in c.lower() or "order" in c.lower():
-            date_col = c
-            break
-    if date_col:
-        df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
-        df["month_year"] = df[date_col].dt.to_period("M").astype(str)
-
-    # Auto‑detect revenue column
-    revenue_cols = [c for c in df.columns if "revenue" in c.lower() or "sales" in c.lower()]
-    revenue_col = revenue_cols[0] if revenue_cols else df.select_dtypes(include="number").columns[0]
+import analytics
+import charts
+import columnar_cache
+import database
+import datasets
+import filters
+import ingest
+import jobs
+import queries
+import rollups
+import sampling
+import schema
+import telemetry
 
-    # Auto‑filters
-    cat_cols = [c for c in df.columns if "category" in c.lower()]
-    cat_col = cat_cols[0] if cat_cols else None
+st.set_page_config(layout="wide", page_title="Process Improvement Dashboards")
 
-    if cat_col:
-        categories = st.sidebar.multiselect("Category", df[cat_col].unique(), default=df[cat_col].unique())
-        df = df[df[cat_col].isin(categories)]
+# Opt-in timing (DASHBOARD_TIMING=1, or ?timing=1 in the URL): the stages
+# of this rerun and its cached loaders are shown in a sidebar panel and
+# exported as metrics.
+telemetry.start("app", telemetry.ENABLED or st.query_params.get("timing") == "1")
+telemetry.stage("widgets")
 
-    # KPIs
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Total Revenue (CAD)", f"${df[revenue_col].sum():,.0f}")
-    col2.metric("Avg Revenue per Transaction", f"${df[revenue_col].mean():,.2f}")
-    col3.metric("Total Transactions", len(df))
+# Prometheus scrape endpoint for the timing metrics, e.g. METRICS_PORT=9464.
+METRICS_PORT = os.environ.get("METRICS_PORT")
 
-    # Sales over time
-    if date_col:
-        time_trend = df.groupby(date_col)[revenue_col].sum().reset_index()
-        fig1 = px.line(time_trend, x=date_col, y=revenue_col, title="Daily Revenue")
-        st.plotly_chart(fig1, use_container_width=True)
-(Repete o padrão para Supply Chain e Customer Support, usando df já carregado pelo st.cache_data.)
-
-✅ 3. Bônus: cache separado para cada projeto
-Se você quiser que o app carregue o arquivo de cada projeto diferente (por exemplo, 3 widgets de upload), você pode fazer:
-
-python
-@st.cache_data
-def load_retail_data(uploaded_file):
-    if uploaded_file is not None:
-        return pd.read_csv(uploaded_file)
-    return pd.read_csv("data/retail_sales_canada_cleaned.csv")
-
-@st.cache_data
-def load_supply_chain_data(uploaded_file):
-    if uploaded_file is not None:
-        return pd.read_csv(uploaded_file)
-    return pd.read_csv("data/supply_chain_usa_cleaned.csv")
-
-@st.cache_data
-def load_support_data(uploaded_file):
-    if uploaded_file is not None:
-        return pd.read_csv(uploaded_file)
-    return pd.read_csv("data/customer_support_tickets_cleaned.csv")
+@st.cache_resource
+def start_metrics_server(port):
+    return telemetry.serve(port)
 
-st.set_page_config(layout="wide", page_title="Process Improvement Dashboards")
+if METRICS_PORT:
+    start_metrics_server(int(METRICS_PORT))
 
 st.title("📊 Process Improvement Data Analytics Dashboards")
 st.markdown(
@@ -138,59 +64,404 @@ project = st.selectbox(
 # File uploader (CSV)
 # =================================================
 st.sidebar.header("Upload your data")
-uploaded_file = st.sidebar.file_uploader(
-    "Upload a CSV file (or use built‑in sample data)",
+uploaded_files = st.sidebar.file_uploader(
+    "Upload CSV files (or use built‑in sample data)",
     type="csv",
+    accept_multiple_files=True,
     key="file_uploader",
 )
 
+# Folders of exports on the server (e.g. one CSV per store and day) are
+# read from below this directory only.
+IMPORT_ROOT = os.environ.get("IMPORT_ROOT", "data")
+import_pattern = st.sidebar.text_input(
+    f"…or a folder or glob of CSV files under `{IMPORT_ROOT}/`",
+    placeholder="stores/*.csv",
+    key="import_pattern",
+).strip()
+
 # =================================================
 # Cache data loading (works with uploaded files)
 # =================================================
-@st.cache_data
+@telemetry.cached(st.cache_resource(max_entries=8))
+def load_ingested(path):
+    return datasets.PreparedDataset.prepare(columnar_cache.read_table(path), path)
+
+@telemetry.cached(st.cache_data)
+def upload_key(file_id, _uploaded_file):
+    # Hashed once per upload (file_id), not on every rerun.
+    return columnar_cache.content_key(_uploaded_file)
+
+def upload_cache_target(uploaded_file):
+    key = upload_key(uploaded_file.file_id, uploaded_file)
+    return columnar_cache.entry_path(uploaded_file.name, key, columnar_cache.UPLOAD_DIR)
+
+@telemetry.timed
 def load_data_from_upload(uploaded_file):
-    if uploaded_file is not None:
-        df = pd.read_csv(uploaded_file)
-        return df, "uploaded"
-    return None, "uploaded"
-
-@st.cache_data
-def load_builtin_retail():
-    df = pd.read_csv("data/retail_sales_canada_cleaned.csv")
-    df["sales_date"] = pd.to_datetime(df["sales_date"], errors="coerce")
-    df["month_year"] = df["sales_date"].dt.to_period("M").astype(str)
+    """
+    Streams the upload into the columnar cache chunk by chunk (showing
+    progress in the sidebar) and returns the prepared dataset. A file that
+    was already ingested is read straight from the cache.
+    """
+    if uploaded_file is None:
+        return None, "uploaded"
+    target = upload_cache_target(uploaded_file)
+    if not os.path.exists(target):
+        bar = st.sidebar.progress(0.0, text=f"Ingesting {uploaded_file.name}...")
+        try:
+            ingest.ingest_csv(uploaded_file, target, progress=lambda done: bar.progress(done))
+        finally:
+            bar.empty()
+    return load_ingested(target), "uploaded"
+
+def ingest_files(paths, target, label):
+    # Parses the files in parallel (one process per CPU) into one entry.
+    # The worker pool is started by a child process, not by this threaded
+    # server.
+    bar = st.sidebar.progress(0.0, text=f"Ingesting {label}...")
+    try:
+        ingest.ingest_many_subprocess(paths, target, progress=lambda done: bar.progress(done))
+    finally:
+        bar.empty()
+
+@telemetry.timed
+def load_data_from_uploads(uploaded_files):
+    """Several uploads become one dataset, in upload order."""
+    if len(uploaded_files) == 1:
+        return load_data_from_upload(uploaded_files[0])
+    keys = [upload_key(f.file_id, f) for f in uploaded_files]
+    target = columnar_cache.entry_path("uploads", columnar_cache.params_key(*keys), columnar_cache.UPLOAD_DIR)
+    if not os.path.exists(target):
+        # The worker processes read the uploads from disk.
+        os.makedirs(columnar_cache.UPLOAD_DIR, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=columnar_cache.UPLOAD_DIR) as spool:
+            paths = []
+            for key, f in zip(keys, uploaded_files):
+                paths.append(os.path.join(spool, f"{len(paths):05d}-{key}.csv"))
+                with open(paths[-1], "wb") as out:
+                    out.write(f.getbuffer())
+            ingest_files(paths, target, f"{len(paths)} files")
+    return load_ingested(target), "uploaded"
+
+@telemetry.timed
+def load_data_from_folder(pattern):
+    """
+    Every CSV of a folder or glob below IMPORT_ROOT as one dataset. The
+    entry is keyed by the files' paths, sizes and modification times, so
+    a new or changed file triggers a new import.
+    """
+    root = os.path.realpath(IMPORT_ROOT)
+    paths = ingest.expand_sources(os.path.join(root, pattern))
+    paths = [p for p in paths if os.path.realpath(p).startswith(root + os.sep)]
+    if not paths:
+        st.sidebar.warning(f"No CSV files match `{pattern}` under `{IMPORT_ROOT}/`.")
+        return None, "imported"
+    key = columnar_cache.params_key(*(columnar_cache.source_key(p) for p in paths))
+    target = columnar_cache.entry_path("import", key, columnar_cache.IMPORT_DIR)
+    if not os.path.exists(target):
+        ingest_files(paths, target, f"{len(paths)} files")
+    return load_ingested(target), "imported"
+
+RETAIL_CSV = "data/retail_sales_canada_cleaned.csv"
+SUPPLY_CHAIN_CSV = "data/supply_chain_usa_cleaned.csv"
+SUPPORT_CSV = "data/customer_support_tickets_cleaned.csv"
+
+
+def prepare_builtin(df, date_formats=None):
+    df, _ = datasets.prepare_frame(df, date_formats=date_formats)
     return df
 
-@st.cache_data
-def load_builtin_supply_chain():
-    df = pd.read_csv("data/supply_chain_usa_cleaned.csv")
-    df["shipment_date"] = pd.to_datetime(df["shipment_date"], errors="coerce")
-    df["delivery_date"] = pd.to_datetime(df["delivery_date"], errors="coerce")
-    df["month_year"] = df["shipment_date"].dt.to_period("M").astype(str)
-    return df
+def parse_builtin(path):
+    return prepare_builtin(pd.read_csv(path))
 
-@st.cache_data
-def load_builtin_support():
-    df = pd.read_csv("data/customer_support_tickets_cleaned.csv")
-    df["opened_at"] = pd.to_datetime(df["opened_at"], errors="coerce")
-    df["closed_at"] = pd.to_datetime(df["closed_at"], errors="coerce")
-    df["month_year"] = df["opened_at"].dt.to_period("M").astype(str)
-    return df
+@telemetry.timed
+def load_builtin(path, dataset_version):
+    """
+    The prepared built-in dataset. When the CSV only grew since the last
+    load, just the appended lines are parsed and added to the cached rows.
+    """
+    df = columnar_cache.load_cached(path, parse_builtin, parse_tail=prepare_builtin)
+    return datasets.PreparedDataset.prepare(df, dataset_version, base=columnar_cache.appended_to(dataset_version))
+
+
+# Built-in datasets are parsed once and then served from the on-disk
+# columnar cache, which survives restarts and deploys. The prepared
+# dataset is a shared resource keyed by its cache entry: reruns and other
+# sessions reuse it instead of getting a pickled copy.
+@telemetry.cached(st.cache_resource(max_entries=2))
+def load_builtin_retail(dataset_version):
+    return load_builtin(RETAIL_CSV, dataset_version)
+
+@telemetry.cached(st.cache_resource(max_entries=2))
+def load_builtin_supply_chain(dataset_version):
+    return load_builtin(SUPPLY_CHAIN_CSV, dataset_version)
+
+@telemetry.cached(st.cache_resource(max_entries=2))
+def load_builtin_support(dataset_version):
+    return load_builtin(SUPPORT_CSV, dataset_version)
+
+
+# Optional database source, e.g. sqlite:///data/analytics.db or
+# duckdb:///data/analytics.duckdb. When set it replaces the built-in CSVs;
+# each dashboard reads the table named after its CSV.
+DATABASE_URL = os.environ.get("DATABASE_URL")
+DATABASE_TABLES = {
+    "Retail Sales Optimization (Canada)": "retail_sales_canada_cleaned",
+    "Supply Chain Efficiency (North America)": "supply_chain_usa_cleaned",
+    "Customer Support Time Reduction (North America)": "customer_support_tickets_cleaned",
+}
+DATABASE_DASHBOARDS = {
+    "Retail Sales Optimization (Canada)": "retail",
+    "Supply Chain Efficiency (North America)": "supply_chain",
+    "Customer Support Time Reduction (North America)": "support",
+}
+
+@telemetry.cached(st.cache_resource)
+def load_database(url):
+    """Connection pool and query result cache, shared by all sessions."""
+    return database.Database(url)
+
+# Roles the dashboards ask for with choose_column when they are not detected.
+DATABASE_FALLBACK_ROLES = {
+    "retail": ("category", "revenue"),
+    "supply_chain": ("delivery_days",),
+    "support": ("resolution",),
+}
+
+def database_columns(db, table, dashboard):
+    """
+    Columns of table the dashboard uses: the roles detected on a sample of
+    rows, plus the choices for a fallback role that was not detected.
+    """
+    sample = db.read_frame(f"SELECT * FROM {database.quote(table)} LIMIT {schema.SAMPLE_ROWS}")
+    profiles = schema.profile(datasets.prepare_frame(sample)[0])
+    roles = schema.DASHBOARDS[dashboard]
+    found = schema.detect_roles(profiles, roles)
+    wanted = {c for c in found.values() if c is not None}
+    for role in roles:
+        if found[role.name] is None and role.name in DATABASE_FALLBACK_ROLES[dashboard]:
+            wanted.update(schema.columns_of_kind(profiles, role.kinds))
+    # In table order, so roles are detected the same way on the loaded frame.
+    return [c for c in sample.columns if c in wanted]
+
+# Reloaded when the result cache expires, so the widgets pick up new rows;
+# the load time in the version keeps figures of old snapshots apart. Only
+# the columns the dashboard uses are read into memory.
+@telemetry.cached(st.cache_resource(ttl=database.RESULT_TTL, max_entries=3))
+def load_database_table(url, table, dashboard):
+    db = load_database(url)
+    columns = ", ".join(database.quote(c) for c in database_columns(db, table, dashboard))
+    df = db.read_frame(f"SELECT {columns} FROM {database.quote(table)}")
+    return datasets.PreparedDataset.prepare(df, f"{url}#{table}@{time.time():.0f}")
+
+
+@telemetry.cached(st.cache_data(max_entries=32))
+def load_profile(dataset_version, _df):
+    """Column kinds and name words, profiled once per data version (file fingerprint)."""
+    return schema.profile(_df)
+
+@telemetry.cached(st.cache_data(max_entries=32))
+def detect_roles(dataset_version, dashboard, _df):
+    """{role: column} for one of the dashboards in schema.DASHBOARDS."""
+    return schema.detect_roles(load_profile(dataset_version, _df), schema.DASHBOARDS[dashboard])
+
+def choose_column(label, dataset_version, df, kinds):
+    """Asks for the column of a role that could not be detected."""
+    return st.selectbox(label, schema.columns_of_kind(load_profile(dataset_version, df), kinds))
+
+
+@telemetry.cached(st.cache_resource(max_entries=16))
+def load_row_filters(dataset_version, _df):
+    """Per-predicate mask cache over the raw rows, shared by all reruns."""
+    return filters.FilterEngine(_df)
+
+
+@telemetry.cached(st.cache_resource(max_entries=16))
+def load_cube(dataset_version, _df, date_col, dimensions, measures, base=None):
+    """
+    Rollup cube of the current dataset, built once per data version. It is
+    kept as a shared resource so its predicate masks survive reruns. A
+    dataset that extends a base version by appended rows reuses the base's
+    cube and only aggregates the new rows.
+    """
+    if base is not None:
+        base_version, base_rows = base
+        cube = load_cube(base_version, _df.iloc[:base_rows], date_col, dimensions, measures)
+        return cube.extend(_df.iloc[base_rows:])
+    return rollups.RollupCube.build(_df, date_col, dimensions, measures)
+
+# Where the dashboard aggregations run: "pandas" (in-memory rollup cube),
+# "sqlite" or "duckdb" (pushed down into an embedded database).
+QUERY_BACKEND = os.environ.get("QUERY_BACKEND", "pandas")
+
+@telemetry.cached(st.cache_resource(max_entries=4))
+def load_sql_engine(backend, source, date_col):
+    return queries.engine_for(backend, source, date_col)
+
+def load_query_engine(dataset_version, df, date_col, dimensions, measures):
+    """
+    Query engine for the current dataset. The dataset version is the path
+    of its prepared Arrow file, which the SQL engines query directly.
+    Database tables are always queried in the database.
+    """
+    if data_source == "database":
+        return queries.database_engine(load_database(DATABASE_URL), DATABASE_TABLES[project], date_col)
+    if QUERY_BACKEND == "pandas":
+        cube = load_cube(dataset_version, df, date_col, dimensions, measures, prepared.base)
+        return queries.PandasEngine(cube, load_row_filters(dataset_version, df), date_col)
+    return load_sql_engine(QUERY_BACKEND, dataset_version, date_col)
+
+@telemetry.cached(st.cache_resource)
+def load_figure_cache():
+    """Built figures, shared by all sessions and keyed by filter state."""
+    return charts.FigureCache()
+
+# KPIs, figures and tables of a filter state are computed on a shared
+# background job queue. A rerun waits up to RENDER_WAIT_SECONDS for them;
+# slower ones show the session's last result under a "refreshing" badge
+# until the new one is swapped in.
+RENDER_WAIT_SECONDS = float(os.environ.get("RENDER_WAIT_SECONDS", "0.2"))
+# Approximate mode: KPIs are estimated from a stratified sample at once,
+# while the exact values are computed in the background and swapped in
+# when ready.
+APPROXIMATE_KPIS = os.environ.get("APPROXIMATE_KPIS", "0") == "1"
+# Seconds between checks for finished background jobs.
+REFINE_POLL_SECONDS = 0.5
+
+@telemetry.cached(st.cache_resource(max_entries=16))
+def load_sample(dataset_version, _df, date_col, dimensions, measures):
+    """Stratified sample for approximate KPIs, drawn once per data version."""
+    return sampling.StratifiedSample.build(_df, date_col, dimensions, measures)
+
+@telemetry.cached(st.cache_resource)
+def load_jobs():
+    return jobs.JobQueue()
+
+@st.fragment(run_every=REFINE_POLL_SECONDS)
+def rerun_when_done(jobs):
+    if any(job.done() for job in jobs):
+        st.rerun()
+
+# Jobs this rerun shows a stale or estimated result for.
+refreshing_jobs = []
+session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+
+def submit(slot, key, compute):
+    """
+    The job of compute() for key. The slot (e.g. "retail_trend") is this
+    session's place on the page: a new key for it cancels the slot's
+    previous job if that has not started yet.
+    """
+    return load_jobs().submit(key, compute, owner=(session_id, slot))
+
+def in_background(slot, key, compute):
+    """
+    (compute()'s result for key, refreshing). Waits up to
+    RENDER_WAIT_SECONDS for the background job, then falls back to the
+    slot's last result for this dataset version (refreshing=True) and
+    reruns when the job is done. Without one, it waits for the job.
+    """
+    results = st.session_state.setdefault("background_results", {})
+    version, last = results.get(slot, (None, None))
+    if version != dataset_version:
+        last = None
+    while True:
+        job = submit(slot, key, compute)
+        try:
+            value = job.result(timeout=None if last is None else RENDER_WAIT_SECONDS)
+            break
+        except TimeoutError:
+            refreshing_jobs.append(job)
+            return last, True
+        except CancelledError:
+            # Given up by its other owners before it started; the next
+            # submit starts it again.
+            continue
+    results[slot] = (dataset_version, value)
+    return value, False
+
+def refreshing_badge():
+    st.badge("Refreshing…", icon=":material/autorenew:", color="orange",
+             help="Showing the previous result while the current filters are computed.")
+
+def background_figure(chart_id, filters, build):
+    """figures.get(), built off the render path."""
+    key = (dataset_version, chart_id, charts.filter_key(filters))
+    fig, refreshing = in_background(chart_id[0], key, lambda: figures.get(dataset_version, chart_id, filters, build))
+    if refreshing:
+        refreshing_badge()
+    return fig
+
+def show_kpis(name, metrics, selection, exact, estimate):
+    """
+    One metric per (label, field, format) in metrics, in columns, read from
+    the analytics KPIs that exact() returns, computed in the background.
+    In approximate mode the sampling.Estimates of estimate() are shown
+    with their 95% interval until exact() has finished.
+    """
+    key = (dataset_version, name, charts.filter_key(selection))
+    kpis = None
+    if not approximate:
+        kpis, refreshing = in_background(name, key, exact)
+        if refreshing:
+            refreshing_badge()
+    else:
+        job = submit(name, key, exact)
+        if job.done() and not job.cancelled():
+            kpis = job.result()
+    columns = st.columns(len(metrics))
+    if kpis is not None:
+        for column, (label, field, fmt) in zip(columns, metrics):
+            column.metric(label, fmt(getattr(kpis, field)))
+        return
+    estimates = estimate()
+    for column, (label, field, fmt) in zip(columns, metrics):
+        e = getattr(estimates, field)
+        if not isinstance(e, sampling.Estimate):
+            column.metric(label, fmt(e))
+            continue
+        column.metric(label, f"≈ {fmt(e.value)}", f"95% CI {fmt(e.low)} – {fmt(e.high)}",
+                      delta_color="off", delta_arrow="off")
+    refreshing_jobs.append(job)
 
 
 # =================================================
 # Load data based on project + uploaded file
 # =================================================
-df = None
+telemetry.stage("load")
+prepared = None
 data_source = None
 
-if uploaded_file is not None:
-    df, data_source = load_data_from_upload(uploaded_file)
-    if df is not None:
-        st.sidebar.success("File loaded successfully.")
+if uploaded_files:
+    try:
+        prepared, data_source = load_data_from_uploads(uploaded_files)
+    except Exception as e:
+        st.error("Error reading the uploaded file. Check that it is a valid CSV.")
+        st.code(str(e))
+        st.stop()
+    if prepared is not None:
+        st.sidebar.success("File loaded successfully." if len(uploaded_files) == 1 else f"{len(uploaded_files)} files loaded successfully.")
+elif import_pattern:
+    try:
+        prepared, data_source = load_data_from_folder(import_pattern)
+    except Exception as e:
+        st.error(f"Error importing `{import_pattern}`. Check that the files are valid CSVs.")
+        st.code(str(e))
+        st.stop()
+    if prepared is not None:
+        st.sidebar.success(f"Loaded `{import_pattern}`.")
+elif DATABASE_URL:
+    try:
+        prepared = load_database_table(DATABASE_URL, DATABASE_TABLES[project], DATABASE_DASHBOARDS[project])
+        data_source = "database"
+        st.sidebar.info(f"Reading `{DATABASE_TABLES[project]}` from the database.")
+    except Exception as e:
+        st.error(f"Error loading `{DATABASE_TABLES[project]}` from the database. Check `DATABASE_URL`.")
+        st.code(str(e))
+        st.stop()
 elif project == "Retail Sales Optimization (Canada)":
     try:
-        df = load_builtin_retail()
+        prepared = load_builtin_retail(columnar_cache.cache_path(RETAIL_CSV))
         data_source = "builtin_retail"
     except Exception as e:
         st.error("Error loading built‑in retail data. Check that `data/retail_sales_canada_cleaned.csv` exists.")
@@ -198,7 +469,7 @@ elif project == "Retail Sales Optimization (Canada)":
         st.stop()
 elif project == "Supply Chain Efficiency (North America)":
     try:
-        df = load_builtin_supply_chain()
+        prepared = load_builtin_supply_chain(columnar_cache.cache_path(SUPPLY_CHAIN_CSV))
         data_source = "builtin_supply_chain"
     except Exception as e:
         st.error("Error loading built‑in supply chain data. Check that `data/supply_chain_usa_cleaned.csv` exists.")
@@ -206,7 +477,7 @@ elif project == "Supply Chain Efficiency (North America)":
         st.stop()
 elif project == "Customer Support Time Reduction (North America)":
     try:
-        df = load_builtin_support()
+        prepared = load_builtin_support(columnar_cache.cache_path(SUPPORT_CSV))
         data_source = "builtin_support"
     except Exception as e:
         st.error("Error loading built‑in support data. Check that `data/customer_support_tickets_cleaned.csv` exists.")
@@ -215,11 +486,33 @@ elif project == "Customer Support Time Reduction (North America)":
 
 
 # If no data is loaded at all
-if df is None:
+if prepared is None:
     st.warning("No data loaded. Please upload a CSV file or ensure the built‑in data files are in the correct location.")
     st.image("https://docs.streamlit.io/assets/images/undraw_uploading_re_m6qf.svg", width=300)
     st.stop()
 
+# The render code below only reads: dates, categories and sort order were
+# set up once by the prepared-dataset stage.
+df = prepared.view()
+dataset_version = prepared.version
+telemetry.set_view(project)
+telemetry.stage("memory_report")
+
+# Pod sizing: the prepared dataset is held once per server process, while
+# each session only adds what its view does not share with it.
+usage = prepared.memory_usage()
+st.sidebar.caption(
+    f"Dataset memory: {(usage['mapped'] + usage['heap']) / 2**20:,.1f} MB shared by all sessions "
+    f"({usage['mapped'] / 2**20:,.1f} MB memory-mapped). "
+    f"This session holds {datasets.private_bytes(df, prepared.frame) / 2**20:,.1f} MB."
+)
+figures = load_figure_cache()
+approximate = st.sidebar.toggle(
+    "Approximate KPIs",
+    value=APPROXIMATE_KPIS,
+    key="approximate_kpis",
+    help="Show KPIs estimated from a sample right away, refined to exact values in the background.",
+)
 
 # =================================================
 # 1. Retail Sales Optimization (Canada)
@@ -231,32 +524,29 @@ if project == "Retail Sales Optimization (Canada)":
     )
 
     # Auto‑detect columns (if uploaded) or use hardcoded ones
-    date_col = "sales_date" if "sales_date" in df.columns else df.select_dtypes(include="datetime").columns[0] if not df.select_dtypes(include="datetime").empty else None
+    telemetry.stage("roles")
+    roles = detect_roles(dataset_version, "retail", df)
+    date_col = roles["date"] or prepared.date_col
     if date_col is None:
         st.error("No datetime column found for sales date.")
         st.stop()
 
-    df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
-    df["month_year"] = df[date_col].dt.to_period("M").astype(str)
-
-    cat_col = "product_category" if "product_category" in df.columns else st.selectbox("Select product category column", df.select_dtypes(include="object").columns)
-    revenue_cols = [c for c in df.columns if "revenue" in c.lower() or "sales" in c.lower()]
-    revenue_col = revenue_cols[0] if revenue_cols else st.selectbox("Select revenue column", df.select_dtypes(include="number").columns)
+    cat_col = roles["category"] or choose_column("Select product category column", dataset_version, df, schema.FILTER_KINDS)
+    revenue_col = roles["revenue"] or choose_column("Select revenue column", dataset_version, df, ("numeric",))
 
     # Filters
+    telemetry.stage("filter_widgets")
     st.sidebar.header("Retail Filters")
     cat_options = df[cat_col].unique()
     categories = st.sidebar.multiselect("Product Category", cat_options, default=cat_options)
 
-    city_cols = [c for c in df.columns if "city" in c.lower()]
-    city_col = city_cols[0] if city_cols else None
+    city_col = roles["city"]
     if city_col:
         cities = st.sidebar.multiselect("City", df[city_col].unique(), default=df[city_col].unique())
     else:
         cities = None
 
-    province_cols = [c for c in df.columns if "province" in c.lower() or "state" in c.lower()]
-    province_col = province_cols[0] if province_cols else None
+    province_col = roles["province"]
     if province_col:
         provinces = st.sidebar.multiselect("Province", df[province_col].unique(), default=df[province_col].unique())
     else:
@@ -265,52 +555,65 @@ if project == "Retail Sales Optimization (Canada)":
     start_date = st.sidebar.date_input("Start Date", value=df[date_col].min())
     end_date = st.sidebar.date_input("End Date", value=df[date_col].max())
 
-    # Apply filters
-    mask = (
-        (df[cat_col].isin(categories)) &
-        (df[date_col] >= pd.to_datetime(start_date)) &
-        (df[date_col] <= pd.to_datetime(end_date))
-    )
-    if city_col: mask &= df[city_col].isin(cities)
-    if province_col: mask &= df[province_col].isin(provinces)
+    # Apply filters through the query engine (rollup cube: day x category x city x province)
+    telemetry.stage("query")
+    columns = {**roles, "date": date_col, "category": cat_col, "revenue": revenue_col}
+    spec = analytics.FilterSpec({"category": categories, "city": cities, "province": provinces}, start_date, end_date)
+    dimensions, measures = analytics.dimensions("retail", columns), analytics.measures("retail", columns)
+    engine = load_query_engine(dataset_version, df, date_col, dimensions, measures)
+    filtered = analytics.select(engine, columns, spec)
+    chart_filters = {**spec.by_column(columns), "start": start_date, "end": end_date}
+
+    def exact_kpis():
+        return analytics.retail_kpis(filtered, columns)
 
-    filtered = df[mask]
+    def estimated_kpis():
+        sample = load_sample(dataset_version, df, date_col, dimensions, measures)
+        return analytics.retail_kpis(analytics.select(sample, columns, spec), columns)
 
     # KPIs
+    telemetry.stage("kpis")
     st.subheader("Key Metrics")
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Total Revenue (CAD)", f"${filtered[revenue_col].sum():,.0f}")
-    col2.metric("Avg Revenue per Transaction", f"${filtered[revenue_col].mean():,.2f}")
-    col3.metric("Total Transactions", len(filtered))
+    show_kpis("retail_kpis", [
+        ("Total Revenue (CAD)", "total_revenue", lambda v: f"${v:,.0f}"),
+        ("Avg Revenue per Transaction", "avg_revenue", lambda v: f"${v:,.2f}"),
+        ("Total Transactions", "transactions", lambda v: f"{v:.0f}"),
+    ], chart_filters, exact_kpis, estimated_kpis)
 
     # Sales over time
+    telemetry.stage("trend_figure")
     st.subheader("Sales Trend")
-    sales_by_date = filtered.groupby(date_col)[revenue_col].sum().reset_index()
-    fig1 = px.line(
-        sales_by_date,
+    fig1 = background_figure(("retail_trend", date_col, revenue_col), chart_filters, lambda: charts.line(
+        analytics.daily_revenue(filtered, columns),
         x=date_col,
         y=revenue_col,
         title="Daily Net Revenue",
         labels={revenue_col: "Net Revenue (CAD)"},
-    )
+    ))
+    telemetry.stage("trend_chart")
     st.plotly_chart(fig1, use_container_width=True)
 
     # Top categories
+    telemetry.stage("top_table")
     st.subheader("Top Categories by Revenue")
-    top_cats = (
-        filtered.groupby(cat_col)[revenue_col]
-        .agg(["sum", "count"])
-        .sort_values("sum", ascending=False)
-    )
+
+    def top_categories():
+        table = analytics.top_categories(filtered, columns)
+        return table, figures.get(dataset_version, ("retail_top_categories", cat_col, revenue_col), chart_filters, lambda: px.bar(
+            table.reset_index(),
+            x=cat_col,
+            y="sum",
+            title="Revenue by Product Category",
+            labels={"sum": "Net Revenue (CAD)"},
+        ))
+
+    top_key = (dataset_version, "retail_top_categories", cat_col, revenue_col, charts.filter_key(chart_filters))
+    (top_cats, fig2), refreshing = in_background("retail_top_categories", top_key, top_categories)
+    if refreshing:
+        refreshing_badge()
     st.dataframe(top_cats)
 
-    fig2 = px.bar(
-        top_cats.reset_index(),
-        x=cat_col,
-        y="sum",
-        title="Revenue by Product Category",
-        labels={"sum": "Net Revenue (CAD)"},
-    )
+    telemetry.stage("top_chart")
     st.plotly_chart(fig2, use_container_width=True)
 
 
@@ -323,71 +626,80 @@ elif project == "Supply Chain Efficiency (North America)":
         "Analyzing delivery performance for a **North American logistics network** to reduce delays and costs."
     )
 
-    date_col = "shipment_date" if "shipment_date" in df.columns else df.select_dtypes(include="datetime").columns[0]
-    df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
-
-    delivery_day_cols = [c for c in df.columns if "days" in c.lower() or "delivery" in c.lower()]
-    delivery_days_col = delivery_day_cols[0] if delivery_day_cols else st.selectbox("Select delivery days column", df.select_dtypes(include="number").columns)
-    issue_cols = [c for c in df.columns if "issue" in c.lower() or "flag" in c.lower()]
-    issue_col = issue_cols[0] if issue_cols else None
+    telemetry.stage("roles")
+    roles = detect_roles(dataset_version, "supply_chain", df)
+    date_col = roles["date"] or prepared.date_col
 
-    df["month_year"] = df[date_col].dt.to_period("M").astype(str)
+    delivery_days_col = roles["delivery_days"] or choose_column("Select delivery days column", dataset_version, df, ("numeric",))
 
     # Filters
+    telemetry.stage("filter_widgets")
     st.sidebar.header("Supply Chain Filters")
-    origin_cols = [c for c in df.columns if "origin" in c.lower()]
-    origin_col = origin_cols[0] if origin_cols else None
+    origin_col = roles["origin"]
     if origin_col:
         origins = st.sidebar.multiselect("Origin", df[origin_col].unique())
 
-    dest_cols = [c for c in df.columns if "destin" in c.lower() or "to" in c.lower()]
-    dest_col = dest_cols[0] if dest_cols else None
+    dest_col = roles["destination"]
     if dest_col:
         destinations = st.sidebar.multiselect("Destination", df[dest_col].unique())
 
-    product_type_cols = [c for c in df.columns if "product" in c.lower() or "type" in c.lower()]
-    product_type_col = product_type_cols[0] if product_type_cols else None
+    product_type_col = roles["product_type"]
     product_types = st.sidebar.multiselect(
         "Product Type",
-        df[product_type_col].unique() if product_type_col else df.select_dtypes(include="object").columns[0],
-        default=df[product_type_col].unique() if product_type_col else df.select_dtypes(include="object").columns[0],
+        df[product_type_col].unique(),
+        default=df[product_type_col].unique(),
     ) if product_type_col else None
 
-    carrier_cols = [c for c in df.columns if "carrier" in c.lower()]
-    carrier_col = carrier_cols[0] if carrier_cols else None
+    carrier_col = roles["carrier"]
     carriers = st.sidebar.multiselect(
         "Carrier",
-        df[carrier_col].unique() if carrier_col else df.select_dtypes(include="object").columns[0],
-        default=df[carrier_col].unique() if carrier_col else df.select_dtypes(include="object").columns[0],
+        df[carrier_col].unique(),
+        default=df[carrier_col].unique(),
     ) if carrier_col else None
 
-    # Apply filters
-    filtered = df.copy()
-    if origin_col and origin_cols: filtered = filtered[filtered[origin_col].isin(origins)]
-    if dest_col and dest_cols: filtered = filtered[filtered[dest_col].isin(destinations)]
-    if product_type_col and product_types: filtered = filtered[filtered[product_type_col].isin(product_types)]
+    # Apply filters through the query engine (rollup cube: day x origin x destination x product type x carrier)
+    telemetry.stage("query")
+    columns = {**roles, "date": date_col, "delivery_days": delivery_days_col}
+    spec = analytics.FilterSpec({
+        "origin": origins if origin_col else None,
+        "destination": destinations if dest_col else None,
+        "product_type": product_types or None,
+        "carrier": carriers or None,
+    })
+    selection = spec.by_column(columns)
+    dimensions, measures = analytics.dimensions("supply_chain", columns), analytics.measures("supply_chain", columns)
+    engine = load_query_engine(dataset_version, df, date_col, dimensions, measures)
+    filtered = analytics.select(engine, columns, spec)
+
+    def exact_kpis():
+        # The median is an order statistic: the pandas engine reads the matching rows.
+        return analytics.supply_chain_kpis(filtered, columns)
+
+    def estimated_kpis():
+        sample = load_sample(dataset_version, df, date_col, dimensions, measures)
+        return analytics.supply_chain_kpis(analytics.select(sample, columns, spec), columns)
 
     # KPIs
-    avg_days = filtered[delivery_days_col].mean()
-    med_days = filtered[delivery_days_col].median()
-    issues_rate = filtered[issue_col].mean() * 100 if issue_col else 0.0
-
-    col1, col2, col3, col4 = st.columns(4)
-    col1.metric("Avg Delivery Days", f"{avg_days:.1f}")
-    col2.metric("Median Delivery Days", f"{med_days:.1f}")
-    col3.metric("Issue Rate (%)", f"{issues_rate:.1f}%")
-    col4.metric("Total Shipments", len(filtered))
+    telemetry.stage("kpis")
+    show_kpis("supply_chain_kpis", [
+        ("Avg Delivery Days", "avg_delivery_days", lambda v: f"{v:.1f}"),
+        ("Median Delivery Days", "median_delivery_days", lambda v: f"{v:.1f}"),
+        # No issue column: shown as 0%.
+        ("Issue Rate (%)", "issue_rate", lambda v: f"{(v or 0.0) * 100:.1f}%"),
+        ("Total Shipments", "shipments", lambda v: f"{v:.0f}"),
+    ], selection, exact_kpis, estimated_kpis)
 
     # Time trend
+    telemetry.stage("trend_figure")
     st.subheader("Delivery Days Over Time")
-    time_trend = filtered.groupby("month_year")[delivery_days_col].mean().reset_index()
-    fig1 = px.line(
-        time_trend,
+    fig1 = background_figure(("supply_chain_trend", date_col, delivery_days_col), selection, lambda: charts.line(
+        analytics.monthly_mean(filtered, columns, "delivery_days"),
         x="month_year",
         y=delivery_days_col,
         title="Average Delivery Time by Month",
         labels={delivery_days_col: "Avg Delivery Days"},
-    )
+    ))
+    telemetry.stage("trend_chart")
     st.plotly_chart(fig1, use_container_width=True)
 
 
@@ -400,60 +712,81 @@ elif project == "Customer Support Time Reduction (North America)":
         "Analyzing ticket resolution for a **North American tech support team** to reduce resolution time and improve CSAT."
     )
 
-    date_col = "opened_at" if "opened_at" in df.columns else df.select_dtypes(include="datetime").columns[0]
-    df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
-
-    closed_cols = [c for c in df.columns if "closed" in c.lower()]
-    closed_col = closed_cols[0] if closed_cols else None
+    telemetry.stage("roles")
+    roles = detect_roles(dataset_version, "support", df)
+    date_col = roles["date"] or prepared.date_col
 
-    res_col = "resolution_hours" if "resolution_hours" in df.columns else st.selectbox("Select resolution time column (hours)", df.select_dtypes(include="number").columns)
+    closed_col = roles["closed"]
 
-    df["month_year"] = df[date_col].dt.to_period("M").astype(str)
+    res_col = roles["resolution"] or choose_column("Select resolution time column (hours)", dataset_version, df, ("numeric",))
 
     # Filters
+    telemetry.stage("filter_widgets")
     st.sidebar.header("Support Filters")
-    team_cols = [c for c in df.columns if "team" in c.lower()]
-    team_col = team_cols[0] if team_cols else None
+    team_col = roles["team"]
     if team_col:
         teams = st.sidebar.multiselect("Agent Team", df[team_col].unique())
 
-    cat_cols = [c for c in df.columns if "category" in c.lower() or "type" in c.lower()]
-    cat_col = cat_cols[0] if cat_cols else None
+    cat_col = roles["category"]
     categories = st.sidebar.multiselect(
         "Ticket Category",
-        df[cat_col].unique() if cat_col else df.select_dtypes(include="object").columns[0],
-        default=df[cat_col].unique() if cat_col else df.select_dtypes(include="object").columns[0],
+        df[cat_col].unique(),
+        default=df[cat_col].unique(),
     ) if cat_col else None
 
-    # Apply filters
-    filtered = df.copy()
-    if team_col and team_cols: filtered = filtered[filtered[team_col].isin(teams)]
-    if cat_col and cat_cols: filtered = filtered[filtered[cat_col].isin(categories)]
+    # Apply filters through the query engine (rollup cube: day x team x category x priority)
+    telemetry.stage("query")
+    columns = {**roles, "date": date_col, "resolution": res_col}
+    spec = analytics.FilterSpec({
+        "team": teams if team_col else None,
+        "category": categories if cat_col else None,
+    })
+    selection = spec.by_column(columns)
+    dimensions, measures = analytics.dimensions("support", columns), analytics.measures("support", columns)
+    engine = load_query_engine(dataset_version, df, date_col, dimensions, measures)
+    filtered = analytics.select(engine, columns, spec)
+
+    def exact_kpis():
+        return analytics.support_kpis(filtered, columns)
+
+    def estimated_kpis():
+        sample = load_sample(dataset_version, df, date_col, dimensions, measures)
+        return analytics.support_kpis(analytics.select(sample, columns, spec), columns)
 
     # KPIs
-    avg_hours = filtered[res_col].mean()
-    med_hours = filtered[res_col].median()
-    csat_cols = [c for c in df.columns if "csat" in c.lower()]
-    csat_col = csat_cols[0] if csat_cols else None
-    csat = filtered[csat_col].mean() if csat_col else 0.0
-
-    col1, col2, col3 = st.columns(3)
-    col1.metric("Avg Resolution Time (hrs)", f"{avg_hours:.1f}")
-    col2.metric("Median Resolution Time (hrs)", f"{med_hours:.1f}")
-    col3.metric("Resolved Tickets", len(filtered))
+    telemetry.stage("kpis")
+    show_kpis("support_kpis", [
+        ("Avg Resolution Time (hrs)", "avg_resolution_hours", lambda v: f"{v:.1f}"),
+        ("Median Resolution Time (hrs)", "median_resolution_hours", lambda v: f"{v:.1f}"),
+        ("Resolved Tickets", "tickets", lambda v: f"{v:.0f}"),
+    ], selection, exact_kpis, estimated_kpis)
 
     # Time trend
+    telemetry.stage("trend_figure")
     st.subheader("Resolution Time Over Time")
-    time_trend = filtered.groupby("month_year")[res_col].mean().reset_index()
-    fig1 = px.line(
-        time_trend,
+    fig1 = background_figure(("support_trend", date_col, res_col), selection, lambda: charts.line(
+        analytics.monthly_mean(filtered, columns, "resolution"),
         x="month_year",
         y=res_col,
         title="Avg Resolution Time by Month",
         labels={res_col: "Avg Resolution Time (hours)"},
-    )
+    ))
+    telemetry.stage("trend_chart")
     st.plotly_chart(fig1, use_container_width=True)
 
-if project == "Retail Sales Optimization (Canada)":
-    uploaded_file = st.sidebar.file_uploader("Upload retail CSV", type="csv")
-    df = load_retail_data(uploaded_file)
+
+if refreshing_jobs:
+    rerun_when_done(refreshing_jobs)
+
+
+# =================================================
+# Timing panel (opt-in)
+# =================================================
+trace = telemetry.finish()
+if trace is not None:
+    with st.sidebar.expander(f"⏱️ Rerun timing: {trace.seconds * 1000:,.0f} ms"):
+        st.dataframe(trace.spans_frame(), hide_index=True)
+        if trace.cache_calls:
+            st.caption("Cached loaders")
+            st.dataframe(trace.cache_frame(), hide_index=True)
+        st.caption(f"Figure cache: {figures.hits} hits, {figures.misses} misses.")
@@ -0,0 +1,291 @@
+"""
+Headless benchmark of the dashboard pipeline on synthetic data.
+
+For every dataset and size, the data from sample_data's generators goes
+through the stages of a dashboard rerun, each timed on its own:
+
+    csv_load     pd.read_csv of the data written as CSV
+    dates        parsing the date columns (format inference included)
+    prepare      category encoding and date sort (datasets.prepare_frame)
+    filter_mask  a typical filter state on the raw rows, cold
+    groupby      building the rollup cube over the dashboard's dimensions
+    kpi          KPI totals of the filtered cube plus the row median
+    figure       the trend chart (charts.line)
+    figure_json  serializing it as Plotly JSON, as Streamlit does
+    deck         the pp.py slide content of the dataset (deck.py)
+    deck_json    serializing the deck figures
+
+Every size runs in a fresh worker process, so a large run does not inflate
+the next one's memory. The peak RSS of each stage is measured on its own
+where the kernel lets a process reset its high-water mark (Linux); elsewhere
+it is the peak of the process so far.
+
+    python benchmark.py --rows 10000 1000000 --out bench.json
+    python benchmark.py --compare baseline.json bench.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.graph_objects as go
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+import charts
+import columnar_cache
+import datasets
+import deck
+import filters
+import rollups
+import sample_data
+
+SIZES = (10_000, 1_000_000, 10_000_000, 50_000_000)
+# A stage at least this many times slower than in the baseline is reported
+# as a regression by --compare.
+REGRESSION_RATIO = 1.2
+# Results go next to the other generated files, which git ignores.
+OUT = os.path.join(columnar_cache.CACHE_DIR, "benchmark.json")
+
+# Per dataset: date column, filter dimensions, KPI measure, the filter
+# state of the timed selection and the deck builder of its slides.
+DASHBOARDS = {
+    "retail": {
+        "date": "sales_date",
+        "dimensions": ("product_category", "city", "province"),
+        "measure": "net_revenue",
+        "filters": {"product_category": sample_data.RETAIL_CATEGORIES[:2]},
+        "deck": lambda df: {**deck.retail_dashboard(df), **deck.province_analysis(df)},
+    },
+    "supply_chain": {
+        "date": "shipment_date",
+        "dimensions": ("origin_state", "destination_state", "product_type", "carrier"),
+        "measure": "delivery_days",
+        "filters": {"carrier": sample_data.CARRIERS[:2]},
+        "deck": deck.supply_chain_dashboard,
+    },
+    "support": {
+        "date": "opened_at",
+        "dimensions": ("agent_team", "category", "priority"),
+        "measure": "resolution_hours",
+        "filters": {"agent_team": sample_data.TEAMS[:2]},
+        "deck": deck.support_dashboard,
+    },
+}
+# The timed date range: March to October of the default year.
+START, END = "2024-03-01", "2024-10-31"
+
+
+def _reset_peak_rss():
+    # Writing 5 to clear_refs resets VmHWM, the process's peak RSS (Linux).
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MiB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS.
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+class _Timer:
+    def __init__(self, dataset, rows):
+        self.dataset = dataset
+        self.rows = rows
+        self.records = []
+
+    @contextmanager
+    def stage(self, name):
+        _reset_peak_rss()
+        start = time.perf_counter()
+        yield
+        self.records.append({
+            "dataset": self.dataset,
+            "rows": self.rows,
+            "stage": name,
+            "seconds": round(time.perf_counter() - start, 6),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        })
+
+
+def write_csv(df, path):
+    """
+    Writes df as CSV the way the built-in exports look: dates without a
+    time are written as YYYY-MM-DD, other timestamps to the second.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    columns = []
+    for name, column in zip(table.column_names, table.columns):
+        if pa.types.is_timestamp(column.type):
+            values = df[name]
+            fmt = "%Y-%m-%d" if (values.dt.normalize() == values).all() else "%Y-%m-%d %H:%M:%S"
+            # %S of a finer unit has the fraction too; whole seconds are kept.
+            column = pc.strftime(column.cast(pa.timestamp("s", column.type.tz), safe=False), format=fmt)
+        elif pa.types.is_dictionary(column.type):
+            column = column.cast(column.type.value_type)
+        columns.append(column)
+    pa_csv.write_csv(pa.table(columns, names=table.column_names), path)
+
+
+def run(dataset, rows, workdir):
+    """Timings of every stage for one dataset and size, as a list of records."""
+    spec = DASHBOARDS[dataset]
+    generate = sample_data.GENERATORS[dataset][0]
+    path = os.path.join(workdir, f"{dataset}-{rows}.csv")
+    write_csv(generate(rows), path)
+    timer = _Timer(dataset, rows)
+    try:
+        with timer.stage("csv_load"):
+            df = pd.read_csv(path)
+    finally:
+        os.remove(path)
+
+    date_columns = [c for c in datasets.DATE_COLUMNS if c in df.columns]
+    with timer.stage("dates"):
+        formats = {}
+        for c in date_columns:
+            formats[c] = datasets.infer_date_format(df[c].head(datasets.DATE_FORMAT_SAMPLE))
+            df[c] = datasets.parse_dates(df[c], formats[c])
+        df.attrs["date_formats"] = formats
+    with timer.stage("prepare"):
+        df, date_col = datasets.prepare_frame(df)
+
+    selection = spec["filters"]
+    end = pd.Timestamp(END) + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+    measure = spec["measure"]
+    with timer.stage("filter_mask"):
+        mask = filters.FilterEngine(df).mask(selection, date_col, START, end)
+    with timer.stage("groupby"):
+        cube = rollups.RollupCube.build(df, date_col, spec["dimensions"], (measure,))
+    with timer.stage("kpi"):
+        selected = cube.select(selection, START, END)
+        selected.total(measure)
+        df[measure][mask].median()
+    with timer.stage("figure"):
+        trend = selected.group(date_col, measure)["sum"].rename(measure).reset_index()
+        fig = charts.line(trend, x=date_col, y=measure)
+    with timer.stage("figure_json"):
+        plotly.io.to_json(fig, validate=False)
+    with timer.stage("deck"):
+        slides = spec["deck"](df)
+    with timer.stage("deck_json"):
+        for value in slides.values():
+            if isinstance(value, go.Figure):
+                plotly.io.to_json(value, validate=False)
+    return timer.records
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def environment():
+    """What the numbers depend on besides the code: versions and hardware."""
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "packages": {"numpy": np.__version__, "pandas": pd.__version__,
+                     "pyarrow": pa.__version__, "plotly": plotly.__version__},
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def benchmark(dataset_names, sizes, workdir=None):
+    """Runs every dataset at every size, each in a fresh worker process."""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="benchmark-", dir=workdir) as tmp:
+        for rows in sizes:
+            for dataset in dataset_names:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    records = pool.submit(run, dataset, rows, tmp).result()
+                for r in records:
+                    print(f"{dataset:<13} {rows:>11,} {r['stage']:<12} {r['seconds']:>9.3f}s {r['peak_rss_mb']:>9.1f} MiB")
+                results += records
+    return {"environment": environment(), "results": results}
+
+
+def compare(baseline, current, ratio=REGRESSION_RATIO):
+    """
+    Prints the stages of current next to the same stages of baseline and
+    returns the (dataset, rows, stage) keys that got at least ratio times slower.
+    """
+    def key(r):
+        return r["dataset"], r["rows"], r["stage"]
+
+    before = {key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        old = before.get(key(r))
+        if old is None:
+            continue
+        change = r["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        flag = ""
+        if change >= ratio:
+            regressions.append(key(r))
+            flag = "  REGRESSION"
+        print(f"{r['dataset']:<13} {r['rows']:>11,} {r['stage']:<12} {old['seconds']:>9.3f}s -> {r['seconds']:>9.3f}s "
+              f"x{change:.2f}  RSS {old['peak_rss_mb']:.0f} -> {r['peak_rss_mb']:.0f} MiB{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard pipeline on synthetic data.")
+    parser.add_argument("--datasets", nargs="+", choices=sorted(DASHBOARDS), default=sorted(DASHBOARDS))
+    parser.add_argument("--rows", nargs="+", type=int, default=list(SIZES), help="dataset sizes to run")
+    parser.add_argument("--out", default=OUT, help=f"JSON file for the results (default: {OUT})")
+    parser.add_argument("--workdir", default=None, help="directory for the temporary CSV files")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="compare two result files instead of running")
+    parser.add_argument("--ratio", type=float, default=REGRESSION_RATIO,
+                        help="slowdown reported as a regression by --compare")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            baseline = json.load(f)
+        with open(args.compare[1]) as f:
+            current = json.load(f)
+        return 1 if compare(baseline, current, args.ratio) else 0
+
+    results = benchmark(args.datasets, args.rows, args.workdir)
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+"""
+Server-side downsampling for the line charts.
+
+Aggregated series are reduced to roughly one point per horizontal pixel of
+the chart before they are handed to Plotly, so the JSON sent to the
+browser stays small however long the date range is. Two reducers are
+available:
+
+- LTTB (largest triangle three buckets) keeps the visually significant
+  points, peaks and troughs included, and is the default.
+- min-max keeps the lowest and highest point of every bucket, which is
+  cheaper and guarantees the extremes survive.
+
+Traces that are still large after that (many groups, or an explicit
+higher cap) are drawn with WebGL (Scattergl) instead of SVG.
+
+Built figures are kept in a FigureCache keyed by dataset version, chart id
+and normalized filter state, so revisiting a slide or a filter combination
+skips the aggregation and figure construction.
+"""
+import datetime
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+# Width in pixels assumed for a full-width chart (the browser does not tell
+# the server how wide it really is).
+CHART_WIDTH = int(os.environ.get("CHART_WIDTH_PX", "1200"))
+POINTS_PER_PIXEL = 1
+# Charts with more points than this switch to WebGL rendering.
+WEBGL_MIN_POINTS = int(os.environ.get("WEBGL_MIN_POINTS", "1500"))
+# Upper bound on the estimated size of all cached figures (see _figure_bytes).
+FIGURE_CACHE_BYTES = int(os.environ.get("FIGURE_CACHE_MB", "64")) * 2**20
+
+
+def max_points(width=None):
+    """Point budget per trace for a chart width in pixels."""
+    return max(3, int((width or CHART_WIDTH) * POINTS_PER_PIXEL))
+
+
+def _positions(x):
+    # x as float64 positions: datetimes as nanoseconds, text (e.g. month
+    # labels) as row numbers.
+    x = pd.Series(x)
+    if pd.api.types.is_datetime64_any_dtype(x.dtype):
+        return x.to_numpy(dtype="datetime64[ns]").astype("int64").astype("float64")
+    if pd.api.types.is_numeric_dtype(x.dtype):
+        return x.to_numpy(dtype="float64", na_value=np.nan)
+    return np.arange(len(x), dtype="float64")
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Positions of the n_out points LTTB keeps from the series (x, y), which
+    must be sorted by x. The first and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # n_out - 2 buckets between the fixed first and last points.
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        # Twice the area of the triangle (previous pick, candidate, average
+        # of the next bucket); the largest one wins.
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def minmax_indices(x, y, n_out):
+    """
+    Positions of the minimum and maximum of each of n_out // 2 equal-count
+    buckets, plus the first and last points, in ascending order.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    starts = np.arange(n_out // 2) * n // (n_out // 2)
+    ends = np.append(starts[1:], n)
+    picks = [0, n - 1]
+    for lo, hi in zip(starts, ends):
+        segment = y[lo:hi]
+        picks += [lo + int(segment.argmin()), lo + int(segment.argmax())]
+    return np.unique(picks)
+
+
+METHODS = {"lttb": lttb_indices, "minmax": minmax_indices}
+
+
+def downsample(df, x, y, n_out=None, method="lttb", group=None):
+    """
+    Rows of df (sorted by x) kept when each trace, one per value of the
+    group column if given, is reduced to at most n_out points. Traces that
+    already fit are left untouched; larger ones lose their missing y values.
+    """
+    n_out = n_out or max_points()
+    reduce = METHODS[method]
+    parts = [df] if group is None else [part for _, part in df.groupby(group, observed=True, sort=False)]
+    keep = []
+    for part in parts:
+        if len(part) > n_out:
+            part = part[part[y].notna()]
+            part = part.iloc[reduce(_positions(part[x]), part[y].to_numpy(dtype="float64"), n_out)]
+        keep.append(part)
+    return keep[0] if len(keep) == 1 else pd.concat(keep) if keep else df
+
+
+def line(df, x, y, width=None, method="lttb", **kwargs):
+    """
+    px.line over df after downsampling every trace to the point budget of
+    a chart `width` pixels wide; large results are rendered with WebGL.
+    """
+    data = downsample(df, x, y, max_points(width), method, kwargs.get("color"))
+    render_mode = "webgl" if len(data) > WEBGL_MIN_POINTS else "svg"
+    return px.line(data, x=x, y=y, render_mode=render_mode, **kwargs)
+
+
+def _normalize(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (datetime.date, np.datetime64)):
+        return pd.Timestamp(value)
+    if isinstance(value, (list, tuple, set, frozenset, np.ndarray, pd.Index, pd.Series)):
+        return frozenset("<NA>" if pd.isna(v) else v for v in value)
+    return value
+
+
+def filter_key(filters):
+    """
+    Hashable form of a filter state ({name: value}) that does not depend on
+    the order of the names or of multiselect values; dates become Timestamps.
+    """
+    return frozenset((name, _normalize(value)) for name, value in (filters or {}).items())
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            # Text such as month labels, sized from its first value.
+            return value.size * (8 + len(str(value.flat[0]))) if value.size else 0
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(len(k) + _nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(v) for v in value)
+    return len(str(value))
+
+
+def _figure_bytes(fig):
+    # Approximate size of fig without serializing it: the bytes of the
+    # traces' data arrays plus the text of every other property.
+    return sum(_nbytes(trace.to_plotly_json()) for trace in fig.data) + _nbytes(fig.layout.to_plotly_json())
+
+
+class FigureCache:
+    """
+    LRU cache of built figures, bounded by their total estimated size.
+
+    Figures are shared between sessions, so callers must not modify a
+    figure they get back; layout tweaks belong in the build function.
+    """
+
+    def __init__(self, max_bytes=FIGURE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version, chart_id, filters, build):
+        """The figure for (version, chart_id, filters), calling build() on a miss."""
+        key = (version, chart_id, filter_key(filters))
+        with self._lock:
+            entry = self._figures.get(key)
+            if entry is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        fig = build()
+        size = _figure_bytes(fig)
+        with self._lock:
+            self.misses += 1
+            if size <= self.max_bytes:
+                old = self._figures.pop(key, None)
+                if old is not None:
+                    self.nbytes -= old[1]
+                self._figures[key] = (fig, size)
+                self.nbytes += size
+                while self.nbytes > self.max_bytes:
+                    _, (_, evicted) = self._figures.popitem(last=False)
+                    self.nbytes -= evicted
+        return fig
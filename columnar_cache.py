@@ -0,0 +1,418 @@
+"""
+Persistent columnar cache for the CSV-backed datasets.
+
+A parsed DataFrame is written once as an uncompressed Arrow IPC (Feather v2)
+file and memory-mapped on later reads, so a server restart does not have to
+re-parse the CSV. Dates keep their datetime64 dtype and category columns are
+stored as Arrow dictionaries, so nothing is re-derived on the way back in.
+
+Cache entries are keyed by the source path, modification time and size; a
+changed source file simply gets a new entry and the stale one is removed.
+Generated sample data is cached the same way, keyed by its parameters.
+
+Sources that only grow (CSV exports that get rows appended) can be loaded
+incrementally: every entry records a watermark, the byte offset of the
+source it was built from, and a hash of every byte before it. A later load
+whose source still begins with exactly those bytes parses just the lines
+after the watermark; the rows already in the cache are copied over from
+the mapped entry without being parsed again. Any other change (an edited
+or truncated file) rebuilds the entry.
+
+The date format each text column was parsed with is stored as field
+metadata of the entry, so parsing appended lines (or re-ingesting the
+source) uses the recorded format instead of inferring it again. The date
+column the rows are sorted by is stored in the schema metadata, so a
+prepared entry is used as mapped instead of being checked and sorted
+again on every load; appended rows that would break that order rebuild
+the entry instead.
+
+Reads are zero-copy: numeric, date, category-code and string columns point
+straight into the mapped file, so every session (and every server process)
+reading an entry shares the same OS page-cache pages instead of holding
+its own heap copy.
+"""
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+CACHE_DIR = os.environ.get("DATASET_CACHE_DIR", os.path.join("data", ".cache"))
+# Bumped whenever the prepared layout changes, so old entries are rebuilt.
+FORMAT_VERSION = 2
+# Uploads live apart from the built-in entries, whose stale versions are
+# pruned by file name.
+UPLOAD_DIR = os.path.join(CACHE_DIR, "uploads")
+# Generated sample data, one entry per parameter set (never pruned).
+SAMPLE_DIR = os.path.join(CACHE_DIR, "samples")
+# Folders and globs of CSV files ingested as one dataset.
+IMPORT_DIR = os.path.join(CACHE_DIR, "imports")
+
+# Field metadata key of the format a date column was parsed with.
+DATE_FORMAT_KEY = b"date_format"
+# Schema metadata key of the absolute path of the source file of an entry.
+SOURCE_KEY = b"source"
+# Schema metadata key of the date column the rows are sorted by (missing
+# dates last), see datasets.sort_by_date.
+SORTED_KEY = b"sorted_by"
+
+# Address range of the latest mapping of each cache file, so memory reports
+# can tell mapped bytes from heap bytes.
+_mappings = {}
+
+
+def source_key(path):
+    """Cache key for a source file: absolute path + mtime + size."""
+    stat = os.stat(path)
+    raw = f"{FORMAT_VERSION}|{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def params_key(*params):
+    """Cache key for data generated from parameters rather than read from a file."""
+    raw = "|".join(str(p) for p in (FORMAT_VERSION,) + params)
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def content_key(fileobj, block_size=1 << 20):
+    """Cache key for an in-memory upload, hashed in blocks from the start."""
+    digest = hashlib.sha1()
+    fileobj.seek(0)
+    for block in iter(lambda: fileobj.read(block_size), b""):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()[:16]
+
+
+def entry_path(name, key, cache_dir=None):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return os.path.join(cache_dir or CACHE_DIR, f"{stem}-{key}.arrow")
+
+
+def cache_path(path, cache_dir=None):
+    return entry_path(path, source_key(path), cache_dir)
+
+
+def map_table(path):
+    """Memory-maps a cached Arrow file as a zero-copy pyarrow Table."""
+    with pa.memory_map(path, "r") as source:
+        # The buffers keep the mapping alive after the file is closed.
+        whole = source.read_buffer(source.size())
+        _mappings[os.path.abspath(path)] = (whole.address, whole.size)
+        source.seek(0)
+        return pa.ipc.open_file(source).read_all()
+
+
+def date_formats(table):
+    """{column: date format} recorded in the field metadata of an Arrow table."""
+    formats = {}
+    for field in table.schema:
+        if field.metadata and DATE_FORMAT_KEY in field.metadata:
+            formats[field.name] = field.metadata[DATE_FORMAT_KEY].decode()
+    return formats
+
+
+def with_date_formats(schema, formats):
+    """schema with formats ({column: date format}) recorded on its fields."""
+    fields = []
+    for field in schema:
+        if field.name in formats:
+            field = field.with_metadata({**(field.metadata or {}), DATE_FORMAT_KEY: formats[field.name].encode()})
+        fields.append(field)
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def sorted_by(table):
+    """The date column recorded as the sort order of an Arrow table, or None."""
+    metadata = table.schema.metadata or {}
+    return metadata[SORTED_KEY].decode() if SORTED_KEY in metadata else None
+
+
+def mapped_regions():
+    """(start address, size) of the cache files mapped by this process."""
+    return list(_mappings.values())
+
+
+def read_table(path):
+    """
+    Memory-maps a cached Arrow file and returns a DataFrame backed by the
+    mapping. split_blocks keeps pandas from consolidating same-typed
+    columns into new (copied) 2-D blocks. The recorded date formats come
+    back as df.attrs["date_formats"], the sort order as df.attrs["sorted_by"].
+    """
+    table = map_table(path)
+    df = table.to_pandas(split_blocks=True)
+    df.attrs["date_formats"] = date_formats(table)
+    if sorted_by(table) is not None:
+        df.attrs["sorted_by"] = sorted_by(table)
+    return df
+
+
+def write_table(df, path, source=None):
+    """
+    Writes df atomically, so readers never see a half-written file, with
+    df.attrs["date_formats"] recorded on the date fields and the path of
+    the source file, if any, and df.attrs["sorted_by"] in the schema
+    metadata.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    table = pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+    schema = with_date_formats(table.schema, df.attrs.get("date_formats", {}))
+    metadata = dict(schema.metadata or {})
+    if source is not None:
+        metadata[SOURCE_KEY] = os.path.abspath(source).encode()
+    if df.attrs.get("sorted_by") in df.columns:
+        metadata[SORTED_KEY] = str(df.attrs["sorted_by"]).encode()
+    schema = schema.with_metadata(metadata)
+    table = pa.Table.from_arrays(table.columns, schema=schema)
+    try:
+        feather.write_feather(table, tmp, compression="uncompressed")
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _entry_source(entry):
+    # The source path recorded in the entry's sidecar or, without one, in
+    # its schema metadata; None for entries that recorded neither.
+    try:
+        with open(_meta_path(entry)) as f:
+            return json.load(f)["source"]
+    except (OSError, ValueError, KeyError):
+        pass
+    try:
+        with pa.memory_map(entry, "r") as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    return metadata[SOURCE_KEY].decode() if SOURCE_KEY in metadata else None
+
+
+def _drop_stale(path, keep):
+    # Only entries built from this very source are removed: another file
+    # with the same name elsewhere, or one whose name merely starts the
+    # same (retail.csv and retail-2023.csv), keeps its entries.
+    directory = os.path.dirname(keep)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    source = os.path.abspath(path)
+    for name in os.listdir(directory):
+        entry = os.path.join(directory, name)
+        if not name.startswith(f"{stem}-") or not name.endswith(".arrow") or entry == keep:
+            continue
+        if _entry_source(entry) != source:
+            continue
+        for stale in (entry, _meta_path(entry)):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+# Block size of reads when hashing a source.
+HASH_BLOCK = 1 << 20
+
+
+def _meta_path(entry):
+    return f"{entry}.json"
+
+
+def _prefix_digest(handle, offset):
+    # SHA-1 of the first offset bytes of the source, every one of them:
+    # an edit anywhere in the rows already cached must rule out appending.
+    digest = hashlib.sha1()
+    handle.seek(0)
+    remaining = offset
+    while remaining:
+        block = handle.read(min(remaining, HASH_BLOCK))
+        if not block:
+            break
+        digest.update(block)
+        remaining -= len(block)
+    return digest
+
+
+def _write_meta(entry, path, offset, rows, base=None, digest=None):
+    # The watermark is only meaningful on a line boundary; an entry built
+    # from a file that ends mid-line is never appended to. digest is the
+    # hash of the source up to offset when the caller already has it.
+    with open(path, "rb") as handle:
+        handle.seek(max(offset - 1, 0))
+        if offset == 0 or handle.read(1) != b"\n":
+            return
+        if digest is None:
+            digest = _prefix_digest(handle, offset)
+    meta = {
+        "source": os.path.abspath(path),
+        "columns": list(pd.read_csv(path, nrows=0).columns),
+        "offset": offset,
+        "rows": rows,
+        "digest": digest.hexdigest(),
+        "base": base,
+    }
+    tmp = f"{_meta_path(entry)}.{os.getpid()}.tmp"
+    with open(tmp, "w") as out:
+        json.dump(meta, out)
+    os.replace(tmp, _meta_path(entry))
+
+
+def _previous_entry(path, target):
+    # The newest other entry of the same source that recorded a watermark.
+    directory = os.path.dirname(target)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    candidates = []
+    for name in os.listdir(directory) if os.path.isdir(directory) else ():
+        entry = os.path.join(directory, name)
+        if name.startswith(f"{stem}-") and name.endswith(".arrow") and entry != target and os.path.exists(_meta_path(entry)):
+            candidates.append((os.path.getmtime(entry), entry))
+    if not candidates:
+        return None, None
+    entry = max(candidates)[1]
+    with open(_meta_path(entry)) as f:
+        meta = json.load(f)
+    return (entry, meta) if meta["source"] == os.path.abspath(path) else (None, None)
+
+
+def _appended_table(table, tail):
+    """
+    table followed by the rows of the DataFrame tail, converted to table's
+    schema; dictionaries are extended so the existing codes stay valid.
+    None when tail does not fit the schema.
+    """
+    if list(tail.columns) != table.schema.names:
+        return None
+    table = table.unify_dictionaries()
+    columns = []
+    try:
+        for i, field in enumerate(table.schema):
+            column = table.column(i)
+            values = tail[field.name]
+            if pa.types.is_dictionary(field.type):
+                known = column.chunk(0).dictionary if column.num_chunks else pa.array([], field.type.value_type)
+                categories = pd.Index(known.to_pylist(), dtype=object)
+                values = values.astype(object)
+                unseen = pd.unique(values[values.notna() & (categories.get_indexer(values) == -1)])
+                dictionary = pa.array(categories.append(pd.Index(unseen, dtype=object)), type=field.type.value_type)
+                codes = pd.Index(dictionary.to_pylist(), dtype=object).get_indexer(values)
+                chunks = [pa.DictionaryArray.from_arrays(c.indices, dictionary) for c in column.chunks]
+                chunks.append(pa.DictionaryArray.from_arrays(
+                    pa.array(codes, type=field.type.index_type, mask=codes == -1), dictionary))
+            else:
+                if pa.types.is_timestamp(field.type):
+                    values = pd.to_datetime(values, errors="coerce", format=date_formats(table).get(field.name))
+                chunks = column.chunks + [pa.array(values, type=field.type, from_pandas=True)]
+            columns.append(pa.chunked_array(chunks, type=field.type))
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+        return None
+    return pa.Table.from_arrays(columns, schema=table.schema)
+
+
+def _keeps_sort(table, tail, column):
+    # Whether the rows of table, sorted by the date column with missing
+    # dates last, stay in that order with the rows of tail appended.
+    if tail.attrs.get("sorted_by") != column:
+        return False
+    dates = tail[column].dropna()
+    if dates.empty or table.num_rows == 0:
+        return True
+    last = table.column(column)[-1].as_py()
+    return last is not None and pd.Timestamp(last) <= dates.iloc[0]
+
+
+def _append_entry(path, target, parse_tail):
+    """
+    Builds target from the previous entry of path plus the lines appended
+    to path since, and returns True; False when there is no usable
+    previous entry, the file changed other than by appending or the new
+    rows would break the entry's date order.
+    """
+    entry, meta = _previous_entry(path, target)
+    if entry is None or "digest" not in meta:
+        return False
+    offset = meta["offset"]
+    with open(path, "rb") as handle:
+        handle.seek(0, os.SEEK_END)
+        if handle.tell() < offset:
+            return False
+        digest = _prefix_digest(handle, offset)
+        if digest.hexdigest() != meta["digest"]:
+            return False
+        handle.seek(offset)
+        data = handle.read()
+    # A partially written last line waits for the next load.
+    data = data[: data.rfind(b"\n") + 1]
+    digest.update(data)
+    table = map_table(entry)
+    if data:
+        raw = pd.read_csv(io.BytesIO(data), header=None, names=meta["columns"])
+        tail = parse_tail(raw, date_formats(table))
+        if sorted_by(table) is not None and not _keeps_sort(table, tail, sorted_by(table)):
+            return False
+        table = _appended_table(table, tail.reset_index(drop=True))
+        if table is None:
+            return False
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    _write_meta(target, path, offset + len(data), table.num_rows,
+                base={"entry": entry, "rows": meta["rows"]}, digest=digest)
+    return True
+
+
+def appended_to(entry):
+    """
+    (previous entry, its row count) when entry was built by appending rows
+    to the previous entry, else None.
+    """
+    try:
+        with open(_meta_path(entry)) as f:
+            base = json.load(f)["base"]
+    except (OSError, ValueError, KeyError):
+        return None
+    return None if base is None else (base["entry"], base["rows"])
+
+
+def load_cached(path, parse, cache_dir=None, parse_tail=None):
+    """
+    Returns parse(path) for a source file, served from the columnar cache
+    when the file has not changed since the cache entry was written.
+
+    With parse_tail, a CSV source that only had lines appended is not
+    re-parsed: the new lines are read into a DataFrame with the CSV's
+    columns, passed through parse_tail(tail, date_formats) (which must keep
+    those columns; date_formats are the formats recorded in the previous
+    entry) and appended to it.
+    """
+    target = cache_path(path, cache_dir)
+    if not os.path.exists(target):
+        if parse_tail is None or not _append_entry(path, target, parse_tail):
+            size = os.path.getsize(path)
+            df = parse(path)
+            write_table(df, target, source=path)
+            # A file that grew while it was parsed has no exact watermark.
+            if parse_tail is not None and os.path.getsize(path) == size:
+                _write_meta(target, path, size, len(df))
+        _drop_stale(path, target)
+    # Read the fresh entry back too, so the first caller also gets the
+    # shared mapping rather than a private heap copy.
+    return read_table(target)
+
+
+def load_generated(name, params, generate, cache_dir=None):
+    """
+    Returns generate(), served from the columnar cache entry for name and
+    params (a tuple of everything the generated data depends on).
+    """
+    target = entry_path(name, params_key(name, *params), cache_dir or SAMPLE_DIR)
+    if not os.path.exists(target):
+        write_table(generate(), target)
+    return read_table(target)
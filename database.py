@@ -0,0 +1,168 @@
+"""
+Database data source: pooled connections and cached query results.
+
+A Database is opened once per URL and shared by every Streamlit session.
+Queries borrow a connection from a small pool instead of opening one, so
+a widget change costs a query and not a connect. Results are cached by
+(SQL text, parameters) for RESULT_TTL seconds. The SQL text of a
+predicate is stable across parameter values, so SQLite reuses the
+prepared statement it keeps on each pooled connection.
+
+Supported URLs (the SQLAlchemy spelling, four slashes for an absolute
+path):
+
+    sqlite:///data/analytics.db
+    duckdb:///data/analytics.duckdb
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # optional: only needed for duckdb:// URLs
+    duckdb = None
+
+POOL_SIZE = int(os.environ.get("DATABASE_POOL_SIZE", "4"))
+RESULT_TTL = float(os.environ.get("DATABASE_CACHE_TTL", "300"))
+# Prepared statements SQLite keeps per connection.
+STATEMENT_CACHE = 256
+
+
+def quote(name):
+    """Quotes an identifier (table or column name) for SQL."""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def parse_url(url):
+    """(dialect, path) of a sqlite:/// or duckdb:/// URL."""
+    dialect, sep, path = url.partition(":///")
+    if not sep or dialect not in ("sqlite", "duckdb") or not path:
+        raise ValueError(f"unsupported database URL {url!r}; expected sqlite:///path or duckdb:///path")
+    return dialect, path
+
+
+class ConnectionPool:
+    """
+    At most `size` DB-API connections, created on demand and reused. A
+    connection that raised is closed instead of going back to the pool.
+    """
+
+    def __init__(self, connect, size=POOL_SIZE, timeout=30.0):
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.timeout = timeout
+        self.created = 0
+
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"no database connection became free within {self.timeout}s")
+        try:
+            try:
+                con = self._idle.get_nowait()
+            except queue.Empty:
+                con = self._connect()
+                self.created += 1
+            try:
+                yield con
+            except Exception:
+                con.close()
+                raise
+            self._idle.put(con)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class ResultCache:
+    """LRU of query results that also expire ttl seconds after they were stored."""
+
+    def __init__(self, ttl=RESULT_TTL, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._results.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._results.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._results[key] = (time.monotonic() + self.ttl, value)
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+class Database:
+    """A read-only database behind a connection pool and a result cache."""
+
+    def __init__(self, url, pool_size=POOL_SIZE, ttl=RESULT_TTL):
+        self.url = url
+        self.dialect, self.path = parse_url(url)
+        if self.dialect == "duckdb":
+            if duckdb is None:
+                raise ImportError("duckdb:// URLs need the duckdb package (pip install duckdb)")
+            # DuckDB cursors are independent connections to one database.
+            self._base = duckdb.connect(self.path, read_only=True)
+            connect = self._base.cursor
+        else:
+            if not os.path.exists(self.path):
+                raise FileNotFoundError(self.path)
+            connect = self._connect_sqlite
+        self.pool = ConnectionPool(connect, pool_size)
+        self.cache = ResultCache(ttl)
+
+    def _connect_sqlite(self):
+        # Pooled connections move between session threads, one at a time.
+        return sqlite3.connect(f"file:{self.path}?mode=ro", uri=True,
+                               check_same_thread=False, cached_statements=STATEMENT_CACHE)
+
+    def query(self, sql, params=()):
+        """Rows (a list of tuples) of a parameterized query, cached by SQL and parameters."""
+        key = (sql, tuple(params))
+        rows = self.cache.get(key)
+        if rows is None:
+            with self.pool.connection() as con:
+                rows = con.execute(sql, list(params)).fetchall()
+            self.cache.put(key, rows)
+        return rows
+
+    def read_frame(self, sql, params=()):
+        """Uncached DataFrame of a query, e.g. to load a whole table."""
+        with self.pool.connection() as con:
+            cursor = con.execute(sql, list(params))
+            columns = [d[0] for d in cursor.description]
+            return pd.DataFrame(cursor.fetchall(), columns=columns)
+
+    def close(self):
+        self.pool.close()
+        self.cache.clear()
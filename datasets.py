@@ -0,0 +1,280 @@
+"""
+Shared preparation steps applied to every dataset the dashboards load.
+"""
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+import columnar_cache
+
+# Columns the built-in datasets always store as dates.
+DATE_COLUMNS = ("sales_date", "shipment_date", "delivery_date", "opened_at", "closed_at")
+# Share of sampled values that must parse for a text column to count as dates.
+DATE_PARSE_MIN_SUCCESS = 0.9
+# Values sampled to infer a date column's format.
+DATE_FORMAT_SAMPLE = 1000
+# Values sampled to decide whether a date column repeats enough to parse
+# its distinct values only.
+DATE_REPEAT_SAMPLE = 10_000
+
+# String columns with at most this many distinct values are stored as
+# pandas categories (integer codes + a small dictionary).
+CATEGORY_MAX_UNIQUE = int(os.environ.get("CATEGORY_MAX_UNIQUE", "1000"))
+
+
+def _is_text(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return False
+    return pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)
+
+
+def looks_like_dates(sample):
+    """True when most values of a text sample parse as dates."""
+    values = sample.dropna().astype(str)
+    if values.empty:
+        return False
+    # Cheap shape check first so names and ids never reach the parser.
+    if values.str.contains(r"\d{1,4}[-/.]\d{1,2}").mean() < DATE_PARSE_MIN_SUCCESS:
+        return False
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        parsed = pd.to_datetime(values, errors="coerce")
+    return parsed.notna().mean() >= DATE_PARSE_MIN_SUCCESS
+
+
+def infer_date_format(sample):
+    """
+    The format to parse a date column with, inferred from a text sample:
+    a strftime format guessed from the first value, "ISO8601" for ISO
+    strings of varying precision, or "mixed" when no single format parses
+    as many of the sampled values as per-value parsing does.
+    """
+    values = sample.dropna().astype(str)
+    if values.empty:
+        return "mixed"
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        parsed = pd.to_datetime(values, errors="coerce", format="mixed").notna().sum()
+        for fmt in (guess_datetime_format(values.iloc[0]), "ISO8601"):
+            if fmt and pd.to_datetime(values, errors="coerce", format=fmt).notna().sum() >= parsed:
+                return fmt
+    return "mixed"
+
+
+def parse_dates(values, fmt):
+    """
+    Parses a text Series with fmt (see infer_date_format); values that do
+    not parse become NaT. When values repeat (a date per row of a daily
+    table), each distinct value is parsed once and the results are
+    broadcast by code.
+    """
+    sample = values.iloc[:DATE_REPEAT_SAMPLE]
+    if sample.nunique() > len(sample) // 2:
+        return pd.to_datetime(values, errors="coerce", format=fmt)
+    codes, uniques = pd.factorize(values)
+    parsed = pd.DatetimeIndex(pd.to_datetime(pd.Series(uniques, dtype=object), errors="coerce", format=fmt))
+    result = parsed.take(codes, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(result, index=values.index, name=values.name)
+
+
+def low_cardinality_columns(df, max_unique=None, sample_size=10_000):
+    """
+    Names of the text columns that look like dimensions.
+
+    Cardinality is measured on a random sample, so wide multi-million-row
+    frames are profiled in milliseconds. A column qualifies when it has at
+    most max_unique distinct values and repeats them (fewer distinct values
+    than half the sampled rows), which keeps id-like columns as strings.
+    """
+    max_unique = CATEGORY_MAX_UNIQUE if max_unique is None else max_unique
+    if len(df) > sample_size:
+        rows = np.random.default_rng(0).choice(len(df), size=sample_size, replace=False)
+    else:
+        rows = slice(None)
+
+    columns = []
+    for c in df.columns:
+        if not _is_text(df[c]):
+            continue
+        sample = df[c].iloc[rows]
+        n_unique = sample.nunique(dropna=True)
+        if n_unique <= max_unique and n_unique <= max(1, len(sample) // 2):
+            columns.append(c)
+    return columns
+
+
+def encode_low_cardinality(df, max_unique=None):
+    """Converts low-cardinality text columns of df to category dtype in place."""
+    for c in low_cardinality_columns(df, max_unique):
+        df[c] = df[c].astype("category")
+    return df
+
+
+def primary_date_column(dates, date_columns=DATE_COLUMNS):
+    """The date column rows are sorted by: a known name first, else the first of dates."""
+    return next((c for c in date_columns if c in dates), next(iter(dates), None))
+
+
+def is_sorted_by_date(values):
+    """Whether dates ascend with any missing ones last, the order sort_by_date leaves."""
+    valid = int(values.notna().sum())
+    head = values.iloc[:valid]
+    return bool(head.notna().all() and head.is_monotonic_increasing)
+
+
+def sort_by_date(df, date_col=None):
+    """
+    Sorts df by its primary date column (default: the first datetime
+    column), missing dates last, so filters.DateIndex can binary-search it.
+
+    The order is recorded in df.attrs["sorted_by"], which the columnar
+    cache stores with the entry; a frame read back from one is not
+    checked (or copied) again.
+    """
+    if date_col is None:
+        dates = df.select_dtypes(include="datetime").columns
+        if dates.empty:
+            return df
+        date_col = dates[0]
+    if df.attrs.get("sorted_by") != date_col and not is_sorted_by_date(df[date_col]):
+        df = df.sort_values(date_col, kind="stable", na_position="last", ignore_index=True)
+    df.attrs["sorted_by"] = date_col
+    return df
+
+
+def prepare_frame(df, date_columns=DATE_COLUMNS, date_formats=None):
+    """
+    Parses date columns (the known names plus text columns that look like
+    dates), category-encodes dimensions and sorts by the primary date.
+    Returns the frame and the name of its primary date column.
+
+    date_formats maps columns to formats recorded by an earlier load of
+    the same source; those columns are parsed without inference. The
+    formats used end up in df.attrs["date_formats"], which the columnar
+    cache stores with the entry.
+    """
+    formats = dict(df.attrs.get("date_formats", {}))
+    known = date_formats or {}
+    for c in df.columns:
+        series = df[c]
+        if pd.api.types.is_datetime64_any_dtype(series.dtype) or not _is_text(series):
+            continue
+        if c in known:
+            formats[c] = known[c]
+        elif c in date_columns or looks_like_dates(series.head(DATE_FORMAT_SAMPLE)):
+            formats[c] = infer_date_format(series.head(DATE_FORMAT_SAMPLE))
+        else:
+            continue
+        df[c] = parse_dates(series, formats[c])
+    df.attrs["date_formats"] = formats
+    encode_low_cardinality(df)
+
+    dates = [c for c in df.columns if pd.api.types.is_datetime64_any_dtype(df[c].dtype)]
+    date_col = primary_date_column(dates, date_columns)
+    if date_col is not None:
+        df = sort_by_date(df, date_col)
+    return df, date_col
+
+
+def _read_only(df):
+    # Rebuild the frame around the same buffers (no copy) with NumPy's
+    # writeable flag cleared, so an accidental in-place write raises instead
+    # of corrupting a frame shared by every session.
+    columns = {}
+    for c in df.columns:
+        series = df[c]
+        if isinstance(series.dtype, np.dtype):
+            values = series.to_numpy()
+            values.flags.writeable = False
+            columns[c] = values
+        else:
+            columns[c] = series.array
+    frame = pd.DataFrame(columns, index=df.index, copy=False)
+    frame.attrs = dict(df.attrs)
+    return frame
+
+
+def _array_blocks(values):
+    # (key, nbytes) of the memory blocks behind one array. The key is the
+    # start address where one is exposed, so blocks shared between frames
+    # (or mapped from a cache file) can be recognised.
+    if isinstance(values, pd.Categorical):
+        yield from _array_blocks(values.codes)
+        yield from _array_blocks(values.categories.array)
+    elif isinstance(values, np.ndarray):
+        yield values.__array_interface__["data"][0], values.nbytes
+    elif isinstance(values, pd.arrays.ArrowExtensionArray):
+        for chunk in values.__arrow_array__().chunks:
+            for buf in chunk.buffers():
+                if buf is not None:
+                    yield buf.address, buf.size
+    else:
+        yield ("array", id(values)), values.nbytes
+
+
+def _frame_blocks(df):
+    blocks = {}
+    for c in df.columns:
+        series = df[c]
+        values = series.to_numpy() if isinstance(series.dtype, np.dtype) else series.array
+        blocks.update(_array_blocks(values))
+    return blocks
+
+
+def memory_usage(df):
+    """
+    Bytes behind the columns of df, split into "mapped" (pages of a cache
+    file mapped by columnar_cache, shared by every session and process)
+    and "heap". Blocks shared between columns are counted once.
+    """
+    regions = columnar_cache.mapped_regions()
+    usage = {"mapped": 0, "heap": 0}
+    for key, nbytes in _frame_blocks(df).items():
+        mapped = isinstance(key, int) and any(start <= key < start + size for start, size in regions)
+        usage["mapped" if mapped else "heap"] += nbytes
+    return usage
+
+
+def private_bytes(df, shared):
+    """Bytes behind df that are not shared with the frame `shared`."""
+    common = _frame_blocks(shared)
+    return sum(nbytes for key, nbytes in _frame_blocks(df).items() if key not in common)
+
+
+class PreparedDataset:
+    """
+    A dataset after the one-time preparation stage: date columns parsed,
+    dimensions category-encoded and rows sorted by the primary date.
+
+    One instance is built per data version and shared by every rerun and
+    session. Its buffers are read-only; render code works on view(), a
+    shallow copy that shares the data but not the column mapping.
+    """
+
+    def __init__(self, frame, version, date_col=None, base=None):
+        self.frame = frame
+        self.version = version
+        self.date_col = date_col
+        # (version, rows) of the dataset this one extends with appended
+        # rows: its rows are exactly the first `rows` rows of this frame.
+        self.base = base
+        self._usage = None
+
+    @classmethod
+    def prepare(cls, df, version, date_columns=DATE_COLUMNS, base=None):
+        prepared, date_col = prepare_frame(df, date_columns)
+        # prepare_frame returns df itself unless it had to re-sort, which
+        # would mix the appended rows into the base rows.
+        return cls(_read_only(prepared), version, date_col, base if prepared is df else None)
+
+    def view(self):
+        return self.frame.copy(deep=False)
+
+    def memory_usage(self):
+        """memory_usage() of the shared frame, measured once."""
+        if self._usage is None:
+            self._usage = memory_usage(self.frame)
+        return self._usage
@@ -0,0 +1,144 @@
+"""
+Incremental filter evaluation with cached per-predicate masks.
+
+Each predicate ("column in these values", "column between start and end")
+is evaluated once into a boolean array and cached under its normalized
+key; a filter state is the bitwise AND of its predicates' masks. When an
+analyst changes one multiselect only that predicate is recomputed, and no
+intermediate DataFrame is materialised before the final aggregation.
+
+Frames sorted by their date column (see datasets.sort_by_date) get a
+DateIndex, which turns date-range predicates into a binary search.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class DateIndex:
+    """
+    Binary-search index over an ascending datetime column (missing dates
+    last). A date range becomes a row slice found with two searchsorted
+    calls, and calendar periods become contiguous row segments.
+    """
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype="datetime64[ns]")
+        self.values = values[: int((~np.isnat(values)).sum())]
+
+    @classmethod
+    def from_series(cls, series):
+        """DateIndex for series, or None when it is not sorted."""
+        n_valid = int(series.notna().sum())
+        head = series.iloc[:n_valid]
+        if head.isna().any() or not head.is_monotonic_increasing:
+            return None
+        return cls(head.to_numpy(dtype="datetime64[ns]"))
+
+    def slice(self, start=None, end=None):
+        """Rows with start <= date <= end, as a slice."""
+        lo = 0 if start is None else np.searchsorted(self.values, np.datetime64(pd.Timestamp(start), "ns"), "left")
+        hi = len(self.values) if end is None else np.searchsorted(self.values, np.datetime64(pd.Timestamp(end), "ns"), "right")
+        return slice(int(lo), int(max(lo, hi)))
+
+    def periods(self, freq="M"):
+        """
+        Labels (e.g. "2024-01") and starting row offsets of the calendar
+        periods that have at least one row.
+        """
+        if len(self.values) == 0:
+            return [], np.array([], dtype=np.int64)
+        periods = pd.period_range(
+            pd.Timestamp(self.values[0]).to_period(freq), pd.Timestamp(self.values[-1]).to_period(freq), freq=freq
+        )
+        starts = np.searchsorted(self.values, periods.start_time.to_numpy(dtype="datetime64[ns]"), "left")
+        ends = np.append(starts[1:], len(self.values))
+        present = starts < ends
+        return [str(p) for p in periods[present]], starts[present]
+
+
+def _values_key(values):
+    return frozenset("<NA>" if pd.isna(v) else v for v in values)
+
+
+class FilterEngine:
+    def __init__(self, frame, max_masks=128):
+        self.frame = frame
+        self.max_masks = max_masks
+        self._masks = OrderedDict()
+        self._date_indexes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, key, compute):
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                self.hits += 1
+                return mask
+        mask = compute()
+        mask.flags.writeable = False
+        with self._lock:
+            self.misses += 1
+            self._masks[key] = mask
+            while len(self._masks) > self.max_masks:
+                self._masks.popitem(last=False)
+        return mask
+
+    def isin(self, column, values):
+        """Mask of rows whose column value is one of values."""
+        return self._cached(("isin", column, _values_key(values)), lambda: self._isin(column, values))
+
+    def between(self, column, start=None, end=None):
+        """Mask of rows with start <= column <= end (either bound optional)."""
+        start = None if start is None else pd.Timestamp(start)
+        end = None if end is None else pd.Timestamp(end)
+        return self._cached(("between", column, start, end), lambda: self._between(column, start, end))
+
+    def _isin(self, column, values):
+        series = self.frame[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            # Look the integer codes up in a small table instead of
+            # comparing strings row by row; code -1 (missing) maps to False.
+            allowed = np.zeros(len(series.cat.categories) + 1, dtype=bool)
+            positions = series.cat.categories.get_indexer(list(values))
+            allowed[positions[positions >= 0]] = True
+            return allowed[series.cat.codes.to_numpy()]
+        return series.isin(list(values)).to_numpy()
+
+    def date_index(self, column):
+        """DateIndex of column, built on first use (None if unsorted)."""
+        if column not in self._date_indexes:
+            self._date_indexes[column] = DateIndex.from_series(self.frame[column])
+        return self._date_indexes[column]
+
+    def _between(self, column, start, end):
+        index = self.date_index(column)
+        if index is not None:
+            mask = np.zeros(len(self.frame), dtype=bool)
+            mask[index.slice(start, end)] = True
+            return mask
+        series = self.frame[column]
+        mask = np.ones(len(series), dtype=bool)
+        if start is not None:
+            mask &= (series >= start).to_numpy()
+        if end is not None:
+            mask &= (series <= end).to_numpy()
+        return mask
+
+    def mask(self, filters=None, date_col=None, start=None, end=None):
+        """
+        Combined mask for {column: allowed values} filters (a falsy column
+        or None values means "no filter") and an optional date range.
+        """
+        combined = np.ones(len(self.frame), dtype=bool)
+        for column, values in (filters or {}).items():
+            if column and values is not None:
+                combined &= self.isin(column, values)
+        if date_col and (start is not None or end is not None):
+            combined &= self.between(date_col, start, end)
+        return combined
@@ -0,0 +1,501 @@
+"""
+Streaming CSV ingestion into the columnar cache.
+
+Large uploads are parsed in fixed-size chunks with a column spec (types,
+date formats and dimensions inferred once from a small sample) and every
+chunk is appended to an Arrow IPC file as soon as it is parsed. Peak
+memory is bounded by the chunk size rather than the file size. Dimension
+columns are written as dictionaries that grow from chunk to chunk (Arrow
+dictionary deltas), so they come back as pandas categories without a
+second pass. Rows are sorted by the primary date once the file is
+written (see datasets.sort_by_date), and the schema records that order,
+so loading the entry does not sort (and copy) it again.
+
+A later chunk can hold values the sample did not, e.g. 3.5 in a column of
+whole numbers or "maybe" in a true/false column. The column is then
+widened the way read_csv of the whole file would type it (whole numbers
+to floats, anything else to text) and the batches written so far are
+rewritten with the wider type.
+
+Many files (a folder of daily exports) are ingested by ingest_many: each
+file is parsed into its own Arrow part by a process pool under one merged
+read spec, and the parts are then streamed into a single file. Only the
+small per-part dictionaries are re-encoded on the way; every other column
+buffer is written straight from the memory-mapped part. The pool's
+workers are started fresh (forkserver or spawn), never forked from the
+caller. A program that runs other threads and whose __main__ should not
+be re-imported, like the Streamlit server, calls ingest_many_subprocess,
+which runs the whole ingest in a child process:
+
+    python ingest.py --target data/.cache/imports/stores.arrow stores/*.csv
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+import columnar_cache
+import datasets
+
+CHUNK_ROWS = 250_000
+SAMPLE_ROWS = 10_000
+# Rows sampled from each file by ingest_many; the merged spec sees the
+# samples of every file, so each can be small.
+FILE_SAMPLE_ROWS = 1_000
+
+
+def infer_read_spec(sample):
+    """
+    Derives the read_csv dtype mapping, the date columns (mapped to their
+    inferred formats) and the dimension columns from a sample frame, so
+    every chunk is parsed the same way.
+    """
+    dtype, dates = {}, {}
+    for c in sample.columns:
+        kind = sample[c].dtype
+        if pd.api.types.is_bool_dtype(kind):
+            dtype[c] = "boolean"
+        elif pd.api.types.is_integer_dtype(kind):
+            # Nullable, so a missing value in a later chunk does not fail.
+            dtype[c] = "Int64"
+        elif pd.api.types.is_float_dtype(kind):
+            dtype[c] = "float64"
+        else:
+            dtype[c] = object
+            if datasets.looks_like_dates(sample[c]):
+                dates[c] = datasets.infer_date_format(sample[c].head(datasets.DATE_FORMAT_SAMPLE))
+    dimensions = [c for c in datasets.low_cardinality_columns(sample) if c not in dates]
+    return dtype, dates, dimensions
+
+
+def _merge_dtype(kinds):
+    kinds = set(kinds)
+    if len(kinds) == 1:
+        return kinds.pop()
+    if kinds <= {"Int64", "float64"}:
+        return "float64"
+    return object
+
+
+def merge_read_specs(specs):
+    """
+    One read spec for several files from their own (dtype, dates,
+    dimensions) specs. Columns keep their first-seen order; mixed numeric
+    types widen to float64 and any other mix to text. A column is a date or
+    a dimension only if it is one in every file that has it; files that
+    disagree on a date format are parsed as "mixed".
+    """
+    kinds, date_votes, formats, dimension_votes = {}, {}, {}, {}
+    for dtype, dates, dimensions in specs:
+        for c, kind in dtype.items():
+            kinds.setdefault(c, []).append(kind)
+            date_votes[c] = date_votes.get(c, True) and c in dates
+            if c in dates:
+                formats.setdefault(c, set()).add(dates[c])
+            dimension_votes[c] = dimension_votes.get(c, True) and c in dimensions
+    dtype = {c: _merge_dtype(k) for c, k in kinds.items()}
+    dates = {
+        c: formats[c].pop() if len(formats[c]) == 1 else "mixed"
+        for c in dtype if dtype[c] is object and date_votes[c]
+    }
+    dimensions = [c for c in dtype if dtype[c] is object and dimension_votes[c] and c not in dates]
+    return dtype, dates, dimensions
+
+
+class _GrowingDictionary:
+    """Category list for one column that only ever appends new values."""
+
+    def __init__(self):
+        self.values = pd.Index([], dtype=object)
+
+    def encode(self, series):
+        codes = self.values.get_indexer(series)
+        unseen = (codes == -1) & series.notna().to_numpy()
+        if unseen.any():
+            self.values = self.values.append(pd.Index(pd.unique(series[unseen]), dtype=object))
+            codes = self.values.get_indexer(series)
+        mask = codes == -1
+        indices = pa.array(codes.astype(np.int32), mask=mask)
+        return pa.DictionaryArray.from_arrays(indices, pa.array(self.values, type=pa.string()))
+
+    def remap(self, array):
+        """Re-encodes a dictionary array against this dictionary, touching only its dictionary."""
+        dictionary = pd.Index(array.dictionary.to_pylist(), dtype=object)
+        unseen = dictionary[self.values.get_indexer(dictionary) == -1]
+        if len(unseen):
+            self.values = self.values.append(unseen)
+        mapping = pa.array(self.values.get_indexer(dictionary).astype(np.int32))
+        indices = pc.take(mapping, array.indices)
+        return pa.DictionaryArray.from_arrays(indices, pa.array(self.values, type=pa.string()))
+
+
+def _schema(dtype, dates, dimensions):
+    fields = []
+    for c, kind in dtype.items():
+        metadata = None
+        if c in dates:
+            arrow_type = pa.timestamp("ns")
+            metadata = {columnar_cache.DATE_FORMAT_KEY: dates[c].encode()}
+        elif c in dimensions:
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        elif kind == "boolean":
+            arrow_type = pa.bool_()
+        elif kind == "Int64":
+            arrow_type = pa.int64()
+        elif kind == "float64":
+            arrow_type = pa.float64()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(c, arrow_type, metadata=metadata))
+    # The rows end up sorted by this column (see _sort_rows).
+    date_col = datasets.primary_date_column(list(dates))
+    return pa.schema(fields, metadata={columnar_cache.SORTED_KEY: date_col.encode()} if date_col else None)
+
+
+def _sort_rows(path, chunk_rows):
+    # Rewrites the Arrow file at path in the order its schema records
+    # (by date, missing dates last), unless its rows already are in it.
+    # The rows are taken from the mapped file chunk by chunk.
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+    date_col = columnar_cache.sorted_by(table)
+    if date_col is None or datasets.is_sorted_by_date(table.column(date_col).to_pandas()):
+        return
+    # A stable sort; missing dates go last by default.
+    order = pc.sort_indices(table.select([date_col]), sort_keys=[(date_col, "ascending")])
+    table = table.unify_dictionaries()
+    tmp = f"{path}.sorted"
+    try:
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            for start in range(0, len(order), chunk_rows):
+                writer.write_table(table.take(order[start:start + chunk_rows]))
+        del table
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _fits(values, arrow_type):
+    # Whether a chunk column, parsed without a dtype, holds values of arrow_type.
+    if values.isna().all():
+        return True
+    kind = values.dtype
+    if pa.types.is_boolean(arrow_type):
+        # A boolean column with blanks comes back as objects.
+        return pd.api.types.is_bool_dtype(kind) or (kind == object and values.dropna().map(type).eq(bool).all())
+    if pd.api.types.is_bool_dtype(kind) or not pd.api.types.is_numeric_dtype(kind):
+        return pa.types.is_string(arrow_type)
+    if pa.types.is_integer(arrow_type):
+        return pd.api.types.is_integer_dtype(kind) or bool((values.dropna() % 1 == 0).all())
+    return True
+
+
+def _wider(arrow_type, values):
+    # The type of a column whose chunk does not fit arrow_type.
+    kind = values.dtype
+    if pa.types.is_integer(arrow_type) and pd.api.types.is_numeric_dtype(kind) and not pd.api.types.is_bool_dtype(kind):
+        return pa.float64()
+    return pa.string()
+
+
+def _wider_of(a, b):
+    if a == b:
+        return a
+    if {a, b} <= {pa.int64(), pa.float64()}:
+        return pa.float64()
+    return pa.string()
+
+
+def _to_arrow(values, arrow_type):
+    if pa.types.is_string(arrow_type) and not (values.dtype == object or pd.api.types.is_string_dtype(values.dtype)):
+        return pc.cast(pa.array(values, from_pandas=True), arrow_type)
+    if pa.types.is_integer(arrow_type) and pd.api.types.is_float_dtype(values.dtype):
+        values = values.astype("Int64")
+    return pa.array(values, type=arrow_type, from_pandas=True)
+
+
+class _BatchWriter:
+    """
+    Arrow IPC file writer whose schema can widen a column. The batches
+    written so far are then rewritten with the wider type.
+    """
+
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = schema
+        self._open()
+
+    def _open(self):
+        self._sink = pa.OSFile(self.path, "wb")
+        options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        self._writer = pa.ipc.new_file(self._sink, self.schema, options=options)
+
+    def write(self, columns):
+        self._writer.write_batch(pa.record_batch(columns, schema=self.schema))
+
+    def widen(self, name, arrow_type):
+        self.close()
+        narrow = f"{self.path}.narrow"
+        os.replace(self.path, narrow)
+        i = self.schema.get_field_index(name)
+        self.schema = self.schema.set(i, self.schema.field(i).with_type(arrow_type))
+        self._open()
+        try:
+            with pa.memory_map(narrow, "r") as source:
+                reader = pa.ipc.open_file(source)
+                for j in range(reader.num_record_batches):
+                    columns = reader.get_batch(j).columns
+                    columns[i] = pc.cast(columns[i], arrow_type)
+                    self.write(columns)
+        finally:
+            os.remove(narrow)
+
+    def close(self):
+        self._writer.close()
+        self._sink.close()
+
+
+def _write_chunks(handle, path, dtype, dates, dimensions, chunk_rows, on_chunk=None):
+    # Parses the CSV in handle chunk by chunk into an Arrow file at path.
+    # Text columns are read as text; numbers and booleans are parsed per
+    # chunk and checked against the schema, which widens where they differ.
+    writer = _BatchWriter(path, _schema(dtype, dates, dimensions))
+    encoders = {c: _GrowingDictionary() for c in dimensions}
+    text = {c: object for c, kind in dtype.items() if kind is object}
+    rows = 0
+    try:
+        for chunk in pd.read_csv(handle, dtype=text, chunksize=chunk_rows):
+            columns = []
+            for field in list(writer.schema):
+                values = chunk[field.name]
+                if field.name in encoders:
+                    columns.append(encoders[field.name].encode(values))
+                    continue
+                if field.name in dates:
+                    values = datasets.parse_dates(values, dates[field.name])
+                elif not _fits(values, field.type):
+                    writer.widen(field.name, _wider(field.type, values))
+                columns.append(_to_arrow(values, writer.schema.field(field.name).type))
+            writer.write(columns)
+            rows += len(chunk)
+            if on_chunk is not None:
+                on_chunk()
+    finally:
+        writer.close()
+    return rows
+
+
+def ingest_csv(source, target, chunk_rows=CHUNK_ROWS, progress=None):
+    """
+    Parses the CSV in source (a path or a seekable binary file) chunk by
+    chunk into the Arrow file at target and returns the number of rows.
+
+    progress, if given, is called after every chunk with the fraction of
+    the input consumed so far.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        total = os.path.getsize(source)
+        handle = open(source, "rb")
+        owns_handle = True
+    else:
+        handle = source
+        handle.seek(0, os.SEEK_END)
+        total = handle.tell()
+        handle.seek(0)
+        owns_handle = False
+
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        dtype, dates, dimensions = infer_read_spec(pd.read_csv(handle, nrows=SAMPLE_ROWS))
+        handle.seek(0)
+        on_chunk = None
+        if progress is not None and total:
+            on_chunk = lambda: progress(min(handle.tell() / total, 1.0))
+        rows = _write_chunks(handle, tmp, dtype, dates, dimensions, chunk_rows, on_chunk)
+        _sort_rows(tmp, chunk_rows)
+        os.replace(tmp, target)
+    finally:
+        if owns_handle:
+            handle.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return rows
+
+
+def expand_sources(pattern):
+    """Sorted CSV paths of a directory (every *.csv in it) or a glob pattern."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.csv")
+    return sorted(p for p in glob.glob(pattern, recursive=True) if os.path.isfile(p))
+
+
+def _sample_spec(source):
+    return infer_read_spec(pd.read_csv(source, nrows=FILE_SAMPLE_ROWS))
+
+
+def _ingest_part(source, part, dtype, dates, dimensions, chunk_rows):
+    # Runs in a worker process: one source file into one Arrow part, under
+    # the merged spec restricted to the columns this file has.
+    header = pd.read_csv(source, nrows=0).columns
+    dtype = {c: dtype[c] for c in header}
+    dates = {c: fmt for c, fmt in dates.items() if c in dtype}
+    dimensions = [c for c in dimensions if c in dtype]
+    return _write_chunks(source, part, dtype, dates, dimensions, chunk_rows)
+
+
+def _concat_parts(parts, path, schema):
+    encoders = {f.name: _GrowingDictionary() for f in schema if pa.types.is_dictionary(f.type)}
+    options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+        for part in parts:
+            with pa.memory_map(part, "r") as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    batch = reader.get_batch(i)
+                    columns = []
+                    for field in schema:
+                        if field.name in batch.schema.names:
+                            column = batch.column(field.name)
+                            if column.type != field.type and field.name not in encoders:
+                                # The part widened the column (see _write_chunks).
+                                column = pc.cast(column, field.type)
+                        else:
+                            column = pa.nulls(batch.num_rows, field.type)
+                        if field.name in encoders:
+                            column = encoders[field.name].remap(column)
+                        columns.append(column)
+                    writer.write_batch(pa.record_batch(columns, schema=schema))
+
+
+def _pool_context():
+    # A forked worker inherits the locks other threads of the caller held
+    # at that moment and can deadlock on them; forkserver starts workers
+    # from a single-threaded server process instead.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def ingest_many(sources, target, workers=None, chunk_rows=CHUNK_ROWS, progress=None):
+    """
+    Parses many CSV files in parallel into one Arrow file at target, rows
+    in the order of sources, and returns the number of rows. Files may
+    differ in their columns: missing ones are filled with nulls.
+
+    workers defaults to one per CPU; progress, if given, is called with
+    the fraction of the input bytes parsed so far.
+    """
+    sources = [os.fspath(s) for s in sources]
+    if not sources:
+        raise ValueError("no CSV files to ingest")
+    workers = max(1, min(workers or os.cpu_count() or 1, len(sources)))
+    sizes = [os.path.getsize(s) for s in sources]
+    total = sum(sizes) or 1
+
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    parts_dir = tempfile.mkdtemp(prefix="parts-", dir=os.path.dirname(target) or ".")
+    parts = [os.path.join(parts_dir, f"{i:05d}.arrow") for i in range(len(sources))]
+    try:
+        pool = ProcessPoolExecutor(workers, mp_context=_pool_context())
+        try:
+            dtype, dates, dimensions = merge_read_specs(pool.map(_sample_spec, sources))
+            jobs = {
+                pool.submit(_ingest_part, source, part, dtype, dates, dimensions, chunk_rows): size
+                for source, part, size in zip(sources, parts, sizes)
+            }
+            done, rows = 0, 0
+            for job in as_completed(jobs):
+                rows += job.result()
+                done += jobs[job]
+                if progress is not None:
+                    progress(done / total)
+        finally:
+            # Files not started yet are dropped when the ingest fails.
+            pool.shutdown(cancel_futures=True)
+        schema = _schema(dtype, dates, dimensions)
+        for part in parts:
+            with pa.memory_map(part, "r") as source:
+                for field in pa.ipc.open_file(source).schema:
+                    i = schema.get_field_index(field.name)
+                    schema = schema.set(i, schema.field(i).with_type(_wider_of(schema.field(i).type, field.type)))
+        _concat_parts(parts, tmp, schema)
+        _sort_rows(tmp, chunk_rows)
+        os.replace(tmp, target)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return rows
+
+
+def ingest_many_subprocess(sources, target, workers=None, progress=None):
+    """
+    ingest_many run by a child process (this module as a script), for
+    callers with threads of their own. Returns the number of rows; a failed
+    ingest raises RuntimeError with the end of the child's output.
+    """
+    sources = [os.fspath(s) for s in sources]
+    if not sources:
+        raise ValueError("no CSV files to ingest")
+    command = [sys.executable, os.path.abspath(__file__), "--target", os.fspath(target), "--progress"]
+    if workers:
+        command += ["--workers", str(workers)]
+    command += ["--", *sources]
+    output, rows = deque(maxlen=20), None
+    child = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    try:
+        for line in child.stdout:
+            name, _, value = line.partition(" ")
+            if name == "progress" and progress is not None:
+                progress(float(value))
+            elif name == "rows":
+                rows = int(value)
+            else:
+                output.append(line)
+        child.wait()
+    finally:
+        if child.poll() is None:
+            # The caller gave up (e.g. a Streamlit rerun); the child removes
+            # its temporary files on SIGTERM.
+            child.terminate()
+            child.wait()
+        child.stdout.close()
+    if child.returncode != 0 or rows is None:
+        raise RuntimeError(f"ingest of {len(sources)} files failed:\n{''.join(output)}")
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse CSV files in parallel into one Arrow file.")
+    parser.add_argument("sources", nargs="+", help="CSV files, in row order")
+    parser.add_argument("--target", required=True, help="Arrow file to write")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--progress", action="store_true", help="print the fraction of input parsed as it grows")
+    args = parser.parse_args(argv)
+
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(1))
+    report = None
+    if args.progress:
+        report = lambda done: print(f"progress {done}", flush=True)
+    rows = ingest_many(args.sources, args.target, args.workers, args.chunk_rows, report)
+    print(f"rows {rows}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Background jobs for results too slow to wait for on a rerun.
+
+A job is submitted under a key (data version, what it computes, filter
+state). The first submit starts it on a small thread pool shared by every
+session; later submits of the same key get the same future back, so the
+rerun that finds it finished just reads the result. The most recent
+max_jobs keys are remembered; a job that failed is started again by the
+next submit of its key.
+
+Submits can name an owner, e.g. a chart of one session. An owner only
+waits for its latest key: when it submits a new one (the analyst changed
+the filters again), its previous job is cancelled if it has not started
+yet and no other owner still waits for it. A job that already started
+runs to completion and its result stays available under its key.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueue:
+    def __init__(self, workers=2, max_jobs=256):
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="jobs")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+        # owner -> key of its latest job, and key -> owners waiting for it
+        self._owned = {}
+        self._owners = {}
+
+    def submit(self, key, fn, owner=None):
+        """
+        Future of fn(), started on the first submit of key. With owner,
+        the owner's previous key is given up (see the module docstring).
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.cancelled() or (job.done() and job.exception() is not None):
+                job = self._pool.submit(fn)
+                self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            if owner is not None:
+                previous = self._owned.get(owner)
+                if previous != key:
+                    self._owned[owner] = key
+                    self._owners.setdefault(key, set()).add(owner)
+                    if previous is not None:
+                        self._release(previous, owner)
+            while len(self._jobs) > self.max_jobs:
+                evicted, _ = self._jobs.popitem(last=False)
+                for stale in self._owners.pop(evicted, ()):
+                    if self._owned.get(stale) == evicted:
+                        del self._owned[stale]
+            return job
+
+    def _release(self, key, owner):
+        owners = self._owners.get(key)
+        if owners is None:
+            return
+        owners.discard(owner)
+        if not owners:
+            del self._owners[key]
+            job = self._jobs.get(key)
+            if job is not None and job.cancel():
+                del self._jobs[key]
@@ -0,0 +1,349 @@
+"""
+Query engines for the dashboard aggregations.
+
+Every dashboard asks the same kinds of question: KPI totals, trends by day
+or month and top-N groups, over the rows that match {dimension: allowed
+values} filters and a date range. An engine's select() returns a selection
+with the RollupCube interface (rows, total, group) plus top() and
+median(), so the dashboards do not depend on where the work happens:
+
+- PandasEngine answers from the in-memory rollup cube, and from the raw
+  rows for medians.
+- SQLiteEngine and DuckDBEngine push the queries down into an embedded
+  database over the dataset file, and only the small result sets come
+  back to Python. DuckDB scans Parquet, CSV and Arrow files in place with
+  multi-threaded scans, so datasets larger than RAM work. SQLite imports
+  the file once into a database next to the columnar cache and scans
+  single-threaded.
+- database_engine() queries a table of a database.Database (the database
+  data source) through its connection pool and result cache.
+"""
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import columnar_cache
+import database
+import datasets
+import ingest
+from rollups import _stats
+
+try:
+    import duckdb
+except ImportError:  # optional: only needed for DuckDBEngine
+    duckdb = None
+
+SQLITE_DIR = os.path.join(columnar_cache.CACHE_DIR, "sqlite")
+TABLE = "data"
+
+
+def _day_range(start, end):
+    # Inclusive calendar-day bounds as [start, end_exclusive) timestamps,
+    # matching the day-level date filter of the rollup cube.
+    start = None if start is None else pd.Timestamp(start).normalize()
+    end = None if end is None else pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+    return start, end
+
+
+class PandasEngine:
+    def __init__(self, cube, row_filters, date_col):
+        self.cube = cube
+        self.row_filters = row_filters
+        self.date_col = date_col
+
+    def select(self, filters=None, start=None, end=None):
+        return PandasSelection(self, filters, start, end)
+
+
+class PandasSelection:
+    def __init__(self, engine, filters, start, end):
+        self._engine = engine
+        self._filters = filters
+        self._range = _day_range(start, end)
+        self.cube = engine.cube.select(filters, start, end)
+
+    @property
+    def rows(self):
+        return self.cube.rows
+
+    def total(self, measure):
+        return self.cube.total(measure)
+
+    def group(self, by, measure, stats=("sum",), freq=None):
+        return self.cube.group(by, measure, stats, freq)
+
+    def top(self, by, measure, n=None, stats=("sum", "count"), order="sum"):
+        """group() sorted by the `order` stat, largest first, cut to n groups."""
+        result = self.group(by, measure, stats).sort_values(order, ascending=False)
+        return result if n is None else result.head(n)
+
+    def median(self, measure):
+        start, end = self._range
+        end = None if end is None else end - pd.Timedelta(1, "ns")
+        engine = self._engine
+        rows = engine.row_filters.mask(self._filters, engine.date_col, start, end)
+        return engine.row_filters.frame[measure][rows].median()
+
+
+_quote = database.quote
+
+
+def _padded(values):
+    # IN lists are padded to a power-of-two length by repeating the last
+    # value, so filter states of similar size share one SQL text and with
+    # it one prepared statement.
+    size = 1 << (len(values) - 1).bit_length()
+    return values + values[-1:] * (size - len(values))
+
+
+class _SQLEngine(ABC):
+    """
+    Builds the SQL shared by the embedded-database engines. A dialect
+    implements _period and _median.
+    """
+
+    freqs = ("D", "M")
+    db = None
+
+    def __init__(self, date_col, table=TABLE):
+        self.date_col = date_col
+        self.table = table
+
+    def _execute(self, sql, params=()):
+        return self.db.query(sql, params)
+
+    @abstractmethod
+    def _period(self, column, freq):
+        """SQL expression of the day ("D") or month ("M") of a date column."""
+
+    def _date_param(self, ts):
+        return ts.to_pydatetime()
+
+    def select(self, filters=None, start=None, end=None):
+        clauses, params = [], []
+        for column, values in (filters or {}).items():
+            if not column or values is None:
+                continue
+            values = [v for v in values if not pd.isna(v)]
+            if not values:
+                clauses.append("1 = 0")
+                continue
+            values = _padded([v.item() if hasattr(v, "item") else v for v in values])
+            clauses.append(f"{_quote(column)} IN ({', '.join('?' * len(values))})")
+            params += values
+        start, end = _day_range(start, end)
+        if start is not None:
+            clauses.append(f"{_quote(self.date_col)} >= ?")
+            params.append(self._date_param(start))
+        if end is not None:
+            clauses.append(f"{_quote(self.date_col)} < ?")
+            params.append(self._date_param(end))
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return SQLSelection(self, where, params)
+
+    @abstractmethod
+    def _median(self, measure, where, params):
+        """Median of a measure over the rows matching where."""
+
+
+class SQLSelection:
+    def __init__(self, engine, where, params):
+        self._engine = engine
+        self._where = where
+        self._params = params
+
+    def _query(self, select, tail=""):
+        sql = f"SELECT {select} FROM {_quote(self._engine.table)}{self._where}{tail}"
+        return self._engine._execute(sql, self._params)
+
+    @property
+    def rows(self):
+        return int(self._query("COUNT(*)")[0][0])
+
+    def total(self, measure):
+        x = f"CAST({_quote(measure)} AS DOUBLE)"
+        total, total_sq, count = self._query(f"SUM({x}), SUM({x} * {x}), COUNT({x})")[0]
+        return _stats(np.float64(total or 0.0), np.float64(total_sq or 0.0), np.int64(count))
+
+    def _grouped(self, by, measure, stats, freq, tail=""):
+        engine = self._engine
+        if freq is not None:
+            if freq not in engine.freqs:
+                raise ValueError(f"freq must be one of {engine.freqs}, not {freq!r}")
+            key = engine._period(_quote(engine.date_col), freq)
+        elif by == engine.date_col:
+            key = engine._period(_quote(by), "D")
+        else:
+            key = _quote(by)
+        x = f"CAST({_quote(measure)} AS DOUBLE)"
+        rows = self._query(f"{key} AS k, SUM({x}), SUM({x} * {x}), COUNT({x})", f" GROUP BY k{tail}")
+        parts = pd.DataFrame(rows, columns=["k", "sum", "sumsq", "count"])
+        index = parts["k"]
+        if freq is None and by == engine.date_col:
+            index = pd.to_datetime(index)
+        sums = parts[["sum", "sumsq"]].astype("float64").fillna(0.0)
+        result = _stats(sums["sum"], sums["sumsq"], parts["count"].astype("int64"))
+        return pd.DataFrame({s: result[s].to_numpy() for s in stats}, index=pd.Index(index, name=by))
+
+    def group(self, by, measure, stats=("sum",), freq=None):
+        return self._grouped(by, measure, stats, freq, " ORDER BY k")
+
+    def top(self, by, measure, n=None, stats=("sum", "count"), order="sum"):
+        """group() sorted by the `order` stat, largest first, cut to n groups in the database."""
+        x = f"CAST({_quote(measure)} AS DOUBLE)"
+        order_by = {"sum": f"SUM({x})", "count": f"COUNT({x})", "mean": f"AVG({x})"}[order]
+        tail = f" ORDER BY {order_by} DESC" + ("" if n is None else f" LIMIT {int(n)}")
+        return self._grouped(by, measure, stats, None, tail)
+
+    def median(self, measure):
+        return self._engine._median(measure, self._where, self._params)
+
+
+class SQLiteEngine(_SQLEngine):
+    """
+    Queries a SQLite database file through a database.Database, which is
+    safe to share between Streamlit sessions (threads). Dates are stored as
+    ISO text ("YYYY-MM-DD HH:MM:SS", or just the date in tables from
+    elsewhere), which sorts and compares chronologically.
+    """
+
+    def __init__(self, path, date_col, table=TABLE, db=None):
+        super().__init__(date_col, table)
+        self.path = path
+        self.db = db or database.Database(f"sqlite:///{path}")
+
+    @classmethod
+    def from_file(cls, source, date_col, cache_dir=None):
+        """Engine over a CSV, Parquet or Arrow file, imported on first use."""
+        target = os.path.join(cache_dir or SQLITE_DIR, f"{os.path.splitext(os.path.basename(source))[0]}-"
+                              f"{columnar_cache.source_key(source)}.sqlite")
+        if not os.path.exists(target):
+            import_sqlite(source, target, date_col)
+        return cls(target, date_col)
+
+    def _period(self, column, freq):
+        return f"date({column})" if freq == "D" else f"strftime('%Y-%m', {column})"
+
+    def _date_param(self, ts):
+        # Bounds are whole days; a bare date compares correctly with ISO
+        # text with or without a time ("2024-01-05" <= "2024-01-05 00:00:00").
+        return ts.strftime("%Y-%m-%d")
+
+    def _median(self, measure, where, params):
+        column = _quote(measure)
+        valid = f"{where} AND {column} IS NOT NULL" if where else f" WHERE {column} IS NOT NULL"
+        n = self._execute(f"SELECT COUNT(*) FROM {_quote(self.table)}{valid}", params)[0][0]
+        if not n:
+            return float("nan")
+        rows = self._execute(
+            f"SELECT CAST({column} AS DOUBLE) FROM {_quote(self.table)}{valid} ORDER BY {column} "
+            f"LIMIT {2 - n % 2} OFFSET {(n - 1) // 2}",
+            params,
+        )
+        return sum(r[0] for r in rows) / len(rows)
+
+
+def _batches(source, chunk_rows=ingest.CHUNK_ROWS):
+    ext = os.path.splitext(source)[1].lower()
+    if ext in (".arrow", ".feather"):
+        for batch in columnar_cache.map_table(source).to_batches(chunk_rows):
+            yield batch.to_pandas()
+    elif ext == ".parquet":
+        for batch in pq.ParquetFile(source).iter_batches(chunk_rows):
+            yield batch.to_pandas()
+    else:
+        dtype, dates, _ = ingest.infer_read_spec(pd.read_csv(source, nrows=ingest.SAMPLE_ROWS))
+        # Only text is fixed: SQLite columns take any type, and a number or
+        # flag column of the sample may hold other values further down.
+        text = {c: kind for c, kind in dtype.items() if kind is object}
+        for chunk in pd.read_csv(source, dtype=text, chunksize=chunk_rows):
+            for c, fmt in dates.items():
+                chunk[c] = datasets.parse_dates(chunk[c], fmt)
+            yield chunk
+
+
+def import_sqlite(source, target, date_col, table=TABLE):
+    """Copies a CSV, Parquet or Arrow file into a new SQLite database at target."""
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp"
+    try:
+        with closing(sqlite3.connect(tmp)) as con:
+            for chunk in _batches(source):
+                for c in chunk.columns:
+                    series = chunk[c]
+                    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+                        chunk[c] = series.dt.strftime("%Y-%m-%d %H:%M:%S")
+                    elif isinstance(series.dtype, pd.CategoricalDtype):
+                        chunk[c] = series.astype(object)
+                chunk.to_sql(table, con, if_exists="append", index=False)
+            if date_col:
+                con.execute(f"CREATE INDEX {_quote(f'{table}_{date_col}')} ON {_quote(table)} ({_quote(date_col)})")
+            con.commit()
+        os.replace(tmp, target)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class DuckDBEngine(_SQLEngine):
+    """
+    Queries Parquet (a file, a glob or a directory of shards), CSV or
+    Arrow files in place with DuckDB. Arrow files are memory-mapped and
+    scanned without a copy. Given a database.Database (db), the table is
+    read from that database instead.
+    """
+
+    def __init__(self, source, date_col, table=TABLE, db=None):
+        if duckdb is None:
+            raise ImportError("DuckDBEngine needs the duckdb package (pip install duckdb)")
+        super().__init__(date_col, table)
+        self.db = db
+        if db is not None:
+            return
+        self._con = duckdb.connect()
+        self._lock = threading.Lock()
+        ext = os.path.splitext(source)[1].lower()
+        if ext in (".arrow", ".feather"):
+            self._con.register(f"{table}_arrow", columnar_cache.map_table(source))
+            scan = _quote(f"{table}_arrow")
+        else:
+            if os.path.isdir(source):
+                source = os.path.join(source, "*.parquet")
+            reader = "read_csv_auto" if ext == ".csv" else "read_parquet"
+            scan = f"{reader}('{source.replace(chr(39), chr(39) * 2)}')"
+        self._con.execute(f"CREATE VIEW {_quote(table)} AS SELECT * FROM {scan}")
+
+    def _execute(self, sql, params=()):
+        if self.db is not None:
+            return self.db.query(sql, params)
+        with self._lock:
+            return self._con.execute(sql, list(params)).fetchall()
+
+    def _period(self, column, freq):
+        return f"CAST({column} AS DATE)" if freq == "D" else f"strftime({column}, '%Y-%m')"
+
+    def _median(self, measure, where, params):
+        value = self._execute(f"SELECT median(CAST({_quote(measure)} AS DOUBLE)) FROM {_quote(self.table)}{where}", params)[0][0]
+        return float("nan") if value is None else value
+
+
+def engine_for(backend, source, date_col):
+    """SQL engine named backend ("sqlite" or "duckdb") over the file at source."""
+    if backend == "duckdb":
+        return DuckDBEngine(source, date_col)
+    if backend == "sqlite":
+        return SQLiteEngine.from_file(source, date_col)
+    raise ValueError(f"unknown query backend {backend!r}")
+
+
+def database_engine(db, table, date_col):
+    """Engine over a table of a database.Database."""
+    if db.dialect == "duckdb":
+        return DuckDBEngine(db.path, date_col, table, db)
+    return SQLiteEngine(db.path, date_col, table, db)
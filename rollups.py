@@ -0,0 +1,114 @@
+"""
+Pre-aggregated rollup cubes for the dashboards.
+
+A cube holds one row per (day, dimension values...) group with the row
+count and the sum, sum of squares and non-null count of every measure.
+Filters, KPIs and trend/top-N charts are then answered from the cube, so
+a widget change costs time proportional to the number of groups instead
+of the number of rows. Order statistics such as the median cannot be
+rolled up and still need the raw rows.
+"""
+import numpy as np
+import pandas as pd
+
+from filters import DateIndex, FilterEngine
+
+
+class RollupCube:
+    def __init__(self, table, date_col, dimensions, measures):
+        self.table = table
+        self.date_col = date_col
+        self.dimensions = list(dimensions)
+        self.measures = list(measures)
+        self._filters = None
+
+    @classmethod
+    def build(cls, df, date_col, dimensions=(), measures=()):
+        """
+        Aggregates df by calendar day of date_col and every dimension.
+        Missing keys form their own groups, so no row is dropped. The table
+        comes out sorted by day, which DateIndex relies on.
+        """
+        dimensions = list(dict.fromkeys(d for d in dimensions if d and d != date_col))
+        measures = list(dict.fromkeys(m for m in measures if m))
+        day = df[date_col].dt.floor("D").rename(date_col)
+        grouped = df.groupby([day] + [df[d] for d in dimensions], observed=True, dropna=False)
+        ids = grouped.ngroup().to_numpy()
+        sizes = grouped.size()
+
+        table = sizes.index.to_frame(index=False)
+        table["rows"] = sizes.to_numpy()
+        n = len(table)
+        for m in measures:
+            values = df[m].to_numpy(dtype="float64", na_value=np.nan)
+            valid = ~np.isnan(values)
+            table[f"{m}__sum"] = np.bincount(ids[valid], weights=values[valid], minlength=n)
+            table[f"{m}__sumsq"] = np.bincount(ids[valid], weights=values[valid] ** 2, minlength=n)
+            table[f"{m}__count"] = np.bincount(ids[valid], minlength=n)
+        return cls(table, date_col, dimensions, measures)
+
+    def extend(self, df):
+        """
+        Cube of the rows behind this cube plus the rows of df, e.g. rows
+        appended to the source, aggregating only df.
+        """
+        tail = RollupCube.build(df, self.date_col, self.dimensions, self.measures).table
+        head = self.table.copy()
+        for d in self.dimensions:
+            # Appends only add categories, so the head's codes fit the new dtype.
+            if isinstance(tail[d].dtype, pd.CategoricalDtype):
+                head[d] = head[d].astype(tail[d].dtype)
+        keys = [self.date_col] + self.dimensions
+        table = pd.concat([head, tail], ignore_index=True).groupby(keys, observed=True, dropna=False).sum().reset_index()
+        return RollupCube(table, self.date_col, self.dimensions, self.measures)
+
+    def select(self, filters=None, start=None, end=None):
+        """
+        Sub-cube of the groups matching filters ({dimension: allowed values},
+        None meaning no filter) and the inclusive [start, end] day range.
+        """
+        if self._filters is None:
+            self._filters = FilterEngine(self.table)
+        mask = self._filters.mask(filters, self.date_col, start, end)
+        return RollupCube(self.table[mask], self.date_col, self.dimensions, self.measures)
+
+    @property
+    def rows(self):
+        return int(self.table["rows"].sum())
+
+    def total(self, measure):
+        """sum / count / mean / std of measure over the whole (sub-)cube."""
+        parts = self.table[[f"{measure}__sum", f"{measure}__sumsq", f"{measure}__count"]].sum()
+        return _stats(parts.iloc[0], parts.iloc[1], parts.iloc[2])
+
+    def group(self, by, measure, stats=("sum",), freq=None):
+        """
+        DataFrame indexed by `by` with one column per requested stat.
+        With freq (e.g. "M") the days are bucketed into period labels such
+        as "2024-01", and `by` only names the resulting index.
+        """
+        columns = [f"{measure}__sum", f"{measure}__sumsq", f"{measure}__count"]
+        if freq is not None:
+            # The cube is sorted by day, so every period is a contiguous run
+            # of rows that np.add.reduceat sums without building labels.
+            index = DateIndex(self.table[self.date_col])
+            labels, starts = index.periods(freq)
+            values = self.table[columns].to_numpy(dtype="float64")[: len(index.values)]
+            sums = np.add.reduceat(values, starts, axis=0) if len(starts) else np.empty((0, 3))
+            parts = pd.DataFrame(sums, columns=columns, index=pd.Index(labels, name=by))
+        else:
+            parts = self.table.groupby(self.table[by], observed=True)[columns].sum()
+        result = _stats(parts.iloc[:, 0], parts.iloc[:, 1], parts.iloc[:, 2])
+        return pd.DataFrame({s: result[s] for s in stats}, index=parts.index)
+
+
+def _stats(total, total_sq, count):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / count
+        var = (total_sq - total * mean) / (count - 1)
+    return {
+        "sum": total,
+        "count": count,
+        "mean": mean,
+        "std": np.sqrt(np.maximum(var, 0)),
+    }
@@ -0,0 +1,264 @@
+"""
+Vectorized synthetic data generators for the demo dashboards.
+
+Every column is drawn as a whole NumPy array from ``np.random.default_rng``,
+so the generators scale to tens of millions of rows without a Python loop.
+The distributions match the original row-by-row generators in pp.py.
+
+Run as a script to write datasets of any size as Parquet shards:
+
+    python sample_data.py retail --rows 100000000 --out data/synthetic
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+CITIES = ['Toronto', 'Montreal', 'Vancouver', 'Calgary', 'Ottawa']
+PROVINCES = {'Toronto': 'ON', 'Montreal': 'QC', 'Vancouver': 'BC', 'Calgary': 'AB', 'Ottawa': 'ON'}
+RETAIL_CATEGORIES = ['Electronics', 'Apparel', 'Home & Garden', 'Sports & Outdoors']
+RETURN_RATE = 0.07
+
+CARRIERS = ['UPS', 'FedEx', 'USPS', 'DHL']
+STATES = ['NY', 'CA', 'TX', 'IL', 'WA']
+PRODUCT_TYPES = ['Electronics', 'Apparel', 'Furniture', 'Books']
+DELIVERY_DAYS_BASE = {'UPS': 3.8, 'FedEx': 4.2, 'USPS': 5.8, 'DHL': 6.3}
+ISSUE_RATE = {'UPS': 0.05, 'FedEx': 0.07, 'USPS': 0.12, 'DHL': 0.16}
+
+TEAMS = ['Frontline', 'Technical', 'Escalation']
+TEAM_WEIGHTS = [0.6, 0.3, 0.1]
+SUPPORT_CATEGORIES = ['Login Issue', 'Bug Report', 'Feature Request', 'Payment Issue', 'Account Setup']
+PRIORITIES = ['High', 'Medium', 'Low']
+RES_TIME_BASE = {'Frontline': 3.2, 'Technical': 9.8, 'Escalation': 18.5}
+CAT_MULTIPLIER = {
+    'Login Issue': 0.5, 'Bug Report': 3.5, 'Feature Request': 2.5,
+    'Payment Issue': 4.5, 'Account Setup': 0.7
+}
+
+DEFAULT_START = '2024-01-01'
+DEFAULT_END = '2024-12-31'
+
+
+def _labels(values, codes):
+    # Dimensions are emitted as categories straight from the drawn codes,
+    # so no per-row strings are ever built.
+    categories = pd.Index(values).unique()
+    return pd.Categorical.from_codes(categories.get_indexer(values)[codes], categories)
+
+
+def _rows_per_day(rng, n_days, n_rows, low, high):
+    """Row counts per day: random in [low, high) or an even split of n_rows."""
+    if n_rows is None:
+        return rng.integers(low, high, size=n_days)
+    return rng.multinomial(n_rows, np.full(n_days, 1.0 / n_days))
+
+
+def _format_ids(prefix, fields):
+    """
+    Builds fixed-width string ids such as ORD001042 from (values, width) pairs.
+    The digits are written straight into one byte buffer that Arrow wraps
+    without copying, instead of formatting millions of Python strings.
+    """
+    head = prefix.encode()
+    width = len(head) + sum(w for _, w in fields)
+    n = len(fields[0][0])
+    buf = np.empty((n, width), dtype=np.uint8)
+    buf[:, :len(head)] = np.frombuffer(head, dtype=np.uint8)
+    end = width
+    for values, w in fields:
+        rem = np.asarray(values, dtype=np.int64)
+        for pos in range(end - w, end)[::-1]:
+            rem, digit = np.divmod(rem, 10)
+            buf[:, pos] = digit + ord('0')
+        end -= w
+    if n * width < 2**31:
+        offsets, factory = np.arange(0, (n + 1) * width, width, dtype=np.int32), pa.StringArray
+    else:
+        offsets, factory = np.arange(0, (n + 1) * width, width, dtype=np.int64), pa.LargeStringArray
+    arr = factory.from_buffers(n, pa.py_buffer(offsets), pa.py_buffer(buf))
+    return pd.arrays.ArrowStringArray(arr)
+
+
+def _daily_ids(prefix, counts):
+    """Ids made of the day number and the sequence within that day."""
+    day = np.repeat(np.arange(len(counts)), counts)
+    seq = np.arange(len(day)) - np.repeat(np.cumsum(counts) - counts, counts)
+    day_width = len(str(max(len(counts) - 1, 0)))
+    seq_width = max(3, len(str(int(counts.max(initial=0)))))
+    # Fields are written right to left.
+    return _format_ids(prefix, [(seq, seq_width), (day, day_width)]), day
+
+
+def generate_retail(n_rows=None, start=DEFAULT_START, end=DEFAULT_END, seed=42, id_prefix='ORD'):
+    """
+    Retail transactions between start and end (inclusive, daily).
+    With n_rows=None each day gets 30-49 orders like the original demo;
+    otherwise n_rows orders are spread at random over the days.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start=start, end=end, freq='D')
+    counts = _rows_per_day(rng, len(dates), n_rows, 30, 50)
+    order_id, day = _daily_ids(id_prefix, counts)
+    n = len(day)
+
+    city_codes = rng.integers(0, len(CITIES), size=n)
+    province_of_city = [PROVINCES[c] for c in CITIES]
+    unit_price = rng.uniform(20, 500, size=n)
+    quantity = rng.integers(1, 5, size=n)
+    discount = rng.uniform(0, 0.3, size=n)
+
+    df = pd.DataFrame({
+        'order_id': order_id,
+        'sales_date': dates.values[day],
+        'city': _labels(CITIES, city_codes),
+        'province': _labels(province_of_city, city_codes),
+        'product_category': _labels(RETAIL_CATEGORIES, rng.integers(0, len(RETAIL_CATEGORIES), size=n)),
+        'unit_price': unit_price,
+        'quantity': quantity,
+        'discount': discount,
+        'return_flag': rng.random(n) < RETURN_RATE,
+    })
+    df['total_revenue'] = unit_price * quantity
+    df['discount_amount'] = df['total_revenue'] * discount
+    df['net_revenue'] = df['total_revenue'] - df['discount_amount']
+    return df
+
+
+def generate_supply_chain(n_rows=None, start=DEFAULT_START, end=DEFAULT_END, seed=42, id_prefix='S'):
+    """
+    Shipments between start and end (inclusive, daily).
+    With n_rows=None each day gets 50-79 shipments like the original demo.
+    Delivery time and issue probability depend on the carrier.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start=start, end=end, freq='D')
+    counts = _rows_per_day(rng, len(dates), n_rows, 50, 80)
+    shipment_id, day = _daily_ids(id_prefix, counts)
+    n = len(day)
+
+    carrier_codes = rng.integers(0, len(CARRIERS), size=n)
+    base_days = np.array([DELIVERY_DAYS_BASE[c] for c in CARRIERS])[carrier_codes]
+    issue_rate = np.array([ISSUE_RATE[c] for c in CARRIERS])[carrier_codes]
+    # int() in the original truncates toward zero; np.trunc keeps that.
+    transit_days = np.trunc(rng.normal(base_days, 1.5)).astype('int64')
+    shipment_date = dates.values[day]
+
+    df = pd.DataFrame({
+        'shipment_id': shipment_id,
+        'shipment_date': shipment_date,
+        'delivery_date': shipment_date + transit_days.astype('timedelta64[D]'),
+        'origin_state': _labels(STATES, rng.integers(0, len(STATES), size=n)),
+        'destination_state': _labels(STATES, rng.integers(0, len(STATES), size=n)),
+        'product_type': _labels(PRODUCT_TYPES, rng.integers(0, len(PRODUCT_TYPES), size=n)),
+        'carrier': _labels(CARRIERS, carrier_codes),
+        'issues_flag': rng.random(n) < issue_rate,
+        'weight_kg': rng.uniform(1, 50, size=n),
+    })
+    df['delivery_days'] = np.maximum(transit_days, 1)
+    return df
+
+
+def generate_support(n_rows=None, start=DEFAULT_START, end=DEFAULT_END, seed=42, id_prefix='T'):
+    """
+    Support tickets opened between start and end.
+    With n_rows=None one ticket is opened every hour like the original demo;
+    otherwise n_rows tickets are evenly spaced over the range.
+    Resolution time depends on the team x category combination.
+    """
+    rng = np.random.default_rng(seed)
+    if n_rows is None:
+        opened_at = pd.date_range(start=start, end=end, freq='h')
+    else:
+        opened_at = pd.date_range(start=start, end=end, periods=n_rows).floor('s')
+    n = len(opened_at)
+
+    team_codes = rng.choice(len(TEAMS), size=n, p=TEAM_WEIGHTS)
+    category_codes = rng.integers(0, len(SUPPORT_CATEGORIES), size=n)
+    base = np.array([RES_TIME_BASE[t] for t in TEAMS])[team_codes]
+    multiplier = np.array([CAT_MULTIPLIER[c] for c in SUPPORT_CATEGORIES])[category_codes]
+    resolution_hours = np.maximum(0.1, rng.normal(base * multiplier, base * 0.5))
+
+    return pd.DataFrame({
+        'ticket_id': _format_ids(id_prefix, [(np.arange(n), max(5, len(str(n - 1))))]),
+        'opened_at': opened_at.values,
+        'closed_at': opened_at.values + (resolution_hours * 3.6e12).astype('timedelta64[ns]'),
+        'agent_team': _labels(TEAMS, team_codes),
+        'category': _labels(SUPPORT_CATEGORIES, category_codes),
+        'priority': _labels(PRIORITIES, rng.integers(0, len(PRIORITIES), size=n)),
+        'resolution_hours': resolution_hours,
+        'csat_score': rng.uniform(3.5, 5.0, size=n),
+    })
+
+
+GENERATORS = {
+    'retail': (generate_retail, 'ORD'),
+    'supply_chain': (generate_supply_chain, 'S'),
+    'support': (generate_support, 'T'),
+}
+
+
+def _write_shard(dataset, shard, n_rows, start, end, seed, path):
+    generate, prefix = GENERATORS[dataset]
+    # The shard number goes into the ids so they stay unique across files.
+    df = generate(n_rows, start, end, seed=seed, id_prefix=f'{prefix}{shard:05d}')
+    df.to_parquet(path, index=False)
+    return path, len(df)
+
+
+def write_shards(dataset, n_rows, out_dir, shard_rows=1_000_000, workers=None,
+                 seed=42, start=DEFAULT_START, end=DEFAULT_END):
+    """
+    Writes n_rows of a synthetic dataset to out_dir/<dataset>/part-NNNNN.parquet.
+
+    Shards are generated in a process pool, each from its own child of
+    np.random.SeedSequence(seed), so the output is reproducible for a given
+    seed and shard size no matter how many workers run. Only one shard per
+    worker is ever held in memory. Returns the list of written paths.
+    """
+    if dataset not in GENERATORS:
+        raise ValueError(f'Unknown dataset {dataset!r}; expected one of {sorted(GENERATORS)}')
+    n_shards = max(1, -(-n_rows // shard_rows))
+    sizes = np.full(n_shards, n_rows // n_shards)
+    sizes[:n_rows % n_shards] += 1
+    seeds = np.random.SeedSequence(seed).spawn(n_shards)
+
+    target = os.path.join(out_dir, dataset)
+    os.makedirs(target, exist_ok=True)
+
+    paths = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_write_shard, dataset, i, int(sizes[i]), start, end, seeds[i],
+                        os.path.join(target, f'part-{i:05d}.parquet'))
+            for i in range(n_shards)
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            path, rows = future.result()
+            paths.append(path)
+            print(f'[{dataset}] {done}/{n_shards} {path} ({rows:,} rows)')
+    return sorted(paths)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write synthetic dashboard datasets as Parquet shards.')
+    parser.add_argument('dataset', choices=sorted(GENERATORS) + ['all'])
+    parser.add_argument('--rows', type=int, required=True, help='total rows per dataset')
+    parser.add_argument('--out', default='data/synthetic', help='output directory')
+    parser.add_argument('--shard-rows', type=int, default=1_000_000, help='rows per Parquet file')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: CPU count)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--start', default=DEFAULT_START)
+    parser.add_argument('--end', default=DEFAULT_END)
+    args = parser.parse_args(argv)
+
+    datasets = sorted(GENERATORS) if args.dataset == 'all' else [args.dataset]
+    for dataset in datasets:
+        write_shards(dataset, args.rows, args.out, args.shard_rows, args.workers,
+                     args.seed, args.start, args.end)
+
+
+if __name__ == '__main__':
+    main()
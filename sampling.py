@@ -0,0 +1,162 @@
+"""
+Approximate KPIs from a stratified sample of the rows.
+
+The sample is drawn once per data version. Rows are split into strata by
+the dashboard's dimension columns, and each stratum keeps a random share
+of its rows: at least MIN_PER_STRATUM of them, otherwise in proportion to
+its size, so the whole sample holds about SAMPLE_ROWS rows. Dimension
+filters select whole strata; a date range selects a domain inside each
+stratum. KPIs over any filter state are then estimated from the sample
+in time proportional to its size rather than to the dataset's.
+
+Every estimate comes with a 95% confidence interval from the stratified
+variance with the finite-population correction, so strata kept in full
+contribute no error. Medians are weighted sample quantiles whose interval
+comes from the sampling error of the estimated distribution function at
+the median (Woodruff's method); it needs no assumption about the shape of
+the distribution.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from filters import FilterEngine
+
+SAMPLE_ROWS = int(os.environ.get("APPROX_SAMPLE_ROWS", "200000"))
+MIN_PER_STRATUM = 30
+# Two-sided 95% quantile of the standard normal distribution.
+Z = 1.959963984540054
+
+
+class Estimate:
+    """A sampled estimate and its 95% confidence interval [low, high]."""
+
+    def __init__(self, value, low, high):
+        self.value = value
+        self.low = low
+        self.high = high
+
+    @classmethod
+    def from_variance(cls, value, variance):
+        margin = Z * np.sqrt(variance)
+        return cls(value, value - margin, value + margin)
+
+    def __repr__(self):
+        return f"Estimate({self.value!r}, low={self.low!r}, high={self.high!r})"
+
+
+class StratifiedSample:
+    def __init__(self, frame, strata, population, sampled, date_col):
+        self.frame = frame
+        # Stratum of every sampled row, and the row count of every stratum
+        # in the dataset and in the sample.
+        self.strata = strata
+        self.population = population
+        self.sampled = sampled
+        self.date_col = date_col
+        self._filters = FilterEngine(frame)
+
+    @classmethod
+    def build(cls, df, date_col, dimensions=(), measures=(), size=SAMPLE_ROWS, seed=0):
+        """
+        Samples df in one vectorized pass: every row draws a random
+        priority and a stratum keeps the rows whose priority is under its
+        sampling rate. Only the date, dimension and measure columns are kept.
+        """
+        dimensions = list(dict.fromkeys(d for d in dimensions if d and d != date_col))
+        measures = list(dict.fromkeys(m for m in measures if m and m not in dimensions))
+        if dimensions:
+            grouped = df.groupby([df[d] for d in dimensions], observed=True, dropna=False)
+            codes = grouped.ngroup().to_numpy()
+        else:
+            codes = np.zeros(len(df), dtype=np.int64)
+        population = np.bincount(codes)
+        quota = np.maximum(MIN_PER_STRATUM, np.ceil(size * population / max(len(df), 1)))
+        rate = np.minimum(quota / np.maximum(population, 1), 1.0)
+        keep = np.random.default_rng(seed).random(len(df)) < rate[codes]
+        # A sampled stratum never ends up empty: its first row stands in.
+        missing = np.flatnonzero(np.bincount(codes[keep], minlength=len(population)) == 0)
+        if len(missing):
+            first = np.unique(codes, return_index=True)[1]
+            keep[first[missing]] = True
+        strata = codes[keep]
+        frame = df[[date_col] + dimensions + measures][keep].reset_index(drop=True)
+        return cls(frame, strata, population, np.bincount(strata, minlength=len(population)), date_col)
+
+    @property
+    def rows(self):
+        return len(self.frame)
+
+    def select(self, filters=None, start=None, end=None):
+        """
+        Sampled rows matching filters ({dimension: allowed values}) and the
+        inclusive [start, end] day range, like RollupCube.select.
+        """
+        start = None if start is None else pd.Timestamp(start).normalize()
+        end = None if end is None else pd.Timestamp(end).normalize() + pd.Timedelta(days=1) - pd.Timedelta(1, "ns")
+        return SampleSelection(self, self._filters.mask(filters, self.date_col, start, end))
+
+
+class SampleSelection:
+    def __init__(self, sample, mask):
+        self._sample = sample
+        self._mask = mask
+
+    def _total(self, z):
+        # Estimated dataset total of z (one value per sampled row, zero
+        # outside the selection) and the variance of that estimate.
+        s = self._sample
+        n, N = s.sampled, s.population
+        sums = np.bincount(s.strata, weights=z, minlength=len(N))
+        sums_sq = np.bincount(s.strata, weights=z * z, minlength=len(N))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = sums / n
+            variances = np.where(n > 1, (sums_sq - sums * means) / (n - 1), 0.0)
+            total = np.nansum(N * means)
+            variance = np.nansum(N ** 2 * (1 - n / N) * np.maximum(variances, 0) / n)
+        return total, variance
+
+    def _values(self, measure):
+        y = self._sample.frame[measure].to_numpy(dtype="float64", na_value=np.nan)
+        return y, self._mask & ~np.isnan(y)
+
+    @property
+    def rows(self):
+        return Estimate.from_variance(*self._total(self._mask.astype("float64")))
+
+    def total(self, measure):
+        """sum / count / mean of measure, as Estimates."""
+        y, valid = self._values(measure)
+        total, total_var = self._total(np.where(valid, y, 0.0))
+        count, count_var = self._total(valid.astype("float64"))
+        mean = total / count if count else np.nan
+        # Linearized variance of the ratio total / count.
+        _, mean_var = self._total(np.where(valid, y - mean, 0.0) / count) if count else (np.nan, np.nan)
+        return {
+            "sum": Estimate.from_variance(total, total_var),
+            "count": Estimate.from_variance(count, count_var),
+            "mean": Estimate.from_variance(mean, mean_var),
+        }
+
+    def quantile(self, measure, q=0.5):
+        y, valid = self._values(measure)
+        if not valid.any():
+            return Estimate(np.nan, np.nan, np.nan)
+        s = self._sample
+        weights = (s.population / np.maximum(s.sampled, 1))[s.strata[valid]]
+        order = np.argsort(y[valid], kind="stable")
+        values = y[valid][order]
+        cumulative = np.cumsum(weights[order]) / weights.sum()
+
+        def at(p):
+            return values[min(np.searchsorted(cumulative, p), len(values) - 1)]
+
+        value = at(q)
+        count = weights.sum()
+        _, variance = self._total(np.where(valid, (y <= value) - q, 0.0) / count)
+        margin = Z * np.sqrt(variance)
+        return Estimate(value, at(max(q - margin, 0.0)), at(min(q + margin, 1.0)))
+
+    def median(self, measure):
+        return self.quantile(measure, 0.5)
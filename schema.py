@@ -0,0 +1,129 @@
+"""
+Column role detection for the dashboards.
+
+A dataset is profiled once: every column gets a kind (datetime, numeric,
+boolean, dimension or text) from its dtype and its cardinality on a row
+sample, plus the tokens of its name ("destination_state" -> {"destination",
+"state"}, "issuesFlag" -> {"issues", "flag"}). A dashboard's roles (date,
+revenue, origin, ...) are then matched against the profile: exact names
+first, then name tokens, and only among columns of a fitting kind, so
+"sales_date" is never taken for revenue and "to" only matches a column
+whose name has "to" as a word.
+
+Dates and dimensions were already parsed and encoded by the preparation
+stage (datasets.prepare_frame), so text columns that parse as dates have a
+datetime dtype by the time they are profiled.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+import datasets
+
+SAMPLE_ROWS = 10_000
+
+_TOKEN = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+
+
+def name_tokens(name):
+    """Lower-case words of a column name, split on separators and camelCase."""
+    return frozenset(t.lower() for t in _TOKEN.findall(str(name)))
+
+
+def _kind(series, sample):
+    dtype = series.dtype
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    if pd.api.types.is_bool_dtype(dtype):
+        return "boolean"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "numeric"
+    if isinstance(dtype, pd.CategoricalDtype):
+        return "dimension"
+    unique = sample.nunique()
+    if unique <= datasets.CATEGORY_MAX_UNIQUE and unique < len(sample) / 2:
+        return "dimension"
+    return "text"
+
+
+def profile(df, sample_rows=SAMPLE_ROWS):
+    """{column: {"kind", "unique", "tokens"}} from one pass over a row sample."""
+    if len(df) > sample_rows:
+        rows = np.sort(np.random.default_rng(0).choice(len(df), size=sample_rows, replace=False))
+        sample = df.iloc[rows]
+    else:
+        sample = df
+    profiles = {}
+    for c in df.columns:
+        profiles[c] = {
+            "kind": _kind(df[c], sample[c]),
+            "unique": int(sample[c].nunique()),
+            "tokens": name_tokens(c),
+        }
+    return profiles
+
+
+class Role:
+    """A column a dashboard needs: its accepted kinds, exact names and name words."""
+
+    def __init__(self, name, kinds, exact=(), tokens=()):
+        self.name = name
+        self.kinds = tuple(kinds)
+        self.exact = tuple(exact)
+        self.tokens = frozenset(tokens)
+
+
+FILTER_KINDS = ("dimension", "text")
+
+RETAIL = [
+    Role("date", ("datetime",), exact=("sales_date",), tokens=("date", "day")),
+    Role("revenue", ("numeric",), exact=("net_revenue",), tokens=("revenue", "sales")),
+    Role("category", FILTER_KINDS, exact=("product_category",), tokens=("category",)),
+    Role("city", FILTER_KINDS, tokens=("city",)),
+    Role("province", FILTER_KINDS, tokens=("province", "state")),
+]
+
+SUPPLY_CHAIN = [
+    Role("date", ("datetime",), exact=("shipment_date",), tokens=("shipment", "ship", "date")),
+    Role("delivery_days", ("numeric",), exact=("delivery_days",), tokens=("days", "delivery")),
+    Role("issue", ("boolean", "numeric"), tokens=("issue", "issues", "flag")),
+    Role("origin", FILTER_KINDS, tokens=("origin",)),
+    Role("destination", FILTER_KINDS, tokens=("destination", "dest", "to")),
+    Role("product_type", FILTER_KINDS, tokens=("product", "type")),
+    Role("carrier", FILTER_KINDS, tokens=("carrier",)),
+]
+
+SUPPORT = [
+    Role("date", ("datetime",), exact=("opened_at",), tokens=("opened", "created", "date")),
+    Role("closed", ("datetime",), tokens=("closed",)),
+    Role("resolution", ("numeric",), exact=("resolution_hours",), tokens=("resolution",)),
+    Role("team", FILTER_KINDS, tokens=("team",)),
+    Role("category", FILTER_KINDS, tokens=("category", "type")),
+    Role("csat", ("numeric",), tokens=("csat",)),
+    Role("priority", FILTER_KINDS, exact=("priority",), tokens=("priority",)),
+]
+
+DASHBOARDS = {"retail": RETAIL, "supply_chain": SUPPLY_CHAIN, "support": SUPPORT}
+
+
+def detect_roles(profiles, roles):
+    """
+    {role name: column or None}. Roles are filled in order and a column
+    serves at most one role; exact names win over name-word matches, and
+    ties go to the leftmost column.
+    """
+    taken, found = set(), {}
+    for role in roles:
+        candidates = [c for c, p in profiles.items() if c not in taken and p["kind"] in role.kinds]
+        exact = [c for c in candidates if str(c).lower() in role.exact]
+        match = exact or [c for c in candidates if profiles[c]["tokens"] & role.tokens]
+        found[role.name] = match[0] if match else None
+        if match:
+            taken.add(match[0])
+    return found
+
+
+def columns_of_kind(profiles, kinds):
+    """Columns whose kind is one of kinds, e.g. the choices when a role is missing."""
+    return [c for c, p in profiles.items() if p["kind"] in kinds]
@@ -0,0 +1,296 @@
+"""
+Opt-in timing of the dashboard reruns.
+
+A rerun of app.py or pp.py that is traced (DASHBOARD_TIMING=1, or
+?timing=1 in the page URL) records:
+
+- stages: consecutive sections of the script, each ended by the next
+  stage() call or by finish();
+- spans: nested timed blocks, including every cached loader wrapped with
+  cached(), which also records whether the call was a cache hit.
+
+finish() adds the rerun to the process-wide REGISTRY and writes it to the
+"dashboards.timing" logger as one JSON line. REGISTRY renders everything
+recorded so far as OpenMetrics text, which serve() exposes at /metrics
+for Prometheus to scrape. Untraced reruns only pay for a thread-local
+lookup per stage or span.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+ENABLED = os.environ.get("DASHBOARD_TIMING", "0") == "1"
+# Upper bounds (seconds) of the span duration histogram buckets.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+log = logging.getLogger("dashboards.timing")
+
+_local = threading.local()
+
+
+class Trace:
+    """The stages, spans and cache calls of one rerun."""
+
+    def __init__(self, app):
+        self.app = app
+        self.view = None
+        self.started = time.perf_counter()
+        # (kind, name, depth, start offset, seconds); kind is "stage" or "span".
+        self.spans = []
+        # (function, hit, seconds)
+        self.cache_calls = []
+        self._stage = None
+        self._depth = 0
+
+    def _offset(self):
+        return time.perf_counter() - self.started
+
+    def stage(self, name):
+        now = self._offset()
+        if self._stage is not None:
+            stage, start = self._stage
+            self.spans.append(("stage", stage, 0, start, now - start))
+        self._stage = None if name is None else (name, now)
+
+    @contextmanager
+    def span(self, name):
+        start = self._offset()
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.spans.append(("span", name, self._depth + 1, start, self._offset() - start))
+
+    @property
+    def seconds(self):
+        return sum(s[4] for s in self.spans if s[0] == "stage")
+
+    def spans_frame(self):
+        """Stages and spans in start order, as a table for the debug panel."""
+        rows = sorted(self.spans, key=lambda s: (s[3], s[2]))
+        return pd.DataFrame({
+            "step": ["  " * depth + name for _, name, depth, _, _ in rows],
+            "ms": [round(seconds * 1000, 1) for *_, seconds in rows],
+            "start ms": [round(start * 1000, 1) for *_, start, _ in rows],
+        })
+
+    def cache_frame(self):
+        """Cache calls of the rerun: one row per function with hits and misses."""
+        calls = pd.DataFrame(self.cache_calls, columns=["function", "hit", "seconds"])
+        table = calls.groupby("function", sort=False).agg(
+            hits=("hit", "sum"), misses=("hit", lambda h: int((~h).sum())), ms=("seconds", "sum"))
+        table["ms"] = (table["ms"] * 1000).round(1)
+        return table.reset_index()
+
+    def to_dict(self):
+        return {
+            "app": self.app,
+            "view": self.view,
+            "seconds": round(self.seconds, 6),
+            "spans": [{"kind": k, "name": n, "depth": d, "start": round(s, 6), "seconds": round(t, 6)}
+                      for k, n, d, s, t in self.spans],
+            "cache": [{"function": f, "hit": h, "seconds": round(t, 6)} for f, h, t in self.cache_calls],
+        }
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class Registry:
+    """Counters and span histograms of every traced rerun of this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reruns = {}
+        # (app, view, kind, name) -> [bucket counts..., count, sum]
+        self._spans = {}
+        # (app, function, "hit" | "miss") -> count
+        self._cache = {}
+
+    def record(self, trace):
+        with self._lock:
+            key = (trace.app, trace.view)
+            self._reruns[key] = self._reruns.get(key, 0) + 1
+            for kind, name, _, _, seconds in trace.spans:
+                entry = self._spans.setdefault((trace.app, trace.view, kind, name), [0] * len(BUCKETS) + [0, 0.0])
+                for i, bound in enumerate(BUCKETS):
+                    if seconds <= bound:
+                        entry[i] += 1
+                entry[-2] += 1
+                entry[-1] += seconds
+            for function, hit, _ in trace.cache_calls:
+                key = (trace.app, function, "hit" if hit else "miss")
+                self._cache[key] = self._cache.get(key, 0) + 1
+
+    def openmetrics(self):
+        """Everything recorded so far in the OpenMetrics text format."""
+        with self._lock:
+            lines = [
+                "# TYPE dashboard_reruns counter",
+                "# HELP dashboard_reruns Traced reruns of a dashboard view.",
+            ]
+            for (app, view), count in sorted(self._reruns.items(), key=str):
+                lines.append(f"dashboard_reruns_total{_labels(app=app, view=view or '')} {count}")
+            lines += [
+                "# TYPE dashboard_span_seconds histogram",
+                "# HELP dashboard_span_seconds Time spent in each stage and span of a rerun.",
+                "# UNIT dashboard_span_seconds seconds",
+            ]
+            for (app, view, kind, name), entry in sorted(self._spans.items(), key=str):
+                labels = {"app": app, "view": view or "", "kind": kind, "span": name}
+                for bound, count in zip(BUCKETS, entry):
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"dashboard_span_seconds_bucket{_labels(**labels, le=le)} {count}")
+                lines.append(f"dashboard_span_seconds_count{_labels(**labels)} {entry[-2]}")
+                lines.append(f"dashboard_span_seconds_sum{_labels(**labels)} {entry[-1]:.6f}")
+            lines += [
+                "# TYPE dashboard_cache_calls counter",
+                "# HELP dashboard_cache_calls Calls of cached loaders by result.",
+            ]
+            for (app, function, result), count in sorted(self._cache.items()):
+                lines.append(f"dashboard_cache_calls_total{_labels(app=app, function=function, result=result)} {count}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def current():
+    """The trace of the rerun running on this thread, or None."""
+    return getattr(_local, "trace", None)
+
+
+def start(app, enabled=ENABLED):
+    """Starts tracing this rerun of app when enabled."""
+    _local.trace = Trace(app) if enabled else None
+
+
+def set_view(view):
+    """Names what the rerun shows (dashboard or slide) for the metrics."""
+    trace = current()
+    if trace is not None:
+        trace.view = view
+
+
+def stage(name):
+    """Ends the current stage of the rerun and starts the stage name."""
+    trace = current()
+    if trace is not None:
+        trace.stage(name)
+
+
+@contextmanager
+def span(name):
+    """Times the enclosed block as a span of the current stage."""
+    trace = current()
+    if trace is None:
+        yield
+    else:
+        with trace.span(name):
+            yield
+
+
+def _configure_log():
+    if not log.handlers:
+        log.addHandler(logging.StreamHandler())
+        log.setLevel(logging.INFO)
+        log.propagate = False
+
+
+def finish():
+    """
+    Ends the traced rerun, adds it to REGISTRY, logs it and returns it
+    (None when the rerun was not traced).
+    """
+    trace = current()
+    if trace is None:
+        return None
+    _local.trace = None
+    trace.stage(None)
+    REGISTRY.record(trace)
+    _configure_log()
+    log.info(json.dumps(trace.to_dict()))
+    return trace
+
+
+def timed(func):
+    """Records every call of func as a span of traced reruns."""
+    @functools.wraps(func)
+    def call(*args, **kwargs):
+        with span(func.__name__):
+            return func(*args, **kwargs)
+
+    return call
+
+
+def cached(cache_decorator):
+    """
+    Applies a Streamlit cache decorator (st.cache_data(...) or
+    st.cache_resource(...)) to a loader. In traced reruns every call is
+    a span named after the loader, recorded as a hit or a miss.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            # Only runs when the cache missed.
+            _local.missed = True
+            return func(*args, **kwargs)
+
+        cached_func = cache_decorator(compute)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            trace = current()
+            if trace is None:
+                return cached_func(*args, **kwargs)
+            outer, _local.missed = getattr(_local, "missed", False), False
+            start = time.perf_counter()
+            try:
+                with trace.span(func.__name__):
+                    return cached_func(*args, **kwargs)
+            finally:
+                trace.cache_calls.append((func.__name__, not _local.missed, time.perf_counter() - start))
+                _local.missed = outer
+
+        call.clear = cached_func.clear
+        return call
+
+    return decorate
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.openmetrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host="127.0.0.1"):
+    """Serves REGISTRY at http://host:port/metrics from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
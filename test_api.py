@@ -0,0 +1,130 @@
+import asyncio
+import contextlib
+import json
+
+import pytest
+
+import api
+import columnar_cache
+
+RETAIL_CSV = """sales_date,city,province,product_category,net_revenue
+2024-01-01,Toronto,ON,Books,10.0
+2024-01-01,Ottawa,ON,Toys,20.0
+2024-01-02,Toronto,ON,Toys,30.0
+2024-02-01,Vancouver,BC,Books,40.0
+"""
+
+
+@pytest.fixture
+def retail_api(tmp_path, monkeypatch):
+    monkeypatch.setattr(columnar_cache, "CACHE_DIR", str(tmp_path / ".cache"))
+    path = tmp_path / "retail.csv"
+    path.write_text(RETAIL_CSV)
+    server_api = api.Api({"retail": str(path)}, workers=2)
+    yield server_api
+    server_api.close()
+
+
+async def _get(port, path, headers=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    lines = [f"GET {path} HTTP/1.1", "Host: localhost", "Connection: close"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    response_headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        response_headers[name.strip().lower()] = value.strip()
+    body = await reader.read()
+    writer.close()
+    return status, response_headers, json.loads(body) if body else None
+
+
+@contextlib.asynccontextmanager
+async def serving(server_api):
+    """Serves server_api on a free port; yields the port."""
+    server = await api.start(port=0, api=server_api)
+    try:
+        yield server.sockets[0].getsockname()[1]
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+def fetch(server_api, *requests):
+    """Responses to (path, headers) requests, sent one after the other."""
+
+    async def run():
+        async with serving(server_api) as port:
+            return [await _get(port, path, headers) for path, headers in requests]
+
+    return asyncio.run(run())
+
+
+def test_index_lists_kpis_series_and_filters(retail_api):
+    [(status, _, body)] = fetch(retail_api, ("/v1", None))
+    assert status == 200
+    retail = body["dashboards"]["retail"]
+    assert retail["kpis"] == "/v1/retail/kpis"
+    assert set(retail["series"]) == {"daily_revenue", "top_categories"}
+    assert retail["filters"] == ["category", "city", "province", "start", "end"]
+
+
+def test_kpis_apply_filters(retail_api):
+    (status, headers, body), (_, _, filtered) = fetch(
+        retail_api,
+        ("/v1/retail/kpis", None),
+        ("/v1/retail/kpis?city=Toronto&start=2024-01-02", None),
+    )
+    assert status == 200
+    assert headers["content-type"] == "application/json"
+    assert body["kpis"] == {"total_revenue": 100.0, "avg_revenue": 25.0, "transactions": 4}
+    assert filtered["filters"] == {"city": ["Toronto"]}
+    assert filtered["start"] == "2024-01-02"
+    assert filtered["kpis"] == {"total_revenue": 30.0, "avg_revenue": 30.0, "transactions": 1}
+
+
+def test_series(retail_api):
+    [(status, _, body)] = fetch(retail_api, ("/v1/retail/series/daily_revenue?province=ON", None))
+    assert status == 200
+    assert body["series"] == "daily_revenue"
+    assert [(row["sales_date"][:10], row["net_revenue"]) for row in body["data"]] == [
+        ("2024-01-01", 30.0), ("2024-01-02", 30.0)]
+
+
+def test_if_none_match_is_not_modified(retail_api):
+    async def run():
+        async with serving(retail_api) as port:
+            _, headers, _ = await _get(port, "/v1/retail/kpis?city=Toronto,Ottawa")
+            etag = {"If-None-Match": headers["etag"]}
+            # The same filters in another order are the same request.
+            same = await _get(port, "/v1/retail/kpis?city=Ottawa&city=Toronto", etag)
+            changed = await _get(port, "/v1/retail/kpis?city=Ottawa", etag)
+            return headers["etag"], same, changed
+
+    etag, (status, headers, body), (changed, _, _) = asyncio.run(run())
+    assert status == 304
+    assert headers["etag"] == etag
+    assert body is None
+    assert changed == 200
+
+
+def test_unknown_filter_is_bad_request(retail_api):
+    (status, _, body), (bad_date, _, _) = fetch(
+        retail_api,
+        ("/v1/retail/kpis?carrier=UPS", None),
+        ("/v1/retail/kpis?start=someday", None),
+    )
+    assert status == 400
+    assert "unknown filter 'carrier'" in body["error"]
+    assert bad_date == 400
+
+
+def test_unknown_series_or_dashboard_is_not_found(retail_api):
+    responses = fetch(
+        retail_api,
+        ("/v1/retail/series/carriers", None),
+        ("/v1/support/kpis", None),
+    )
+    assert [status for status, _, _ in responses] == [404, 404]
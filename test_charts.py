@@ -0,0 +1,117 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import plotly.io
+import pytest
+
+import charts
+
+N = 10_000
+
+
+def _series(n=N):
+    rng = np.random.default_rng(2)
+    x = np.arange(n, dtype="float64")
+    y = np.cumsum(rng.normal(size=n))
+    # A spike a reducer must not lose.
+    y[n // 3] = y.max() + 100
+    return x, y
+
+
+@pytest.mark.parametrize("n_out", [3, 10, 500, 1_200])
+def test_lttb_keeps_the_ends_and_the_size(n_out):
+    x, y = _series()
+    kept = charts.lttb_indices(x, y, n_out)
+    assert len(kept) == n_out
+    assert kept[0] == 0 and kept[-1] == N - 1
+    assert (np.diff(kept) > 0).all()
+
+
+def test_lttb_keeps_the_spike():
+    x, y = _series()
+    assert N // 3 in charts.lttb_indices(x, y, 100)
+
+
+def test_short_series_are_kept_whole():
+    x, y = _series(50)
+    for reduce in charts.METHODS.values():
+        np.testing.assert_array_equal(reduce(x, y, 50), np.arange(50))
+        np.testing.assert_array_equal(reduce(x, y, 200), np.arange(50))
+
+
+@pytest.mark.parametrize("n_out", [4, 11, 500])
+def test_minmax_keeps_the_ends_and_every_bucket_extreme(n_out):
+    x, y = _series()
+    kept = charts.minmax_indices(x, y, n_out)
+    assert len(kept) <= n_out + 2
+    assert kept[0] == 0 and kept[-1] == N - 1
+    assert (np.diff(kept) > 0).all()
+    assert y.argmin() in kept and y.argmax() in kept
+    buckets = n_out // 2
+    starts = np.arange(buckets) * N // buckets
+    for lo, hi in zip(starts, np.append(starts[1:], N)):
+        assert lo + y[lo:hi].argmax() in kept
+
+
+def test_downsample_reduces_each_trace():
+    dates = pd.date_range("2020-01-01", periods=3_000, freq="D")
+    df = pd.DataFrame({
+        "date": np.tile(dates, 2),
+        "revenue": np.arange(6_000, dtype="float64"),
+        "city": np.repeat(["Toronto", "Ottawa"], 3_000),
+    })
+    df.loc[5, "revenue"] = np.nan
+    small = pd.DataFrame({"date": dates[:10], "revenue": np.nan, "city": "Montreal"})
+    got = charts.downsample(pd.concat([df, small], ignore_index=True), "date", "revenue", 300, group="city")
+    sizes = got.groupby("city").size()
+    assert sizes.to_dict() == {"Montreal": 10, "Ottawa": 300, "Toronto": 300}
+    toronto = got[got["city"] == "Toronto"]
+    assert toronto["date"].iloc[0] == dates[0] and toronto["date"].iloc[-1] == dates[-1]
+    assert toronto["revenue"].notna().all()
+
+
+def test_line_switches_to_webgl(monkeypatch):
+    df = pd.DataFrame({"x": np.arange(5_000), "y": np.arange(5_000.0)})
+    monkeypatch.setattr(charts, "WEBGL_MIN_POINTS", 1_000)
+    assert charts.line(df, "x", "y", width=800).data[0].type == "scatter"
+    assert charts.line(df, "x", "y", width=2_000).data[0].type == "scattergl"
+    assert len(charts.line(df, "x", "y", width=800).data[0].x) == 800
+
+
+def test_filter_key_ignores_order():
+    a = charts.filter_key({"city": ["Toronto", "Ottawa"], "start": datetime.date(2024, 1, 1), "dim": None})
+    b = charts.filter_key({"dim": None, "start": pd.Timestamp("2024-01-01"), "city": ("Ottawa", "Toronto")})
+    assert a == b
+    assert a != charts.filter_key({"city": ["Toronto"], "start": datetime.date(2024, 1, 1), "dim": None})
+
+
+def _figures():
+    dates = pd.date_range("2024-01-01", periods=6_000, freq="h")
+    df = pd.DataFrame({"date": dates, "revenue": np.arange(6_000.0), "city": np.repeat(["A", "B", "C"], 2_000)})
+    months = df.assign(month=df["date"].dt.strftime("%Y-%m")).groupby("month", as_index=False)["revenue"].sum()
+    return [
+        charts.line(df, "date", "revenue", width=400),
+        charts.line(df, "date", "revenue", width=4_000, color="city"),
+        charts.line(months, "month", "revenue"),
+    ]
+
+
+def test_figure_size_estimate_follows_the_json():
+    for fig in _figures():
+        size = len(plotly.io.to_json(fig, validate=False))
+        assert size / 3 < charts._figure_bytes(fig) < size * 2
+
+
+def test_figure_cache_hits_and_evicts():
+    small, large, months = _figures()
+    cache = charts.FigureCache(max_bytes=charts._figure_bytes(large) + charts._figure_bytes(small))
+    assert cache.get(1, "trend", {"city": ["A"]}, lambda: small) is small
+    assert cache.get(1, "trend", {"city": ("A",)}, lambda: months) is small
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.get(1, "by_city", None, lambda: large)
+    assert cache.nbytes == charts._figure_bytes(large) + charts._figure_bytes(small)
+    # Over the bound: the least recently used figure goes.
+    cache.get(2, "trend", None, lambda: months)
+    assert cache.get(1, "trend", {"city": ["A"]}, lambda: months) is months
+    assert cache.nbytes <= cache.max_bytes
@@ -0,0 +1,110 @@
+import pandas as pd
+
+import columnar_cache
+import datasets
+
+HEADER = "sales_date,city,net_revenue\n"
+
+
+def _parse(path):
+    return datasets.prepare_frame(pd.read_csv(path))[0]
+
+
+def _parse_tail(df, date_formats):
+    return datasets.prepare_frame(df, date_formats=date_formats)[0]
+
+
+def _lines(start, count, hour=None):
+    # Lines with values start, start + 1, ... an hour apart, the first at
+    # `hour` (default: start) hours after 2024-01-01.
+    first = pd.Timestamp(2024, 1, 1) + pd.Timedelta(hours=start if hour is None else hour)
+    hours = first + pd.to_timedelta(range(count), unit="h")
+    return "".join(f"{t:%Y-%m-%d %H:%M:%S},city{i % 3},{start + i}\n" for i, t in enumerate(hours))
+
+
+def _load(path, cache_dir):
+    df = columnar_cache.load_cached(str(path), _parse, cache_dir=str(cache_dir), parse_tail=_parse_tail)
+    return df, columnar_cache.cache_path(str(path), str(cache_dir))
+
+
+def test_entry_records_sort_order(tmp_path):
+    path = tmp_path / "sales.csv"
+    path.write_text(HEADER + "2024-01-02 00:00:00,a,2\n2024-01-01 00:00:00,b,1\n")
+    df, entry = _load(path, tmp_path / "cache")
+    assert df["net_revenue"].tolist() == [1, 2]
+    assert df.attrs["sorted_by"] == "sales_date"
+    assert columnar_cache.sorted_by(columnar_cache.map_table(entry)) == "sales_date"
+
+
+def test_append_of_earlier_dates_rebuilds_sorted(tmp_path):
+    path = tmp_path / "sales.csv"
+    path.write_text(HEADER + _lines(0, 48, hour=240))
+    _load(path, tmp_path / "cache")
+    with open(path, "a") as f:
+        f.write(_lines(100, 5, hour=0))
+    df, entry = _load(path, tmp_path / "cache")
+    assert columnar_cache.appended_to(entry) is None
+    assert df["net_revenue"].tolist() == list(range(100, 105)) + list(range(48))
+    assert datasets.is_sorted_by_date(df["sales_date"])
+
+
+def _grown(path, cache_dir, text):
+    # The source changed, mtime included, as an export rewriting it would.
+    with open(path, "a") as f:
+        f.write(text)
+    return _load(path, cache_dir)
+
+
+# Lines, so the file is well over the 2 x 64 KiB that were once hashed.
+BIG = 10_000
+
+
+def test_append_extends_the_entry(tmp_path):
+    path, cache = tmp_path / "sales.csv", tmp_path / "cache"
+    path.write_text(HEADER + _lines(0, BIG))
+    _, first = _load(path, cache)
+    df, entry = _grown(path, cache, _lines(BIG, 24))
+    assert columnar_cache.appended_to(entry) == (first, BIG)
+    assert df["net_revenue"].tolist() == list(range(BIG + 24))
+
+
+def test_edit_in_the_middle_rebuilds(tmp_path):
+    path, cache = tmp_path / "sales.csv", tmp_path / "cache"
+    path.write_text(HEADER + _lines(0, BIG))
+    _load(path, cache)
+    text = path.read_text()
+    middle = text.index(",5000\n")
+    path.write_text(text[:middle] + ",9999\n" + text[middle + len(",5000\n"):])
+    df, entry = _grown(path, cache, _lines(BIG, 24))
+    assert columnar_cache.appended_to(entry) is None
+    assert df["net_revenue"].iloc[5000] == 9999
+    assert len(df) == BIG + 24
+
+
+def test_truncation_rebuilds(tmp_path):
+    path, cache = tmp_path / "sales.csv", tmp_path / "cache"
+    path.write_text(HEADER + _lines(0, BIG))
+    _load(path, cache)
+    path.write_text(HEADER + _lines(0, 10))
+    df, entry = _load(path, cache)
+    assert columnar_cache.appended_to(entry) is None
+    assert df["net_revenue"].tolist() == list(range(10))
+    # Regrown past the old watermark with other rows: still a rebuild.
+    path.write_text(HEADER + _lines(50_000, BIG + 10))
+    df, entry = _load(path, cache)
+    assert columnar_cache.appended_to(entry) is None
+    assert df["net_revenue"].iloc[0] == 50_000
+
+
+def test_partial_last_line_waits(tmp_path):
+    path, cache = tmp_path / "sales.csv", tmp_path / "cache"
+    path.write_text(HEADER + _lines(0, 24))
+    _load(path, cache)
+    line = _lines(25, 1)
+    df, entry = _grown(path, cache, _lines(24, 1) + line[:10])
+    assert len(df) == 25
+    assert columnar_cache.appended_to(entry) is not None
+    with open(path, "a") as f:
+        f.write(line[10:])
+    df, _ = _load(path, cache)
+    assert len(df) == 26
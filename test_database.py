@@ -0,0 +1,138 @@
+import sqlite3
+import threading
+import types
+
+import pytest
+
+import database
+
+
+class Clock:
+    """Stands in for the time module, so tests move time instead of sleeping."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(database, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = tmp_path / "analytics.db"
+    con = sqlite3.connect(path)
+    con.execute('CREATE TABLE "sales data" (city TEXT, revenue REAL)')
+    con.executemany('INSERT INTO "sales data" VALUES (?, ?)',
+                    [("Toronto", 10.0), ("Toronto", 5.0), ("Ottawa", 2.5)])
+    con.commit()
+    con.close()
+    db = database.Database(f"sqlite:///{path}", pool_size=2, ttl=60)
+    yield db
+    db.close()
+
+
+def test_parse_url():
+    assert database.parse_url("sqlite:///data/analytics.db") == ("sqlite", "data/analytics.db")
+    assert database.parse_url("duckdb:////srv/a.duckdb") == ("duckdb", "/srv/a.duckdb")
+    with pytest.raises(ValueError):
+        database.parse_url("postgresql://localhost/analytics")
+
+
+def test_pool_reuses_connections():
+    pool = database.ConnectionPool(lambda: sqlite3.connect(":memory:"), size=2)
+    for _ in range(3):
+        with pool.connection() as con:
+            con.execute("SELECT 1")
+    assert pool.created == 1
+    with pool.connection() as first, pool.connection() as second:
+        assert first is not second
+    assert pool.created == 2
+    pool.close()
+
+
+def test_pool_drops_connection_that_raised():
+    pool = database.ConnectionPool(lambda: sqlite3.connect(":memory:"), size=1)
+    with pytest.raises(sqlite3.OperationalError):
+        with pool.connection() as con:
+            con.execute("SELECT * FROM missing")
+    with pool.connection() as con:
+        assert con.execute("SELECT 1").fetchall() == [(1,)]
+    assert pool.created == 2
+
+
+def test_pool_times_out_when_exhausted():
+    pool = database.ConnectionPool(lambda: sqlite3.connect(":memory:", check_same_thread=False),
+                                   size=1, timeout=0.05)
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with pool.connection():
+            held.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    held.wait()
+    try:
+        with pytest.raises(TimeoutError):
+            with pool.connection():
+                pass
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_result_cache_expires_after_ttl(clock):
+    cache = database.ResultCache(ttl=10)
+    cache.put("key", [(1,)])
+    clock.now = 9.9
+    assert cache.get("key") == [(1,)]
+    clock.now = 10.0
+    assert cache.get("key") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_result_cache_evicts_least_recently_used():
+    cache = database.ResultCache(ttl=60, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_query_is_cached_until_ttl(db, clock):
+    sql = f"SELECT city, SUM(revenue) FROM {database.quote('sales data')} WHERE city = ? GROUP BY city"
+    assert db.query(sql, ["Toronto"]) == [("Toronto", 15.0)]
+    assert db.query(sql, ["Toronto"]) == [("Toronto", 15.0)]
+    assert db.query(sql, ["Ottawa"]) == [("Ottawa", 2.5)]
+    assert (db.cache.hits, db.cache.misses) == (1, 2)
+    clock.now = 60.0
+    assert db.query(sql, ["Toronto"]) == [("Toronto", 15.0)]
+    assert db.cache.misses == 3
+    assert db.pool.created == 1
+
+
+def test_read_frame_selects_columns(db):
+    df = db.read_frame(f"SELECT {database.quote('city')} FROM {database.quote('sales data')} ORDER BY revenue")
+    assert list(df.columns) == ["city"]
+    assert df["city"].tolist() == ["Ottawa", "Toronto", "Toronto"]
+
+
+def test_database_is_read_only(db):
+    with pytest.raises(sqlite3.OperationalError):
+        db.query("DELETE FROM \"sales data\"")
+    assert db.query("SELECT COUNT(*) FROM \"sales data\"") == [(3,)]
+
+
+def test_missing_sqlite_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        database.Database(f"sqlite:///{tmp_path / 'missing.db'}")
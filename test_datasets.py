@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+import datasets
+
+
+def _dates(*values):
+    return pd.Series(pd.to_datetime(list(values)))
+
+
+def test_sorted_with_missing_dates_last():
+    assert datasets.is_sorted_by_date(_dates("2024-01-01", "2024-01-02", None, None))
+    assert not datasets.is_sorted_by_date(_dates("2024-01-01", None, "2024-01-02"))
+    assert not datasets.is_sorted_by_date(_dates("2024-01-02", "2024-01-01"))
+    assert datasets.is_sorted_by_date(_dates())
+
+
+def test_sort_by_date_keeps_a_sorted_frame():
+    df = pd.DataFrame({"sales_date": _dates("2024-01-01", "2024-01-03", None), "v": [1, 2, 3]})
+    assert datasets.sort_by_date(df, "sales_date") is df
+    assert df.attrs["sorted_by"] == "sales_date"
+
+
+def test_sort_by_date_is_stable_with_missing_dates_last():
+    df = pd.DataFrame({"sales_date": _dates("2024-01-02", None, "2024-01-01", "2024-01-02"), "v": [1, 2, 3, 4]})
+    got = datasets.sort_by_date(df, "sales_date")
+    assert got["v"].tolist() == [3, 1, 4, 2]
+    assert got.index.tolist() == [0, 1, 2, 3]
+    assert got.attrs["sorted_by"] == "sales_date"
+
+
+def test_recorded_order_is_trusted():
+    # A frame read back from the columnar cache says how it is sorted.
+    df = pd.DataFrame({"sales_date": _dates("2024-01-02", "2024-01-01")})
+    df.attrs["sorted_by"] = "sales_date"
+    assert datasets.sort_by_date(df, "sales_date") is df
+    df.attrs["sorted_by"] = "other"
+    assert datasets.sort_by_date(df, "sales_date")["sales_date"].is_monotonic_increasing
+
+
+def test_prepare_frame_picks_the_known_date_column():
+    df = pd.DataFrame({
+        "created": ["2024-01-03", "2024-01-01", "2024-01-02"],
+        "sales_date": ["2024-02-01", "2024-02-03", "2024-02-02"],
+        "city": ["a", "b", "a"],
+    })
+    prepared, date_col = datasets.prepare_frame(df)
+    assert date_col == "sales_date"
+    assert prepared["sales_date"].is_monotonic_increasing
+    assert prepared.attrs["sorted_by"] == "sales_date"
+    assert datasets.primary_date_column(["created", "opened_at"]) == "opened_at"
+    assert datasets.primary_date_column(["created"]) == "created"
+    assert datasets.primary_date_column([]) is None
+
+
+def _text(*values):
+    return pd.Series(list(values), dtype=object)
+
+
+def test_infer_date_format():
+    assert datasets.infer_date_format(_text("2024-01-31", "2024-02-01")) == "%Y-%m-%d"
+    assert datasets.infer_date_format(_text("31/01/2024", "01/02/2024", None)) == "%d/%m/%Y"
+    # ISO strings of varying precision: no single strftime format fits.
+    iso = _text("2024-01-01", "2024-01-01 10:00:00", "2024-01-02T03:04:05.123")
+    assert datasets.infer_date_format(iso) == "ISO8601"
+    assert datasets.infer_date_format(_text("2024-01-01", "Jan 5, 2024", "03/02/2024")) == "mixed"
+    assert datasets.infer_date_format(_text(None)) == "mixed"
+
+
+def _per_value(values):
+    return pd.Series([pd.to_datetime(v, errors="coerce", format="mixed") for v in values], dtype="datetime64[ns]")
+
+
+def test_parse_dates_matches_per_value_parsing():
+    iso = ["2024-01-01", "2024-01-01 10:00:00", "2024-01-02T03:04:05.123", None, "not a date"]
+    mixed = ["2024-01-01", "Jan 5, 2024", "2024-02-03 04:05", None, "not a date"]
+    for values in (iso, mixed):
+        for rows in (values, values * 50):
+            text = pd.Series(rows, dtype=object, index=range(10, 10 + len(rows)), name="day")
+            fmt = datasets.infer_date_format(text)
+            got = datasets.parse_dates(text, fmt)
+            assert got.index.equals(text.index) and got.name == "day"
+            expected = _per_value(rows)
+            assert got.astype("datetime64[ns]").tolist() == expected.tolist()
+
+
+def test_prepare_frame_records_date_formats():
+    df = pd.DataFrame({"opened_at": ["2024-01-02 10:00", "2024-01-01 09:30"], "hours": [1, 2]})
+    prepared, date_col = datasets.prepare_frame(df)
+    assert date_col == "opened_at"
+    assert prepared.attrs["date_formats"] == {"opened_at": "%Y-%m-%d %H:%M"}
+    assert prepared["hours"].tolist() == [2, 1]
+    # A recorded format is used as is.
+    again, _ = datasets.prepare_frame(df, date_formats=prepared.attrs["date_formats"])
+    pd.testing.assert_series_equal(again["opened_at"], prepared["opened_at"])
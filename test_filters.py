@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filters import DateIndex, FilterEngine
+
+
+@pytest.fixture(scope="module")
+def frame():
+    rng = np.random.default_rng(1)
+    dates = pd.Series(pd.Timestamp("2024-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 60 * 24, 2_000)), unit="h"))
+    # Missing dates sort last, as datasets.sort_by_date leaves them.
+    dates.iloc[-20:] = pd.NaT
+    return pd.DataFrame({
+        "date": dates,
+        "city": pd.Series(rng.choice(["Toronto", "Ottawa", None], 2_000), dtype="category"),
+        "carrier": rng.choice(["UPS", "FedEx", "DHL"], 2_000),
+    })
+
+
+RANGES = [
+    ("2024-01-10", None),
+    (None, "2024-02-01 12:00"),
+    ("2024-01-05 06:00", "2024-01-20"),
+    # Bounds between and outside the rows.
+    ("2023-06-01", "2023-12-31"),
+    ("2024-01-20 00:30", "2024-01-20 00:40"),
+    ("2024-03-15", "2025-01-01"),
+]
+
+
+@pytest.mark.parametrize("start,end", RANGES)
+def test_date_index_slice_equals_the_mask(frame, start, end):
+    index = DateIndex.from_series(frame["date"])
+    expected = np.ones(len(frame), dtype=bool)
+    if start is not None:
+        expected &= (frame["date"] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        expected &= (frame["date"] <= pd.Timestamp(end)).to_numpy()
+    got = np.zeros(len(frame), dtype=bool)
+    got[index.slice(start, end)] = True
+    np.testing.assert_array_equal(got, expected)
+
+
+def test_unsorted_dates_have_no_index(frame):
+    assert DateIndex.from_series(frame["date"].iloc[::-1]) is None
+    shuffled = frame.sample(frac=1, random_state=0).reset_index(drop=True)
+    engine = FilterEngine(shuffled)
+    assert engine.date_index("date") is None
+    expected = (shuffled["date"] >= "2024-01-10") & (shuffled["date"] <= "2024-01-20")
+    np.testing.assert_array_equal(engine.between("date", "2024-01-10", "2024-01-20"), expected.to_numpy())
+
+
+def test_periods_start_at_the_first_row_of_each_month(frame):
+    labels, starts = DateIndex.from_series(frame["date"]).periods("M")
+    months = frame["date"].dropna().dt.to_period("M").astype(str)
+    assert labels == months.unique().tolist()
+    assert starts.tolist() == [int(months.eq(label).idxmax()) for label in labels]
+
+
+def test_mask_combines_predicates(frame):
+    engine = FilterEngine(frame)
+    filters = {"city": ["Toronto"], "carrier": ["UPS", "DHL"], "": ["ignored"], "province": None}
+    got = engine.mask(filters, "date", "2024-01-10", "2024-02-10")
+    expected = (
+        frame["city"].isin(["Toronto"])
+        & frame["carrier"].isin(["UPS", "DHL"])
+        & frame["date"].between("2024-01-10", "2024-02-10")
+    )
+    np.testing.assert_array_equal(got, expected.to_numpy())
+
+
+def test_predicates_are_cached(frame):
+    engine = FilterEngine(frame)
+    first = engine.mask({"city": ["Toronto", "Ottawa"]}, "date", "2024-01-10")
+    second = engine.mask({"city": ["Ottawa", "Toronto"]}, "date", "2024-01-10")
+    np.testing.assert_array_equal(first, second)
+    assert (engine.misses, engine.hits) == (2, 2)
+    assert not engine.isin("city", ["Toronto"]).flags.writeable
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import columnar_cache
+import datasets
+import ingest
+
+ROWS = ingest.SAMPLE_ROWS * 2 + 1
+# Past the sample rows, so the value breaks the type inferred from them.
+LATE = ingest.SAMPLE_ROWS + 500
+
+
+def _frame(rows=ROWS):
+    return pd.DataFrame({
+        "sales_date": pd.date_range("2024-01-01", periods=rows, freq="min").strftime("%Y-%m-%d %H:%M:%S"),
+        "city": np.where(np.arange(rows) % 3 == 0, "Toronto", "Ottawa"),
+        "quantity": np.arange(rows).astype(object),
+        "returned": np.where(np.arange(rows) % 2 == 0, "true", "false").astype(object),
+        "price": (np.arange(rows) * 0.5).astype(object),
+    })
+
+
+def _ingest(tmp_path, df, chunk_rows=4_000):
+    source = tmp_path / "upload.csv"
+    df.to_csv(source, index=False)
+    target = tmp_path / "upload.arrow"
+    rows = ingest.ingest_csv(str(source), str(target), chunk_rows=chunk_rows)
+    return rows, columnar_cache.read_table(str(target)), pd.read_csv(source)
+
+
+def test_types_from_the_sample(tmp_path):
+    rows, got, _ = _ingest(tmp_path, _frame())
+    assert rows == ROWS
+    assert got["sales_date"].dtype == "datetime64[ns]"
+    assert isinstance(got["city"].dtype, pd.CategoricalDtype)
+    assert got["quantity"].dtype == "int64"
+    assert got["returned"].dtype == bool
+    assert got["price"].dtype == "float64"
+
+
+def test_fraction_after_the_sample_widens_integers(tmp_path):
+    df = _frame()
+    df.loc[LATE, "quantity"] = 3.5
+    rows, got, expected = _ingest(tmp_path, df)
+    assert rows == ROWS
+    assert got["quantity"].dtype == "float64"
+    pd.testing.assert_series_equal(got["quantity"], expected["quantity"])
+
+
+def test_text_after_the_sample_widens_to_text(tmp_path):
+    df = _frame()
+    df.loc[LATE, "returned"] = "maybe"
+    df.loc[LATE + 1, "price"] = "unknown"
+    df.loc[LATE + 2, "quantity"] = "many"
+    _, got, expected = _ingest(tmp_path, df)
+    assert got.loc[LATE, "returned"] == "maybe"
+    assert got["returned"].str.lower().tolist() == expected["returned"].astype(str).str.lower().tolist()
+    assert got.loc[LATE + 1, "price"] == "unknown"
+    assert got.loc[LATE + 2, "quantity"] == "many"
+    assert got.loc[0, "quantity"] == "0"
+
+
+def test_blanks_keep_the_sampled_type(tmp_path):
+    df = _frame()
+    df.loc[LATE, ["quantity", "returned", "price"]] = None
+    _, got, expected = _ingest(tmp_path, df)
+    for column in ("quantity", "returned", "price"):
+        assert got[column].dtype == expected[column].dtype
+        assert got[column].isna().sum() == 1
+
+
+def test_failed_ingest_leaves_no_files(tmp_path, monkeypatch):
+    source = tmp_path / "upload.csv"
+    _frame(100).to_csv(source, index=False)
+    target = tmp_path / "upload.arrow"
+
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(ingest, "_to_arrow", broken)
+    with pytest.raises(OSError):
+        ingest.ingest_csv(str(source), str(target))
+    assert list(tmp_path.iterdir()) == [source]
+
+
+def test_many_files_widen_across_parts(tmp_path):
+    first, second = _frame(1_000), _frame(1_000)
+    second["sales_date"] = pd.date_range("2025-01-01", periods=1_000, freq="min").strftime("%Y-%m-%d %H:%M:%S")
+    second.loc[10, "quantity"] = 2.5
+    paths = []
+    for i, df in enumerate((first, second)):
+        paths.append(str(tmp_path / f"{i}.csv"))
+        df.to_csv(paths[-1], index=False)
+    target = tmp_path / "many.arrow"
+    assert ingest.ingest_many(paths, str(target), workers=1) == 2_000
+    got = columnar_cache.read_table(str(target))
+    assert got["quantity"].dtype == "float64"
+    assert got["quantity"].iloc[1_010] == 2.5
+    assert got["quantity"].iloc[:1_000].tolist() == list(range(1_000))
+
+
+def test_widen_rewrites_written_batches(tmp_path):
+    path = str(tmp_path / "batches.arrow")
+    writer = ingest._BatchWriter(path, pa.schema([("n", pa.int64())]))
+    writer.write([pa.array([1, 2])])
+    writer.widen("n", pa.float64())
+    writer.write([pa.array([2.5])])
+    writer.close()
+    assert columnar_cache.read_table(path)["n"].tolist() == [1.0, 2.0, 2.5]
+
+
+def test_many_files_in_a_subprocess(tmp_path):
+    paths = []
+    for i in range(3):
+        paths.append(str(tmp_path / f"{i}.csv"))
+        _frame(500).to_csv(paths[-1], index=False)
+    target = tmp_path / "many.arrow"
+    done = []
+    assert ingest.ingest_many_subprocess(paths, str(target), workers=2, progress=done.append) == 1_500
+    assert done[-1] == 1.0
+    assert len(columnar_cache.read_table(str(target))) == 1_500
+
+
+def test_failed_subprocess_raises(tmp_path):
+    path = tmp_path / "broken.csv"
+    path.write_bytes(b"")
+    with pytest.raises(RuntimeError, match="EmptyDataError"):
+        ingest.ingest_many_subprocess([str(path)], str(tmp_path / "many.arrow"))
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_rows_are_sorted_by_date_once(tmp_path):
+    df = _frame(1_000).sample(frac=1, random_state=0)
+    df.loc[df.index[3], "sales_date"] = None
+    source = tmp_path / "unsorted.csv"
+    df.to_csv(source, index=False)
+    target = tmp_path / "unsorted.arrow"
+    ingest.ingest_csv(str(source), str(target), chunk_rows=300)
+    got = columnar_cache.read_table(str(target))
+    assert got.attrs["sorted_by"] == "sales_date"
+    assert got["sales_date"].iloc[:-1].is_monotonic_increasing
+    assert got["sales_date"].isna().tolist() == [False] * 999 + [True]
+    expected = df.assign(sales_date=pd.to_datetime(df["sales_date"]))
+    expected = expected.sort_values("sales_date", kind="stable", na_position="last")
+    assert got["quantity"].tolist() == expected["quantity"].tolist()
+    assert got["city"].astype(str).tolist() == expected["city"].tolist()
+
+
+def test_prepared_entry_keeps_the_mapped_frame(tmp_path):
+    _frame(1_000).sample(frac=1, random_state=0).to_csv(tmp_path / "unsorted.csv", index=False)
+    target = str(tmp_path / "unsorted.arrow")
+    ingest.ingest_csv(str(tmp_path / "unsorted.csv"), target)
+    df = columnar_cache.read_table(target)
+    prepared = datasets.PreparedDataset.prepare(df, target, base=(target, 10))
+    assert datasets.private_bytes(prepared.frame, df) == 0
+    assert prepared.base == (target, 10)
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import queries
+from filters import FilterEngine
+from rollups import RollupCube
+
+ROWS = 5_000
+
+
+@pytest.fixture(scope="module")
+def sales():
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 90 * 24, ROWS)), unit="h")
+    city = rng.choice(["Toronto", "Ottawa", "Montreal", None], ROWS, p=[0.4, 0.3, 0.25, 0.05])
+    revenue = rng.gamma(2.0, 50.0, ROWS)
+    revenue[rng.random(ROWS) < 0.03] = np.nan
+    return pd.DataFrame({
+        "sales_date": dates,
+        "city": pd.Series(city, dtype="category"),
+        "category": pd.Series(rng.choice(["Books", "Toys", "Food"], ROWS), dtype="category"),
+        "net_revenue": revenue,
+    })
+
+
+def _cube(df):
+    return RollupCube.build(df, "sales_date", ["city", "category"], ["net_revenue"])
+
+
+def _rows(df, filters=None, start=None, end=None):
+    mask = pd.Series(True, index=df.index)
+    for column, values in (filters or {}).items():
+        mask &= df[column].isin(values)
+    day = df["sales_date"].dt.normalize()
+    if start is not None:
+        mask &= day >= pd.Timestamp(start)
+    if end is not None:
+        mask &= day <= pd.Timestamp(end)
+    return df[mask]
+
+
+SELECTIONS = [
+    ({}, None, None),
+    ({"city": ["Toronto"]}, None, None),
+    ({}, "2024-02-01", "2024-02-29"),
+    ({"city": ["Ottawa", "Montreal"], "category": ["Toys"]}, "2024-01-15", None),
+    ({"category": ["Books"]}, None, "2024-01-10"),
+]
+
+
+@pytest.mark.parametrize("filters,start,end", SELECTIONS)
+def test_totals_match_pandas(sales, filters, start, end):
+    selection = _cube(sales).select(filters, start, end)
+    expected = _rows(sales, filters, start, end)["net_revenue"]
+    total = selection.total("net_revenue")
+    assert selection.rows == len(expected)
+    assert total["count"] == expected.count()
+    assert total["sum"] == pytest.approx(expected.sum())
+    assert total["mean"] == pytest.approx(expected.mean())
+    assert total["std"] == pytest.approx(expected.std())
+
+
+@pytest.mark.parametrize("filters,start,end", SELECTIONS)
+def test_medians_match_pandas(sales, filters, start, end):
+    engine = queries.PandasEngine(_cube(sales), FilterEngine(sales), "sales_date")
+    expected = _rows(sales, filters, start, end)["net_revenue"]
+    assert engine.select(filters, start, end).median("net_revenue") == pytest.approx(expected.median())
+
+
+def test_group_by_dimension(sales):
+    got = _cube(sales).select({}, "2024-01-15", "2024-03-01").group("category", "net_revenue", ("sum", "mean", "count"))
+    expected = _rows(sales, start="2024-01-15", end="2024-03-01").groupby("category", observed=True)["net_revenue"]
+    pd.testing.assert_series_equal(got["sum"], expected.sum(), check_names=False)
+    pd.testing.assert_series_equal(got["mean"], expected.mean(), check_names=False)
+    assert got["count"].tolist() == expected.count().tolist()
+
+
+def test_group_by_month(sales):
+    got = _cube(sales).select({"city": ["Toronto"]}).group("month", "net_revenue", ("sum", "mean"), freq="M")
+    rows = _rows(sales, {"city": ["Toronto"]})
+    expected = rows.groupby(rows["sales_date"].dt.to_period("M").astype(str))["net_revenue"]
+    assert got.index.tolist() == ["2024-01", "2024-02", "2024-03"]
+    assert got["sum"].to_numpy() == pytest.approx(expected.sum().to_numpy())
+    assert got["mean"].to_numpy() == pytest.approx(expected.mean().to_numpy())
+
+
+def test_missing_keys_keep_their_rows(sales):
+    cube = _cube(sales)
+    assert cube.rows == ROWS
+    assert cube.total("net_revenue")["count"] == sales["net_revenue"].count()
+
+
+def test_extend_matches_a_full_build(sales):
+    head, tail = sales.iloc[:3_000], sales.iloc[3_000:]
+    extended = _cube(head).extend(tail)
+    for filters, start, end in SELECTIONS:
+        got = extended.select(filters, start, end).total("net_revenue")
+        expected = _cube(sales).select(filters, start, end).total("net_revenue")
+        assert got["sum"] == pytest.approx(expected["sum"])
+        assert got["count"] == expected["count"]
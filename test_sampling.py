@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sampling
+from rollups import RollupCube
+
+ROWS = 50_000
+SEEDS = range(20)
+
+
+@pytest.fixture(scope="module")
+def tickets():
+    rng = np.random.default_rng(3)
+    dates = pd.Timestamp("2024-01-01") + pd.to_timedelta(np.sort(rng.integers(0, 365 * 24, ROWS)), unit="h")
+    team = rng.choice(["Billing", "Technical", "Sales"], ROWS, p=[0.6, 0.3, 0.1])
+    # A stratum smaller than MIN_PER_STRATUM is kept in full.
+    team[rng.choice(ROWS, 12, replace=False)] = "Legal"
+    hours = rng.lognormal(1.0, 1.0, ROWS)
+    hours[rng.random(ROWS) < 0.02] = np.nan
+    return pd.DataFrame({
+        "opened_at": dates,
+        "team": pd.Series(team, dtype="category"),
+        "priority": pd.Series(rng.choice(["High", "Low"], ROWS), dtype="category"),
+        "resolution_hours": hours,
+    })
+
+
+def _samples(df, size=2_000):
+    return [sampling.StratifiedSample.build(df, "opened_at", ["team", "priority"], ["resolution_hours"], size=size, seed=s)
+            for s in SEEDS]
+
+
+SELECTIONS = [
+    ({}, None, None),
+    ({"team": ["Technical"]}, None, None),
+    ({}, "2024-03-01", "2024-05-31"),
+    ({"team": ["Billing", "Sales"], "priority": ["High"]}, "2024-06-15", None),
+]
+
+
+def _contains(estimate, exact):
+    return estimate.low <= exact <= estimate.high
+
+
+@pytest.mark.parametrize("filters,start,end", SELECTIONS)
+def test_intervals_contain_the_exact_values(tickets, filters, start, end):
+    exact = RollupCube.build(tickets, "opened_at", ["team", "priority"], ["resolution_hours"]).select(filters, start, end)
+    totals = exact.total("resolution_hours")
+    mask = np.ones(ROWS, dtype=bool)
+    for column, values in filters.items():
+        mask &= tickets[column].isin(values).to_numpy()
+    day = tickets["opened_at"].dt.normalize()
+    if start is not None:
+        mask &= (day >= start).to_numpy()
+    if end is not None:
+        mask &= (day <= end).to_numpy()
+    median = tickets["resolution_hours"][mask].median()
+
+    hits = {"rows": 0, "sum": 0, "count": 0, "mean": 0, "median": 0}
+    for sample in _samples(tickets):
+        selection = sample.select(filters, start, end)
+        estimates = selection.total("resolution_hours")
+        hits["rows"] += _contains(selection.rows, exact.rows)
+        for stat in ("sum", "count", "mean"):
+            hits[stat] += _contains(estimates[stat], totals[stat])
+        hits["median"] += _contains(selection.median("resolution_hours"), median)
+    # 95% intervals: allow a few misses out of the 20 seeds.
+    assert all(h >= 16 for h in hits.values()), hits
+
+
+def test_sample_size_and_strata(tickets):
+    sample = _samples(tickets)[0]
+    assert 1_500 < sample.rows < 2_600
+    assert (sample.sampled >= 1).all()
+    assert sample.population.sum() == ROWS
+    legal = sample.frame["team"] == "Legal"
+    assert legal.sum() == 12
+
+
+def test_dimension_filter_selects_whole_strata(tickets):
+    # A stratum kept in full has no error: its interval is the exact value.
+    sample = _samples(tickets)[0]
+    got = sample.select({"team": ["Legal"]}).total("resolution_hours")
+    legal = tickets.loc[tickets["team"] == "Legal", "resolution_hours"]
+    assert got["count"].value == legal.count()
+    assert got["sum"].value == pytest.approx(legal.sum())
+    assert got["sum"].low == pytest.approx(got["sum"].high)
+
+
+def test_a_full_sample_is_exact(tickets):
+    sample = sampling.StratifiedSample.build(tickets, "opened_at", ["team"], ["resolution_hours"], size=ROWS)
+    selection = sample.select({"team": ["Sales"]}, "2024-02-01", "2024-02-29")
+    rows = tickets[(tickets["team"] == "Sales") & tickets["opened_at"].between("2024-02-01", "2024-03-01", inclusive="left")]
+    estimate = selection.total("resolution_hours")["mean"]
+    assert estimate.value == pytest.approx(rows["resolution_hours"].mean())
+    assert estimate.high - estimate.low == pytest.approx(0, abs=1e-9)
+    # The weighted quantile is an observed value: the lower middle one.
+    assert selection.median("resolution_hours").value == rows["resolution_hours"].quantile(0.5, interpolation="lower")
+
+
+def test_empty_selection():
+    df = pd.DataFrame({"day": pd.to_datetime(["2024-01-01"]), "hours": [np.nan]})
+    selection = sampling.StratifiedSample.build(df, "day", measures=["hours"]).select()
+    assert np.isnan(selection.median("hours").value)
+    assert np.isnan(selection.total("hours")["mean"].value)
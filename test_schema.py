@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+import datasets
+import schema
+
+ROWS = 200
+
+
+def _roles(df, dashboard):
+    df, _ = datasets.prepare_frame(df)
+    return schema.detect_roles(schema.profile(df), schema.DASHBOARDS[dashboard])
+
+
+def _pick(values):
+    return np.resize(values, ROWS)
+
+
+def _dates():
+    return pd.date_range("2024-01-01", periods=ROWS, freq="D").strftime("%Y-%m-%d")
+
+
+def test_name_tokens():
+    assert schema.name_tokens("destination_state") == {"destination", "state"}
+    assert schema.name_tokens("issuesFlag") == {"issues", "flag"}
+    assert schema.name_tokens("HTTPStatus code2") == {"http", "status", "code", "2"}
+
+
+def test_known_columns():
+    df = pd.DataFrame({
+        "shipment_id": [f"S{i:06d}" for i in range(ROWS)],
+        "shipment_date": _dates(),
+        "delivery_date": _dates(),
+        "origin_state": _pick(["NY", "CA", "TX"]),
+        "destination_state": _pick(["WA", "FL"]),
+        "product_type": _pick(["Electronics", "Food"]),
+        "carrier": _pick(["FedEx", "UPS"]),
+        "issues_flag": _pick([False, True, False]),
+        "weight_kg": np.linspace(1, 50, ROWS),
+        "delivery_days": _pick([1, 2, 3, 4, 5]),
+    })
+    assert _roles(df, "supply_chain") == {
+        "date": "shipment_date",
+        "delivery_days": "delivery_days",
+        "issue": "issues_flag",
+        "origin": "origin_state",
+        "destination": "destination_state",
+        "product_type": "product_type",
+        "carrier": "carrier",
+    }
+
+
+def test_renamed_retail_columns():
+    df = pd.DataFrame({
+        "OrderId": [f"O{i}" for i in range(ROWS)],
+        "TxnDay": _dates(),
+        "City": _pick(["Toronto", "Ottawa"]),
+        "State": _pick(["ON", "QC", "BC"]),
+        "ProductCategory": _pick(["Books", "Toys"]),
+        "grossSales": np.linspace(10, 500, ROWS),
+    })
+    assert _roles(df, "retail") == {
+        "date": "TxnDay",
+        "revenue": "grossSales",
+        "category": "ProductCategory",
+        "city": "City",
+        "province": "State",
+    }
+
+
+def test_renamed_supply_chain_columns():
+    df = pd.DataFrame({
+        # High-cardinality text with "to" inside a word, not as one.
+        "customer": [f"Customer {i}" for i in range(ROWS)],
+        "ShipDate": _dates(),
+        "transitDays": _pick([1.5, 2.0, 3.5]),
+        "hasIssues": _pick([True, False]),
+        "OriginRegion": _pick(["East", "West"]),
+        "ship_to": _pick(["North", "South"]),
+        "productType": _pick(["Parts", "Food"]),
+        "CarrierName": _pick(["DHL", "UPS"]),
+    })
+    assert _roles(df, "supply_chain") == {
+        "date": "ShipDate",
+        "delivery_days": "transitDays",
+        "issue": "hasIssues",
+        "origin": "OriginRegion",
+        "destination": "ship_to",
+        "product_type": "productType",
+        "carrier": "CarrierName",
+    }
+
+
+def test_roles_only_take_fitting_kinds():
+    df = pd.DataFrame({
+        "sales_date": _dates(),
+        "sales": np.linspace(1, 2, ROWS),
+        "ticket": [f"T{i}" for i in range(ROWS)],
+    })
+    roles = _roles(df, "retail")
+    assert roles["date"] == "sales_date"
+    assert roles["revenue"] == "sales"
+    assert roles["category"] is None and roles["city"] is None
+
+
+def test_a_column_serves_one_role():
+    df = pd.DataFrame({
+        "opened": _dates(),
+        "closed": _dates(),
+        "team_category": _pick(["Billing", "Tech"]),
+        "resolution": np.linspace(1, 2, ROWS),
+    })
+    roles = _roles(df, "support")
+    assert roles["date"] == "opened"
+    assert roles["closed"] == "closed"
+    assert roles["team"] == "team_category"
+    assert roles["category"] is None
+
+
+def test_columns_of_kind():
+    df, _ = datasets.prepare_frame(pd.DataFrame({
+        "day": _dates(),
+        "amount": np.arange(ROWS),
+        "city": _pick(["A", "B"]),
+        "note": [f"note {i}" for i in range(ROWS)],
+    }))
+    profiles = schema.profile(df)
+    assert schema.columns_of_kind(profiles, ("numeric",)) == ["amount"]
+    assert schema.columns_of_kind(profiles, schema.FILTER_KINDS) == ["city", "note"]
+    assert profiles["city"]["unique"] == 2